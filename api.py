@@ -9,11 +9,12 @@ if __name__ == '__main__':
     import time
     from pathlib import Path
 
-    from flask import Flask, request, jsonify
+    from flask import Flask, request, jsonify, Response, stream_with_context
     from waitress import serve
 
 
     from videotrans.configure import config
+    from videotrans.task import _srt_index as srt_index, _submissions as submissions, _task_status as status_store
     from videotrans.task._dubbing import DubbingSrt
     from videotrans.task._speech2text import SpeechToText
     from videotrans.task._translate_srt import TranslateSrt
@@ -40,11 +41,9 @@ if __name__ == '__main__':
     API_RESOURCE='apidata'
     TARGET_DIR = ROOT_DIR + f'/{API_RESOURCE}'
     Path(TARGET_DIR).mkdir(parents=True, exist_ok=True)
-    # 进度日志
-    PROCESS_INFO = TARGET_DIR + '/processinfo'
-    if Path(PROCESS_INFO).is_dir():
-        shutil.rmtree(PROCESS_INFO)
-    Path(PROCESS_INFO).mkdir(parents=True, exist_ok=True)
+    # 旧版本写入的进度日志文件，任务状态现保存在 task/_task_status.py 中
+    if Path(TARGET_DIR + '/processinfo').is_dir():
+        shutil.rmtree(TARGET_DIR + '/processinfo')
     # url前缀
     URL_PREFIX = f"http://{HOST}:{PORT}/{API_RESOURCE}"
     config.exit_soft = False
@@ -104,15 +103,17 @@ if __name__ == '__main__':
     """
     @app.route('/tts', methods=['POST'])
     def tts():
-        data = request.json
+        return jsonify(_submit('tts', request.json))
+
+    def _tts_job(data):
         # 从请求数据中获取参数
         name = data.get('name', '').strip()
         if not name:
-            return jsonify({"code": 1, "msg": "The parameter name is not allowed to be empty"})
+            return {"code": 1, "msg": "The parameter name is not allowed to be empty"}
         is_srt=True
         if name.find("\n") == -1 and name.endswith('.srt'):
             if not Path(name).exists():
-                return jsonify({"code": 1, "msg": f"The file {name} is not exist"})
+                return {"code": 1, "msg": f"The file {name} is not exist"}
         else:
             tmp_file = config.TEMP_DIR + f'/tts-srt-{time.time()}-{random.randint(1, 9999)}.srt'
             is_srt=tools.is_srt_string(name)
@@ -132,23 +133,11 @@ if __name__ == '__main__':
         }
         is_allow_lang=tts_model.is_allow_lang(langcode=cfg['target_language_code'],tts_type=cfg['tts_type'])
         if is_allow_lang is not True:
-            return jsonify({"code":4,"msg":is_allow_lang})
+            return {"code":4,"msg":is_allow_lang}
         is_input_api=tts_model.is_input_api(tts_type=cfg['tts_type'],return_str=True)
         if is_input_api is not True:
-            return jsonify({"code":5,"msg":is_input_api})
-
-
-        obj = tools.format_video(name, None)
-        obj['target_dir'] = TARGET_DIR + f'/{obj["uuid"]}'
-        obj['cache_folder'] = config.TEMP_DIR + f'/{obj["uuid"]}'
-        Path(obj['target_dir']).mkdir(parents=True, exist_ok=True)
-        cfg.update(obj)
-
-        config.box_tts = 'ing'
-        trk = DubbingSrt(cfg)
-        config.dubb_queue.append(trk)
-        tools.set_process(text=f"Currently in queue No.{len(config.dubb_queue)}",uuid=obj['uuid'])
-        return jsonify({'code': 0, 'task_id': obj['uuid']})
+            return {"code":5,"msg":is_input_api}
+        return name, cfg, DubbingSrt, config.dubb_queue, 'box_tts'
 
 
     # 第2个接口 /translate_srt
@@ -186,15 +175,17 @@ if __name__ == '__main__':
     """
     @app.route('/translate_srt', methods=['POST'])
     def translate_srt():
-        data = request.json
+        return jsonify(_submit('translate_srt', request.json))
+
+    def _translate_srt_job(data):
         # 从请求数据中获取参数
         name = data.get('name', '').strip()
         if not name:
-            return jsonify({"code": 1, "msg": "The parameter name is not allowed to be empty"})
+            return {"code": 1, "msg": "The parameter name is not allowed to be empty"}
         is_srt=True
         if name.find("\n") == -1  and name.endswith('.srt'):
             if not Path(name).exists():
-                return jsonify({"code": 1, "msg": f"The file {name} is not exist"})
+                return {"code": 1, "msg": f"The file {name} is not exist"}
         else:
             tmp_file = config.TEMP_DIR + f'/trans-srt-{time.time()}-{random.randint(1, 9999)}.srt'
             is_srt=tools.is_srt_string(name)
@@ -209,18 +200,8 @@ if __name__ == '__main__':
         }
         is_allow=translator.is_allow_translate(translate_type=cfg['translate_type'],show_target=cfg['target_code'],return_str=True)
         if is_allow is not True:
-            return jsonify({"code":5,"msg":is_allow})
-        obj = tools.format_video(name, None)
-        obj['target_dir'] = TARGET_DIR + f'/{obj["uuid"]}'
-        obj['cache_folder'] = config.TEMP_DIR + f'/{obj["uuid"]}'
-        Path(obj['target_dir']).mkdir(parents=True, exist_ok=True)
-        cfg.update(obj)
-
-        config.box_trans = 'ing'
-        trk = TranslateSrt(cfg)
-        config.trans_queue.append(trk)
-        tools.set_process(text=f"Currently in queue No.{len(config.trans_queue)}",uuid=obj['uuid'])
-        return jsonify({'code': 0, 'task_id': obj['uuid']})
+            return {"code":5,"msg":is_allow}
+        return name, cfg, TranslateSrt, config.trans_queue, 'box_trans'
 
 
     # 第3个接口 /recogn
@@ -261,13 +242,15 @@ if __name__ == '__main__':
     """
     @app.route('/recogn', methods=['POST'])
     def recogn():
-        data = request.json
+        return jsonify(_submit('recogn', request.json))
+
+    def _recogn_job(data):
         # 从请求数据中获取参数
         name = data.get('name', '').strip()
         if not name:
-            return jsonify({"code": 1, "msg": "The parameter name is not allowed to be empty"})
+            return {"code": 1, "msg": "The parameter name is not allowed to be empty"}
         if not Path(name).is_file():
-            return jsonify({"code": 1, "msg": f"The file {name} is not exist"})
+            return {"code": 1, "msg": f"The file {name} is not exist"}
 
         cfg = {
             "recogn_type": int(data.get('recogn_type', 0)),
@@ -279,23 +262,12 @@ if __name__ == '__main__':
 
         is_allow=recognition.is_allow_lang(langcode=cfg['detect_language'],recogn_type=cfg['recogn_type'])
         if is_allow is not True:
-            return jsonify({"code":5,"msg":is_allow})
+            return {"code":5,"msg":is_allow}
 
         is_input=recognition.is_input_api(recogn_type=cfg['recogn_type'],return_str=True)
         if is_input is not True:
-            return jsonify({"code":5,"msg":is_input})
-
-
-        obj = tools.format_video(name, None)
-        obj['target_dir'] = TARGET_DIR + f'/{obj["uuid"]}'
-        obj['cache_folder'] = config.TEMP_DIR + f'/{obj["uuid"]}'
-        Path(obj['target_dir']).mkdir(parents=True, exist_ok=True)
-        cfg.update(obj)
-        config.box_recogn = 'ing'
-        trk = SpeechToText(cfg)
-        config.prepare_queue.append(trk)
-        tools.set_process(text=f"Currently in queue No.{len(config.prepare_queue)}",uuid=obj['uuid'])
-        return jsonify({'code': 0, 'task_id': obj['uuid']})
+            return {"code":5,"msg":is_input}
+        return name, cfg, SpeechToText, config.prepare_queue, 'box_recogn'
 
 
     # 第4个接口
@@ -369,12 +341,14 @@ if __name__ == '__main__':
     """
     @app.route('/trans_video', methods=['POST'])
     def trans_video():
-        data = request.json
+        return jsonify(_submit('trans_video', request.json))
+
+    def _trans_video_job(data):
         name = data.get('name', '')
         if not name:
-            return jsonify({"code": 1, "msg": "The parameter name is not allowed to be empty"})
+            return {"code": 1, "msg": "The parameter name is not allowed to be empty"}
         if not Path(name).exists():
-            return jsonify({"code": 1, "msg": f"The file {name} is not exist"})
+            return {"code": 1, "msg": f"The file {name} is not exist"}
 
         cfg = {
             # 通用
@@ -417,38 +391,134 @@ if __name__ == '__main__':
         if not cfg['subtitles']:
             is_allow = recognition.is_allow_lang(langcode=cfg['target_language'], recogn_type=cfg['recogn_type'])
             if is_allow is not True:
-                return jsonify({"code": 5, "msg": is_allow})
+                return {"code": 5, "msg": is_allow}
 
             is_input = recognition.is_input_api(recogn_type=cfg['recogn_type'], return_str=True)
             if is_input is not True:
-                return jsonify({"code": 5, "msg": is_input})
+                return {"code": 5, "msg": is_input}
         if cfg['source_language'] != cfg['target_language']:
             is_allow=translator.is_allow_translate(translate_type=cfg['translate_type'],show_target=cfg['target_language'],return_str=True)
             if is_allow is not True:
-                return jsonify({"code":5,"msg":is_allow})
+                return {"code":5,"msg":is_allow}
 
         if cfg['voice_role'] and cfg['voice_role'].lower()!='no' and cfg['target_language']:
             is_allow_lang = tts_model.is_allow_lang(langcode=cfg['target_language'], tts_type=cfg['tts_type'])
             if is_allow_lang is not True:
-                return jsonify({"code": 4, "msg": is_allow_lang})
+                return {"code": 4, "msg": is_allow_lang}
             is_input_api = tts_model.is_input_api(tts_type=cfg['tts_type'], return_str=True)
             if is_input_api is not True:
-                return jsonify({"code": 5, "msg": is_input_api})
+                return {"code": 5, "msg": is_input_api}
+        return name, cfg, TransCreate, config.prepare_queue, 'current_status'
 
 
+    job_builders = {
+        'tts': _tts_job,
+        'translate_srt': _translate_srt_job,
+        'recogn': _recogn_job,
+        'trans_video': _trans_video_job,
+    }
+    # 查找已有任务和创建新任务之间加锁，同一批次中的重复项不会各自创建任务
+    submit_lock = threading.Lock()
 
+    def _existing_task(key):
+        # 同一 key 的任务仍在执行或已成功且结果仍在时返回其 uuid，否则删除记录
+        found = submissions.lookup(key)
+        if not found:
+            return None
+        uuid, done = found
+        data = status_store.get(uuid)
+        has_files = len(_get_files_in_directory(f'{TARGET_DIR}/{uuid}')) > 0
+        if data is None and done and has_files:
+            # 重启后内存中没有该任务的状态，按已成功处理
+            status_store.put(uuid, {"type": "succeed", "text": ""})
+            return uuid
+        if data is not None and (data['type'] in logs_status_list or (data['type'] == 'succeed' and has_files)):
+            return uuid
+        submissions.forget(key)
+        return None
+
+    def _start_task(name, cfg, task_cls, queue, status_flag):
         obj = tools.format_video(name, None)
         obj['target_dir'] = TARGET_DIR + f'/{obj["uuid"]}'
         obj['cache_folder'] = config.TEMP_DIR + f'/{obj["uuid"]}'
         Path(obj['target_dir']).mkdir(parents=True, exist_ok=True)
         cfg.update(obj)
+        setattr(config, status_flag, 'ing')
+        trk = task_cls(cfg=cfg)
+        queue.append(trk)
+        tools.set_process(text=f"Currently in queue No.{len(queue)}",uuid=obj['uuid'])
+        return obj['uuid']
+
+    def _submit(kind, data):
+        """
+        校验参数并创建任务，输入文件内容和配置均相同的任务已存在时直接返回它，reused 为 True
+        data 中 force 为 True 时总是创建新任务
+        """
+        if not isinstance(data, dict):
+            return {"code": 1, "msg": "The request data must be a json object"}
+        job = job_builders[kind](data)
+        if isinstance(job, dict):
+            return job
+        name, cfg, task_cls, queue, status_flag = job
+        key = None
+        if Path(name).is_file():
+            try:
+                key = submissions.make_key(kind, name, cfg)
+            except OSError as e:
+                config.logger.warning(f'计算任务 key 失败:{e}')
+        with submit_lock:
+            if key and not data.get('force'):
+                uuid = _existing_task(key)
+                if uuid:
+                    return {'code': 0, 'task_id': uuid, 'reused': True}
+            uuid = _start_task(name, cfg, task_cls, queue, status_flag)
+            if key:
+                submissions.record(key, uuid)
+        return {'code': 0, 'task_id': uuid}
+
+    # 批量提交接口
+    """
+    一次提交多个任务，按顺序返回每个任务的结果
 
-        config.current_status = 'ing'
-        trk = TransCreate(cfg=cfg)
-        config.prepare_queue.append(trk)
-        tools.set_process(text=f"Currently in queue No.{len(config.prepare_queue)}",uuid=obj['uuid'])
-        #
-        return jsonify({'code': 0, 'task_id': obj['uuid']})
+    请求数据类型: Content-Type:application/json
+
+    请求参数:
+    jobs:必须参数，列表类型，每项为一个任务，type 为接口名 tts|translate_srt|recogn|trans_video，其余参数与对应接口相同
+        可选参数 force:布尔类型，默认False，为 True 时即使已有相同任务也重新执行
+
+    输入文件内容和参数均相同的任务只执行一次，重复提交(包括同一批次中的重复项)返回已有任务的 task_id 且 reused 为 true，
+    已有任务仍在执行时可继续查询进度，已成功时可直接通过 task_status 获取结果；已有任务失败、停止或结果文件已删除时重新执行
+    单个提交的接口 /tts /translate_srt /recogn /trans_video 同样去重
+
+    返回数据:
+    {"code":0,"msg":"ok","data":[{"code":0,"task_id":任务id}, {"code":0,"task_id":任务id,"reused":true}, {"code":1,"msg":"错误信息"}]}
+    jobs 为空时返回 {"code":1,"msg":"错误信息"}
+
+    示例
+    def test_batch_submit():
+        res=requests.post("http://127.0.0.1:9011/batch_submit",json={"jobs":[
+            {"type":"recogn","name":"C:/Users/c1/Videos/1.mp4","recogn_type":0,"model_name":"tiny","detect_language":"zh"},
+            {"type":"translate_srt","name":"C:/Users/c1/Videos/1.srt","target_language":"en","translate_type":0},
+        ]})
+        print(res.json())
+    """
+    @app.route('/batch_submit', methods=['POST'])
+    def batch_submit():
+        jobs = (request.json or {}).get('jobs')
+        if not jobs or not isinstance(jobs, list):
+            return jsonify({"code": 1, "msg": "The parameter jobs is not allowed to be empty"})
+        results = []
+        for job in jobs:
+            kind = job.get('type') if isinstance(job, dict) else None
+            if kind not in job_builders:
+                results.append({"code": 1, "msg": f"Unknown job type {kind}"})
+                continue
+            try:
+                results.append(_submit(kind, job))
+            except Exception as e:
+                config.logger.exception(e, exc_info=True)
+                results.append({"code": 1, "msg": str(e)})
+        return jsonify({"code": 0, "msg": "ok", "data": results})
 
 
     # 获取任务进度
@@ -524,269 +594,159 @@ if __name__ == '__main__':
 
 
 
-        # ===================== HearSight Q&A/Search (no-upload) =====================
-        # Simple retrieval over generated SRTs under TARGET_DIR, to support search/ask
-        def _iter_srt_files(video_id: str = None, lang: str = None):
-            try:
-                for p in Path(TARGET_DIR).rglob('*.srt'):
-                    if video_id and p.parent.name != str(video_id):
-                        continue
-                    if lang:
-                        fname = p.name.lower()
-                        if (f'.{lang.lower()}.srt' not in fname) and (f'-{lang.lower()}.srt' not in fname) and (f'_{lang.lower()}.srt' not in fname):
-                            continue
-                    yield p
-            except Exception:
-                return
-
-        def _read_srt_segments(srt_path: Path):
-            try:
-                return tools.get_subtitle_from_srt(srt_path.as_posix(), is_file=True)
-            except Exception:
-                return []
-
-        def _find_video_in_dir(d: Path):
-            try:
-                # heuristic: prefer mp4
-                for ext in ['.mp4', '.mkv', '.mov', '.webm']:
-                    for f in d.glob(f'*{ext}'):
-                        return f
-            except Exception:
-                pass
-            return None
+    # ===================== HearSight Q&A/Search (no-upload) =====================
+    # Retrieval over generated SRTs under TARGET_DIR via the persistent index in task/_srt_index.py
+    def _tokenize(text: str):
+        import re as _re
+        return [w for w in _re.split(r'\s+', (text or '').lower().strip()) if w]
 
-        def _tokenize(text: str):
+    def _highlight(text: str, tokens):
+        t = text or ''
+        try:
             import re as _re
-            return [w for w in _re.split(r'\s+', (text or '').lower().strip()) if w]
-
-        def _highlight(text: str, tokens):
-            t = text or ''
-            try:
-                import re as _re
-                def repl(m):
-                    return f"<em>{m.group(0)}</em>"
-                for tok in sorted(set(tokens or []), key=lambda x: -len(x)):
-                    if not tok:
-                        continue
-                    t = _re.sub(_re.escape(tok), repl, t, flags=_re.IGNORECASE)
-            except Exception:
-                pass
-            return t
-
-        def _search_segments(query: str, limit: int = 20, offset: int = 0, video_id: str = None, lang: str = None, mode: str = 'auto', context_span: int = 0):
-            """
-            mode: 'auto'|'any'|'all'|'phrase'
-            context_span: include N previous and N next segments around a hit
-            """
-            q = (query or '').strip()
-            if not q:
-                return []
-            tokens = _tokenize(q)
-            phrase = q.lower()
-            # gather corpus
-            corpus = []  # list of dict: {srt_path, segments, uuid, video_url, subtitle_url, subtitle_lang}
-            total_segments = 0
-            for srt_path in _iter_srt_files(video_id=video_id, lang=lang):
-                segs = _read_srt_segments(srt_path)
-                if not segs:
+            def repl(m):
+                return f"<em>{m.group(0)}</em>"
+            for tok in sorted(set(tokens or []), key=lambda x: -len(x)):
+                if not tok:
                     continue
-                uuid = srt_path.parent.name
-                video_file = _find_video_in_dir(srt_path.parent)
-                base = f"{request.scheme}://{request.host}/{API_RESOURCE}/{uuid}"
-                video_url = f"{base}/{video_file.name}" if video_file else None
-                subtitle_url = f"{base}/{srt_path.name}"
-                subtitle_lang = ''
-                fname = srt_path.name
-                # naive lang extraction
-                for sep in ['.', '-', '_']:
-                    parts = fname.split(sep)
-                    if len(parts) >= 2 and parts[-1].lower().endswith('srt'):
-                        subtitle_lang = parts[-2].lower()
-                        break
-                corpus.append({
-                    'srt_path': srt_path,
-                    'segments': segs,
-                    'uuid': uuid,
-                    'video_url': video_url,
-                    'subtitle_url': subtitle_url,
-                    'subtitle_lang': subtitle_lang,
-                })
-                total_segments += len(segs)
-            if total_segments == 0:
-                return []
-            # build df for idf over tokens
-            from collections import defaultdict
-            df = defaultdict(int)
-            for c in corpus:
-                for seg in c['segments']:
-                    text = str(seg.get('text', '')).lower()
-                    seen = set()
-                    for tok in tokens:
-                        if tok and tok in text:
-                            seen.add(tok)
-                    for tok in seen:
-                        df[tok] += 1
-            import math
-            idf = {tok: math.log((total_segments + 1) / (df.get(tok, 0) + 1)) + 1.0 for tok in tokens}
-            # scoring
-            items = []
-            for c in corpus:
-                segs = c['segments']
-                for idx, seg in enumerate(segs):
-                    text = str(seg.get('text', '')).strip()
-                    tl = text.lower()
-                    if mode == 'phrase' and phrase not in tl:
-                        continue
-                    if mode == 'all' and any(tok not in tl for tok in tokens if tok):
-                        continue
-                    # tf-idf + phrase boost
-                    score = 0.0
-                    for tok in tokens:
-                        if not tok:
-                            continue
-                        tf = tl.count(tok)
-                        if tf:
-                            score += tf * idf.get(tok, 1.0)
-                    if phrase and phrase in tl:
-                        score += 10.0 + tl.count(phrase)
-                    if score <= 0:
-                        # 'any' or 'auto' with no token hits -> skip
-                        continue
-                    st_ms = int(seg.get('start_time', 0))
-                    et_ms = int(seg.get('end_time', 0))
-                    node = {
-                        'index': int(seg.get('line', 0) or 0),
-                        'text': text,
-                        'text_highlight': _highlight(text, tokens),
-                        'start_time': round(st_ms / 1000.0, 3),
-                        'end_time': round(et_ms / 1000.0, 3),
-                    }
-                    item = {
-                        'video_id': c['uuid'],
-                        'video_title': Path(c['srt_path']).stem,
-                        'video_url': c['video_url'],
-                        'video_time_url': (f"{c['video_url']}?t={int(node['start_time'])}" if c['video_url'] else None),
-                        'subtitle_url': c['subtitle_url'],
-                        'subtitle_lang': c['subtitle_lang'],
-                        'node': node,
-                        '_score': score,
-                    }
-                    # context window
-                    if context_span and isinstance(context_span, int) and context_span > 0:
-                        ctx = []
-                        for j in range(max(0, idx - context_span), min(len(segs), idx + context_span + 1)):
-                            if j == idx:
-                                continue
-                            s2 = segs[j]
-                            ctx.append({
-                                'index': int(s2.get('line', 0) or 0),
-                                'text': str(s2.get('text', '')).strip(),
-                                'start_time': round(int(s2.get('start_time', 0)) / 1000.0, 3),
-                                'end_time': round(int(s2.get('end_time', 0)) / 1000.0, 3),
-                            })
-                        if ctx:
-                            item['context'] = ctx
-                    items.append(item)
-            items.sort(key=lambda x: x.get('_score', 0.0), reverse=True)
-            start = max(0, int(offset or 0))
-            end = start + max(1, int(limit or 20))
-            sliced = items[start:end]
-            for it in sliced:
-                it.pop('_score', None)
-            return sliced
-
-        @app.route('/search_nodes', methods=['GET', 'POST'])
-        def search_nodes():
-            # support: query, limit, offset, video_id, lang, mode ('auto'|'any'|'all'|'phrase'), context_span
-            data = request.json or {}
-            q = request.args.get('query') if request.method == 'GET' else data.get('query')
-            if not q or not str(q).strip():
-                return jsonify({"code": 1, "msg": "query is required"}), 400
-            try:
-                limit = int(request.args.get('limit') or data.get('limit') or 20)
-            except Exception:
-                limit = 20
-            try:
-                offset = int(request.args.get('offset') or data.get('offset') or 0)
-            except Exception:
-                offset = 0
-            video_id = request.args.get('video_id') or data.get('video_id')
-            lang = request.args.get('lang') or data.get('lang')
-            mode = (request.args.get('mode') or data.get('mode') or 'auto').lower()
-            try:
-                context_span = int(request.args.get('context_span') or data.get('context_span') or 0)
-            except Exception:
-                context_span = 0
-            items = _search_segments(str(q).strip(), limit=limit, offset=offset, video_id=video_id, lang=lang, mode=mode, context_span=context_span)
-            return jsonify({"code": 0, "msg": "ok", "items": items})
-
-        def _llm_chat(messages, api=None, key=None, model=None, **kwargs):
-            import requests as _req
-            base_url = (api or config.settings.get('chatgpt_api') or '').strip()
-            api_key = (key or config.settings.get('chatgpt_key') or '').strip()
-            model_name = (model or config.settings.get('chatgpt_model') or '').strip() or 'gpt-4o-mini'
-            if not base_url or not api_key:
-                raise RuntimeError('LLM api or key not configured')
-            url = base_url.rstrip('/') + '/chat/completions'
-            headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-            payload = {"model": model_name, "messages": messages}
-            payload.update(kwargs or {})
-            r = _req.post(url, json=payload, headers=headers, timeout=60)
-            if not r.ok:
-                raise RuntimeError(f"LLM error {r.status_code}: {r.text}")
-            data = r.json()
-            return (data.get('choices') or [{}])[0].get('message', {}).get('content', '')
-
-        @app.route('/ask', methods=['POST'])
-        def ask():
-            data = request.json or {}
-            question = str(data.get('question', '')).strip()
-            if not question:
-                return jsonify({"code": 1, "msg": "question is required"}), 400
-            top_k = int(data.get('top_k', 10))
-            video_id = data.get('video_id')
-            lang = data.get('lang')
-            mode = (data.get('mode') or 'auto').lower()
-            context_span = int(data.get('context_span', 0) or 0)
-            # retrieval
-            ctx_items = _search_segments(question, limit=top_k, video_id=video_id, lang=lang, mode=mode, context_span=context_span)
-            # Build textual context for LLM
-            context_lines = []
+                t = _re.sub(_re.escape(tok), repl, t, flags=_re.IGNORECASE)
+        except Exception:
+            pass
+        return t
+
+    def _search_segments(query: str, limit: int = 20, offset: int = 0, video_id: str = None, lang: str = None, mode: str = 'auto', context_span: int = 0):
+        """
+        mode: 'auto'|'any'|'all'|'phrase'
+        context_span: include N previous and N next segments around a hit
+        """
+        q = (query or '').strip()
+        if not q:
+            return []
+        tokens = _tokenize(q)
+        hits = srt_index.search(TARGET_DIR, q, tokens, limit=limit, offset=offset, video_id=video_id, lang=lang,
+                                mode=mode, context_span=context_span)
+        items = []
+        for h in hits:
+            base = f"{request.scheme}://{request.host}/{API_RESOURCE}/{h['uuid']}"
+            video_url = f"{base}/{h['video']}" if h['video'] else None
+            node = {
+                'index': h['line'],
+                'text': h['text'],
+                'text_highlight': _highlight(h['text'], tokens),
+                'start_time': round(h['start_ms'] / 1000.0, 3),
+                'end_time': round(h['end_ms'] / 1000.0, 3),
+            }
+            item = {
+                'video_id': h['uuid'],
+                'video_title': Path(h['name']).stem,
+                'video_url': video_url,
+                'video_time_url': (f"{video_url}?t={int(node['start_time'])}" if video_url else None),
+                'subtitle_url': f"{base}/{h['name']}",
+                'subtitle_lang': h['lang'],
+                'node': node,
+            }
+            if h.get('context'):
+                item['context'] = [{
+                    'index': c['line'],
+                    'text': c['text'],
+                    'start_time': round(c['start_ms'] / 1000.0, 3),
+                    'end_time': round(c['end_ms'] / 1000.0, 3),
+                } for c in h['context']]
+            items.append(item)
+        return items
+
+    @app.route('/search_nodes', methods=['GET', 'POST'])
+    def search_nodes():
+        # support: query, limit, offset, video_id, lang, mode ('auto'|'any'|'all'|'phrase'), context_span
+        data = request.get_json(silent=True) or {}
+        q = request.args.get('query') if request.method == 'GET' else data.get('query')
+        if not q or not str(q).strip():
+            return jsonify({"code": 1, "msg": "query is required"}), 400
+        try:
+            limit = int(request.args.get('limit') or data.get('limit') or 20)
+        except Exception:
+            limit = 20
+        try:
+            offset = int(request.args.get('offset') or data.get('offset') or 0)
+        except Exception:
+            offset = 0
+        video_id = request.args.get('video_id') or data.get('video_id')
+        lang = request.args.get('lang') or data.get('lang')
+        mode = (request.args.get('mode') or data.get('mode') or 'auto').lower()
+        try:
+            context_span = int(request.args.get('context_span') or data.get('context_span') or 0)
+        except Exception:
+            context_span = 0
+        items = _search_segments(str(q).strip(), limit=limit, offset=offset, video_id=video_id, lang=lang, mode=mode, context_span=context_span)
+        return jsonify({"code": 0, "msg": "ok", "items": items})
+
+    def _llm_chat(messages, api=None, key=None, model=None, **kwargs):
+        import requests as _req
+        base_url = (api or config.settings.get('chatgpt_api') or '').strip()
+        api_key = (key or config.settings.get('chatgpt_key') or '').strip()
+        model_name = (model or config.settings.get('chatgpt_model') or '').strip() or 'gpt-4o-mini'
+        if not base_url or not api_key:
+            raise RuntimeError('LLM api or key not configured')
+        url = base_url.rstrip('/') + '/chat/completions'
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        payload = {"model": model_name, "messages": messages}
+        payload.update(kwargs or {})
+        r = _req.post(url, json=payload, headers=headers, timeout=60)
+        if not r.ok:
+            raise RuntimeError(f"LLM error {r.status_code}: {r.text}")
+        data = r.json()
+        return (data.get('choices') or [{}])[0].get('message', {}).get('content', '')
+
+    @app.route('/ask', methods=['POST'])
+    def ask():
+        data = request.get_json(silent=True) or {}
+        question = str(data.get('question', '')).strip()
+        if not question:
+            return jsonify({"code": 1, "msg": "question is required"}), 400
+        top_k = int(data.get('top_k', 10))
+        video_id = data.get('video_id')
+        lang = data.get('lang')
+        mode = (data.get('mode') or 'auto').lower()
+        context_span = int(data.get('context_span', 0) or 0)
+        # retrieval
+        ctx_items = _search_segments(question, limit=top_k, video_id=video_id, lang=lang, mode=mode, context_span=context_span)
+        # Build textual context for LLM
+        context_lines = []
+        for i, it in enumerate(ctx_items, 1):
+            n = it.get('node', {})
+            context_lines.append(f"[{i}] {it.get('video_title')} @ {n.get('start_time')}-{n.get('end_time')}s: {n.get('text')}")
+        context_text = "\n".join(context_lines) if context_lines else "(no context found)"
+        system = (
+            "You are a helpful assistant for video knowledge Q&A. Answer concisely using the provided segments. "
+            "Cite references as [index] when relevant. If unsure, say you don't know."
+        )
+        user_msg = (
+            f"Question: {question}\n\nRelevant segments:\n{context_text}\n\n"
+            "Answer in the user's language."
+        )
+        try:
+            answer = _llm_chat([
+                {"role": "system", "content": system},
+                {"role": "user", "content": user_msg},
+            ], api=data.get('base_url'), key=data.get('api_key'), model=data.get('model'), temperature=0.2)
+            # citations for UI
+            citations = []
             for i, it in enumerate(ctx_items, 1):
                 n = it.get('node', {})
-                context_lines.append(f"[{i}] {it.get('video_title')} @ {n.get('start_time')}-{n.get('end_time')}s: {n.get('text')}")
-            context_text = "\n".join(context_lines) if context_lines else "(no context found)"
-            system = (
-                "You are a helpful assistant for video knowledge Q&A. Answer concisely using the provided segments. "
-                "Cite references as [index] when relevant. If unsure, say you don't know."
-            )
-            user_msg = (
-                f"Question: {question}\n\nRelevant segments:\n{context_text}\n\n"
-                "Answer in the user's language."
-            )
-            try:
-                answer = _llm_chat([
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user_msg},
-                ], api=data.get('base_url'), key=data.get('api_key'), model=data.get('model'), temperature=0.2)
-                # citations for UI
-                citations = []
-                for i, it in enumerate(ctx_items, 1):
-                    n = it.get('node', {})
-                    citations.append({
-                        'ref': i,
-                        'video_id': it.get('video_id'),
-                        'video_title': it.get('video_title'),
-                        'video_url': it.get('video_url'),
-                        'video_time_url': it.get('video_time_url'),
-                        'start_time': n.get('start_time'),
-                        'end_time': n.get('end_time'),
-                        'text': n.get('text'),
-                    })
-                return jsonify({"code": 0, "msg": "ok", "answer": answer, "contexts": ctx_items, "citations": citations})
-            except Exception as e:
-                return jsonify({"code": 2, "msg": f"LLM error: {e}", "contexts": ctx_items}), 500
-        # =================== END HearSight Q&A/Search ===================
+                citations.append({
+                    'ref': i,
+                    'video_id': it.get('video_id'),
+                    'video_title': it.get('video_title'),
+                    'video_url': it.get('video_url'),
+                    'video_time_url': it.get('video_time_url'),
+                    'start_time': n.get('start_time'),
+                    'end_time': n.get('end_time'),
+                    'text': n.get('text'),
+                })
+            return jsonify({"code": 0, "msg": "ok", "answer": answer, "contexts": ctx_items, "citations": citations})
+        except Exception as e:
+            return jsonify({"code": 2, "msg": f"LLM error: {e}", "contexts": ctx_items}), 500
+    # =================== END HearSight Q&A/Search ===================
 
 
 
@@ -805,22 +765,101 @@ if __name__ == '__main__':
             return_data[task_id]=_get_task_data(task_id)
         return jsonify({"code": 0, "msg": "ok","data":return_data})
 
-    def _get_task_data(task_id):
-        file = PROCESS_INFO + f'/{task_id}.json'
-        if not Path(file).is_file():
-            if task_id in config.uuid_logs_queue:
-                return {"code": -1, "msg": _get_order(task_id)}
+    # 同时打开的事件流，每个占用一个 waitress 线程
+    events_max_streams = max(1, int(float(config.settings.get('api_events_max_streams', 16))))
+    events_slots = threading.BoundedSemaphore(events_max_streams)
 
-            return {"code": 1, "msg": f"该任务 {task_id} 不存在"}
+    """
+    任务进度事件流 Server-Sent Events，替代轮询 /task_status
+
+    请求方式: GET /task_events/<task_id>
+    断线重连时浏览器 EventSource 会自动携带 Last-Event-ID 请求头，从该位置继续
 
+    事件:
+    event: stage     任务被某阶段开始处理，data 为 {"stage": "prepare|regcon|trans|dubb|align|assemb"}
+    event: progress  进度变化，data 与 /task_status 返回一致，如 {"code": -1, "msg": "当前处于配音队列第2位"}
+    event: end       任务结束，data 与 /task_status 返回一致，code=0 时包含结果文件，之后服务端关闭连接
+    每秒最多推送 api_events_max_rate 次进度，其间的多次更新合并为最后一次，阶段事件不合并
+    无更新时每 api_events_heartbeat 秒发送一次注释行 ": ping" 作为心跳
+
+    失败时返回 json: 任务不存在 404，事件流数量超过 api_events_max_streams 时 503，此时应改用轮询
+    """
+    @app.route('/task_events/<task_id>', methods=['GET'])
+    def task_events(task_id):
+        if status_store.get(task_id) is None:
+            return jsonify({"code": 1, "msg": f"该任务 {task_id} 不存在"}), 404
+        if not events_slots.acquire(blocking=False):
+            return jsonify({"code": 1, "msg": "Too many event streams, please poll /task_status"}), 503
         try:
-            data = json.loads(Path(file).read_text(encoding='utf-8'))
-        except Exception as e:
-            return {"code": -1, "msg": Path(file).read_text(encoding='utf-8')}
+            last_version = int(request.headers.get('Last-Event-ID') or 0)
+        except ValueError:
+            last_version = 0
+        try:
+            min_interval = 1 / max(0.1, float(config.settings.get('api_events_max_rate', 5)))
+            heartbeat = max(1.0, float(config.settings.get('api_events_heartbeat', 15)))
+        except (TypeError, ValueError):
+            min_interval, heartbeat = 0.2, 15.0
+
+        def _event(name, version, data):
+            return f'id: {version}\nevent: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+        # 内存中已没有该任务，但 SQLite 中仍有记录(已结束后被移除或重启前的任务)，状态不会再变化
+        # 以 end 事件结束，否则 EventSource 会不断重连
+        def _final_event(version):
+            data = status_store.get(task_id)
+            if data is None:
+                return ''
+            return _event('end', max(version, data['version']), _get_task_data(task_id))
+
+        def generate():
+            version = last_version
+            last_sent = 0.0
+            yield 'retry: 3000\n\n'
+            while True:
+                snap = status_store.wait(task_id, version, timeout=heartbeat)
+                if snap is None:
+                    yield _final_event(version)
+                    return
+                if snap['version'] <= version:
+                    yield ': ping\n\n'
+                    continue
+                # 距上次推送不足最小间隔时等待，期间的更新合并为一次
+                delay = last_sent + min_interval - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                snap, recent = status_store.changes(task_id, version)
+                if snap is None:
+                    yield _final_event(version)
+                    return
+                for v, msg_type, text in recent:
+                    if msg_type == 'stage':
+                        yield _event('stage', v, {"stage": text})
+                version = snap['version']
+                last_sent = time.time()
+                if snap['type'] in end_status_list:
+                    yield _event('end', version, _get_task_data(task_id))
+                    return
+                yield _event('progress', version, _get_task_data(task_id))
+
+        resp = Response(stream_with_context(generate()), mimetype='text/event-stream')
+        resp.headers['Cache-Control'] = 'no-cache'
+        # 反向代理不缓冲事件流
+        resp.headers['X-Accel-Buffering'] = 'no'
+        resp.call_on_close(events_slots.release)
+        return resp
+
+    def _get_task_data(task_id):
+        data = status_store.get(task_id)
+        if data is None:
+            return {"code": 1, "msg": f"该任务 {task_id} 不存在"}
 
         if data['type'] == 'error':
             return {"code": 3, "msg": data["text"]}
         if data['type'] in logs_status_list:
+            # 仍在某个阶段队列中等待时返回实时排队位置
+            order = _get_order(task_id)
+            if order:
+                return {"code": -1, "msg": order}
             text=data.get('text','').strip()
             return {"code": -1, "msg": text if text else '等待处理中'}
         # 完成，输出所有文件
@@ -837,40 +876,23 @@ if __name__ == '__main__':
             }
         }
 
-    # 排队
+    # 各阶段队列及排队提示
+    stage_queue_names = [
+        (config.prepare_queue, '预处理', 'preprocessing'),
+        (config.regcon_queue, '语音识别', 'speech recognition'),
+        (config.trans_queue, '字幕翻译', 'subtitle translation'),
+        (config.dubb_queue, '配音', 'dubbing'),
+        (config.align_queue, '声画对齐', 'alignment'),
+        (config.assemb_queue, '输出整理', 'assembly'),
+    ]
+
+    # 排队，不在任何队列中时返回空字符串
     def _get_order(task_id):
-        order_num=0
-        for it in config.prepare_queue:
-            order_num+=1
-            if it.uuid == task_id:
-                return f'当前处于预处理队列第{order_num}位' if config.defaulelang=='zh' else f"No.{order_num} on perpare queue"
-
-        order_num=0
-        for it in config.regcon_queue:
-            order_num+=1
-            if it.uuid == task_id:
-                return f'当前处于语音识别队列第{order_num}位' if config.defaulelang=='zh' else f"No.{order_num} on perpare queue"
-        order_num=0
-        for it in config.trans_queue:
-            order_num+=1
-            if it.uuid == task_id:
-                return f'当前处于字幕翻译队列第{order_num}位' if config.defaulelang=='zh' else f"No.{order_num} on perpare queue"
-        order_num=0
-        for it in config.dubb_queue:
-            order_num+=1
-            if it.uuid == task_id:
-                return f'当前处于配音队列第{order_num}位' if config.defaulelang=='zh' else f"No.{order_num} on perpare queue"
-        order_num=0
-        for it in config.align_queue:
-            order_num+=1
-            if it.uuid == task_id:
-                return f'当前处于声画对齐队列第{order_num}位' if config.defaulelang=='zh' else f"No.{order_num} on perpare queue"
-        order_num=0
-        for it in config.assemb_queue:
-            order_num+=1
-            if it.uuid == task_id:
-                return f'当前处于输出整理队列第{order_num}位' if config.defaulelang=='zh' else f"No.{order_num} on perpare queue"
-        return '正在排队等待执行中，请稍后' if config.defaulelang=='zh' else f"Waiting in queue"
+        for q, zh_name, en_name in stage_queue_names:
+            order_num = q.position(task_id)
+            if order_num:
+                return f'当前处于{zh_name}队列第{order_num}位' if config.defaulelang=='zh' else f"No.{order_num} on {en_name} queue"
+        return ''
 
     def _get_files_in_directory(dirname):
         """
@@ -892,48 +914,29 @@ if __name__ == '__main__':
             return []
 
 
-    def _listen_queue():
-        # 监听队列日志 uuid_logs_queue 不在停止中的 stoped_uuid_set
-        Path(TARGET_DIR + f'/processinfo').mkdir(parents=True, exist_ok=True)
-        while 1:
-            # 找出未停止的
-            uuid_list = list(config.uuid_logs_queue.keys())
-            uuid_list = [uuid for uuid in uuid_list if uuid not in config.stoped_uuid_set]
-            # 全部结束
-            if len(uuid_list) < 1:
-                time.sleep(1)
-                continue
-            while len(uuid_list) > 0:
-                uuid = uuid_list.pop(0)
-                if uuid in config.stoped_uuid_set:
-                    continue
-                try:
-                    q = config.uuid_logs_queue.get(uuid)
-                    if not q:
-                        continue
-                    data = q.get(block=False)
-                    if not data:
-                        continue
-
-                    if data['type'] not in end_status_list + logs_status_list:
-                        continue
-                    with open(PROCESS_INFO + f'/{uuid}.json', 'w', encoding='utf-8') as f:
-                        f.write(json.dumps(data))
-                    if data['type'] in end_status_list:
-                        config.stoped_uuid_set.add(uuid)
-                        del config.uuid_logs_queue[uuid]
-                except Exception:
-                    pass
-            time.sleep(0.1)
+    def _on_status(uuid, data):
+        # set_process 的消息直接写入状态存储，在产生消息的线程中执行
+        if data['type'] not in end_status_list + logs_status_list + ['stage']:
+            return
+        status_store.put(uuid, data)
+        if data['type'] in end_status_list:
+            config.stoped_uuid_set.add(uuid)
+        if data['type'] == 'succeed':
+            submissions.mark_done(uuid)
+            # 将本任务生成的字幕加入检索索引
+            threading.Thread(target=srt_index.update_dir, args=(f'{TARGET_DIR}/{uuid}',), daemon=True).start()
 
     multiprocessing.freeze_support()  # Windows 上需要这个来避免子进程的递归执行问题
     print(f'Starting... API URL is   http://{HOST}:{PORT}')
     print('Document: local')
     start_thread()
-    threading.Thread(target=_listen_queue).start()
+    config.push_listeners.append(_on_status)
+    # 启动时将字幕检索索引与 apidata 下已有的字幕同步
+    threading.Thread(target=srt_index.reconcile, args=(TARGET_DIR,), daemon=True).start()
     try:
         print(f'\nAPI URL is   http://{HOST}:{PORT}')
-        serve(app, host=HOST, port=int(PORT))
+        # 除事件流外保留 waitress 默认的 4 个线程处理普通请求
+        serve(app, host=HOST, port=int(PORT), threads=4 + events_max_streams)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,100 @@
+import runpy
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.task import _task_status as status_store
+
+API_FILE = Path(__file__).resolve().parent.parent / 'api.py'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # 不启动工作线程和 waitress，只取得 Flask app
+    import waitress
+    from videotrans.task import job
+
+    monkeypatch.setattr(waitress, 'serve', lambda *args, **kwargs: None)
+    monkeypatch.setattr(job, 'start_thread', lambda *args, **kwargs: None)
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(config, 'exec_mode', config.exec_mode)
+    monkeypatch.setattr(sys, 'argv', [API_FILE.as_posix()])
+    monkeypatch.setattr(status_store, '_tasks', {})
+    monkeypatch.setattr(status_store, '_finished', OrderedDict())
+    monkeypatch.setattr(status_store, '_dirty', set())
+    monkeypatch.setattr(status_store, '_local', threading.local())
+    monkeypatch.setattr(status_store, 'FLUSH_INTERVAL', 0.05)
+    monkeypatch.setitem(config.settings, 'api_status_persist', False)
+    listeners = list(config.push_listeners)
+    g = runpy.run_path(API_FILE.as_posix(), run_name='__main__')
+    yield g['app'].test_client()
+    config.push_listeners[:] = listeners
+
+
+def _events(resp):
+    events = []
+    for block in resp.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append(fields)
+    return events
+
+
+def test_task_events_stream(client, monkeypatch):
+    monkeypatch.setitem(config.settings, 'api_events_max_rate', 100)
+    assert client.get('/task_events/nope').status_code == 404
+
+    status_store.put('e1', {'text': 'start', 'type': 'logs'})
+
+    def _run():
+        for text, msg_type in (('trans', 'stage'), ('translating', 'logs'), ('done', 'succeed')):
+            time.sleep(0.05)
+            status_store.put('e1', {'text': text, 'type': msg_type})
+
+    threading.Thread(target=_run, daemon=True).start()
+    resp = client.get('/task_events/e1')
+    assert resp.mimetype == 'text/event-stream'
+    events = _events(resp)
+    names = [e['event'] for e in events]
+    assert 'stage' in names and names[-1] == 'end'
+    assert events[names.index('stage')]['data'] == '{"stage": "trans"}'
+    assert [int(e['id']) for e in events] == sorted(int(e['id']) for e in events)
+
+
+def test_task_events_end_for_task_not_in_memory(client, monkeypatch):
+    monkeypatch.setitem(config.settings, 'api_status_persist', True)
+    status_store.put('e2', {'text': 'done', 'type': 'succeed'})
+    deadline = time.time() + 3
+    while status_store._dirty and time.time() < deadline:
+        time.sleep(0.02)
+    # 已结束的任务从内存中移除后只能从 SQLite 查到
+    monkeypatch.setattr(status_store, '_tasks', {})
+    assert status_store.get('e2')['type'] == 'succeed'
+    events = _events(client.get('/task_events/e2'))
+    assert [e['event'] for e in events] == ['end']
+
+
+def test_search_nodes_get_and_post(client, monkeypatch):
+    from videotrans.task import _srt_index as srt_index
+
+    monkeypatch.setattr(srt_index, '_local', threading.local())
+    task_dir = Path(config.ROOT_DIR) / 'apidata' / 'task1'
+    task_dir.mkdir(parents=True)
+    (task_dir / 'video.en.srt').write_text('1\n00:00:01,000 --> 00:00:02,000\nhello search world\n',
+                                           encoding='utf-8')
+    srt_index.update_dir(task_dir.as_posix())
+
+    # GET 请求没有 JSON 请求体
+    resp = client.get('/search_nodes?query=search')
+    assert resp.status_code == 200
+    assert [it['node']['text'] for it in resp.get_json()['items']] == ['hello search world']
+    resp = client.post('/search_nodes', json={'query': 'world', 'video_id': 'task1'})
+    assert [it['video_id'] for it in resp.get_json()['items']] == ['task1']
+    assert client.get('/search_nodes').status_code == 400
+    # 非 JSON 请求体返回参数错误而不是 415
+    assert client.post('/ask', data='question=hi').status_code == 400
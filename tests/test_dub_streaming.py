@@ -0,0 +1,92 @@
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+import videotrans.tts
+from videotrans.configure import config
+from videotrans.translator import _memory
+from videotrans.translator._base import BaseTrans
+from videotrans.tts import _cache
+from videotrans.tts._prefetch import DubPrefetch
+
+
+@dataclass
+class _EchoTrans(BaseTrans):
+
+    def _item_task(self, data):
+        return "\n".join(f'T:{line}' for line in data)
+
+
+class _Inst:
+    precent = 0
+    status_text = ''
+
+    def __init__(self):
+        self.pairs = []
+
+    def on_translated(self, pairs):
+        self.pairs.append(pairs)
+
+
+@pytest.fixture
+def stream_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(config, 'TEMP_DIR', (tmp_path / 'tmp').as_posix())
+    monkeypatch.setattr(config, 'TEMP_HOME', (tmp_path / 'tmp').as_posix())
+    monkeypatch.setattr(config, 'current_status', 'ing')
+    monkeypatch.setattr(_memory, '_local', threading.local())
+    for k, v in {'trans_thread': 5, 'trans_memory_size_mb': 200, 'aisendsrt': False, 'translation_wait': 0,
+                 'trans_max_inflight': 2, 'tts_cache_size_mb': 10}.items():
+        monkeypatch.setitem(config.settings, k, v)
+    return tmp_path
+
+
+def _srt(lines):
+    return [{'line': i + 1, 'time': '00:00:00,000 --> 00:00:01,000', 'text': t} for i, t in enumerate(lines)]
+
+
+def test_batches_are_published_with_source_index(stream_env):
+    lines = [f'line {i}' for i in range(12)]
+    inst = _Inst()
+    _EchoTrans(text_list=_srt(lines), source_code='zh', target_code='en', inst=inst).run()
+    assert sorted(p for batch in inst.pairs for p in batch) == [(i, f'T:{t}') for i, t in enumerate(lines)]
+    assert len(inst.pairs) == 3
+
+    # 命中翻译记忆的行一次性提前交出
+    inst = _Inst()
+    _EchoTrans(text_list=_srt(lines), source_code='zh', target_code='en', inst=inst).run()
+    assert inst.pairs == [[(i, f'T:{t}') for i, t in enumerate(lines)]]
+
+
+def test_prefetch_fills_tts_cache(stream_env, monkeypatch):
+    synthesized = []
+
+    def _fake_run(*, queue_tts=None, language=None, uuid=None, **kwargs):
+        for it in queue_tts:
+            synthesized.append(it['text'])
+            Path(it['filename']).write_bytes(f'audio:{it["text"]}'.encode())
+
+    monkeypatch.setattr(videotrans.tts, 'run', _fake_run)
+    tmp = stream_env / 'tmp'
+
+    def _items(texts, prefix):
+        return [{'text': t, 'role': 'r', 'rate': '+0%', 'pitch': '+0Hz', 'volume': '+0%', 'tts_type': 0,
+                 'filename': (tmp / 'dubbing_cache' / f'{prefix}-{i}.wav').as_posix()} for i, t in enumerate(texts)]
+
+    prefetch = DubPrefetch(language='en', uuid='stream-test')
+    prefetch.put(_items(['a', 'b'], 'p1'))
+    prefetch.put(_items(['c'], 'p2'))
+    prefetch.join()
+    assert sorted(synthesized) == ['a', 'b', 'c']
+    # 预先合成的临时文件已删除，只保留在缓存中
+    assert list((tmp / 'dubbing_cache').glob('p*.wav')) == []
+
+    # 配音阶段按最终字幕生成的队列命中缓存，译文变化的行仍需合成
+    (stream_env / 'final').mkdir()
+    final = [{**it, 'filename': (stream_env / 'final' / f'{i}.wav').as_posix()}
+             for i, it in enumerate(_items(['a', 'b', 'c', 'd'], 'f'))]
+    miss, dup = _cache.fetch_cache(final, language='en')
+    assert [it['text'] for it in miss] == ['d'] and dup == []
+    assert Path(final[2]['filename']).read_bytes() == b'audio:c'
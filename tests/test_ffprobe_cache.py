@@ -0,0 +1,80 @@
+import os
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.util import help_ffmpeg
+
+pytestmark = pytest.mark.skipif(shutil.which('ffprobe') is None or shutil.which('ffmpeg') is None,
+                                reason='ffprobe not found')
+
+
+@pytest.fixture
+def probe_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setitem(config.settings, 'ffprobe_cache_sqlite', False)
+    monkeypatch.setattr(help_ffmpeg, '_probe_local', threading.local())
+    help_ffmpeg._probe_cache.clear()
+    calls = []
+    real = help_ffmpeg._run_ffprobe_internal
+
+    def _counting(cmd):
+        calls.append(cmd)
+        return real(cmd)
+
+    monkeypatch.setattr(help_ffmpeg, '_run_ffprobe_internal', _counting)
+    yield tmp_path, calls
+    help_ffmpeg._probe_cache.clear()
+
+
+def _make_wav(path, seconds):
+    subprocess.run(['ffmpeg', '-hide_banner', '-nostdin', '-y', '-f', 'lavfi', '-i', 'anullsrc=r=16000:cl=mono',
+                    '-t', str(seconds), path], check=True, capture_output=True)
+
+
+def _duration(path):
+    return float(help_ffmpeg.runffprobe(['-v', 'error', '-show_entries', 'format=duration', '-of',
+                                         'default=noprint_wrappers=1:nokey=1', path]))
+
+
+def test_unchanged_file_hits_cache(probe_env):
+    root, calls = probe_env
+    wav = (root / 'a.wav').as_posix()
+    _make_wav(wav, 1)
+    assert abs(_duration(wav) - 1) < 0.05
+    assert abs(_duration(wav) - 1) < 0.05
+    assert len(calls) == 1
+
+    # 参数不同不共用缓存
+    help_ffmpeg.runffprobe(['-v', 'error', '-show_streams', wav])
+    assert len(calls) == 2
+
+
+def test_changed_file_is_probed_again(probe_env):
+    root, calls = probe_env
+    wav = (root / 'a.wav').as_posix()
+    _make_wav(wav, 1)
+    _duration(wav)
+    st = os.stat(wav)
+    _make_wav(wav, 2)
+    # 确保修改时间不同
+    os.utime(wav, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert abs(_duration(wav) - 2) < 0.05
+    assert len(calls) == 2
+
+
+def test_sqlite_cache_survives_restart(probe_env, monkeypatch):
+    root, calls = probe_env
+    monkeypatch.setitem(config.settings, 'ffprobe_cache_sqlite', True)
+    wav = (root / 'a.wav').as_posix()
+    _make_wav(wav, 1)
+    _duration(wav)
+    assert (root / 'probe_cache' / 'ffprobe.db').exists()
+
+    # 模拟重启：清空内存缓存后从 SQLite 读取
+    help_ffmpeg._probe_cache.clear()
+    assert abs(_duration(wav) - 1) < 0.05
+    assert len(calls) == 1
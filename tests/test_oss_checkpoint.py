@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.util.oss_uploader import OSSUploader
+
+MB = 1024 * 1024
+
+
+class _FakeUploader(OSSUploader):
+    """不连接服务端，分块上传的各步骤记录在内存中"""
+
+    def __init__(self, fail_part=None):
+        self.config = {'provider': 'aws', 'bucket_name': 'b', 'multipart_part_size': 5 * MB, 'multipart_workers': 1}
+        self.fail_part = fail_part
+        self.inits = 0
+        self.uploaded = []
+        self.completed = None
+
+    def _mp_init(self, remote_key):
+        self.inits += 1
+        return f'upload-{self.inits}'
+
+    def _mp_upload_part(self, remote_key, upload_id, part_number, data):
+        if part_number == self.fail_part:
+            raise ConnectionError('network down')
+        self.uploaded.append((upload_id, part_number, len(data)))
+        return f'etag-{part_number}'
+
+    def _mp_complete(self, remote_key, upload_id, parts):
+        self.completed = (upload_id, parts)
+
+    def _mp_abort(self, remote_key, upload_id):
+        pass
+
+
+@pytest.fixture
+def big_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    file = tmp_path / 'out' / 'video.mp4'
+    file.parent.mkdir()
+    file.write_bytes(os.urandom(21 * MB))
+    return file.as_posix()
+
+
+def test_resume_uploads_only_missing_parts(big_file):
+    first = _FakeUploader(fail_part=3)
+    with pytest.raises(ConnectionError):
+        first._parallel_multipart_upload(big_file, 'key.mp4')
+    done = [n for _, n, _ in first.uploaded]
+    assert done[:2] == [1, 2] and 3 not in done
+    assert os.path.exists(first._checkpoint_file(big_file))
+    assert first._checkpoint_key(big_file) == 'key.mp4'
+
+    second = _FakeUploader()
+    assert second._parallel_multipart_upload(big_file, 'key.mp4')
+    # 沿用之前的 upload_id，只上传缺少的分块
+    assert second.inits == 0
+    assert sorted(n for _, n, _ in second.uploaded) == [n for n in range(1, 6) if n not in done]
+    assert {u for u, _, _ in second.uploaded} == {'upload-1'}
+    assert dict((n, size) for _, n, size in first.uploaded + second.uploaded)[5] == 1 * MB
+    assert second.completed == ('upload-1', [(n, f'etag-{n}') for n in range(1, 6)])
+    assert not os.path.exists(second._checkpoint_file(big_file))
+
+
+def test_modified_file_starts_over(big_file):
+    first = _FakeUploader(fail_part=2)
+    with pytest.raises(ConnectionError):
+        first._parallel_multipart_upload(big_file, 'key.mp4')
+    with open(big_file, 'ab') as f:
+        f.write(b'more')
+
+    second = _FakeUploader()
+    assert second._checkpoint_key(big_file) is None
+    assert second._parallel_multipart_upload(big_file, 'key.mp4')
+    assert second.inits == 1
+    assert [n for _, n, _ in second.uploaded] == [1, 2, 3, 4, 5]
+
+
+def test_checkpoint_kept_out_of_output_dir(big_file, tmp_path):
+    up = _FakeUploader(fail_part=2)
+    with pytest.raises(ConnectionError):
+        up._parallel_multipart_upload(big_file, 'key.mp4')
+    ckpt = up._checkpoint_file(big_file)
+    assert os.path.exists(ckpt)
+    assert os.path.dirname(ckpt) == (tmp_path / 'postprocess' / 'oss_upload').as_posix()
+    assert os.listdir(tmp_path / 'out') == ['video.mp4']
+
+    OSSUploader.remove_checkpoint(big_file)
+    assert not os.path.exists(ckpt)
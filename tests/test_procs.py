@@ -0,0 +1,44 @@
+import shutil
+import threading
+import time
+
+import pytest
+
+from videotrans.configure import config, _procs
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg not found')
+def test_stop_kills_running_encode():
+    uuid = 'test-procs-cancel'
+    result = {}
+
+    def _encode():
+        try:
+            _procs.run(['ffmpeg', '-hide_banner', '-nostdin', '-f', 'lavfi', '-i', 'testsrc2=size=1280x720:rate=30',
+                        '-t', '600', '-c:v', 'libx264', '-preset', 'veryslow', '-f', 'null', '-'], uuid=uuid)
+        except Exception as e:
+            result['error'] = e
+
+    t = threading.Thread(target=_encode, daemon=True)
+    t.start()
+    deadline = time.time() + 5
+    while uuid not in _procs._procs and time.time() < deadline:
+        time.sleep(0.01)
+    assert uuid in _procs._procs
+    proc = next(iter(_procs._procs[uuid]))
+    # 确认编码已在运行
+    time.sleep(0.5)
+    assert proc.poll() is None
+
+    try:
+        start = time.time()
+        config.stoped_uuid_set.add(uuid)
+        while proc.poll() is None and time.time() - start < 1:
+            time.sleep(0.01)
+        assert proc.poll() is not None
+        t.join(timeout=1)
+        assert isinstance(result.get('error'), _procs.TaskCancelled)
+    finally:
+        config.stoped_uuid_set.discard(uuid)
+        if proc.poll() is None:
+            proc.kill()
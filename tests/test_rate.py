@@ -0,0 +1,54 @@
+import pytest
+
+from videotrans.configure import _procs
+from videotrans.task._rate import SpeedRate
+from videotrans.util import tools
+
+
+def _cancelled(*args, **kwargs):
+    raise _procs.TaskCancelled('stopped')
+
+
+def _failed(*args, **kwargs):
+    raise RuntimeError('ffmpeg failed')
+
+
+@pytest.fixture
+def rate(tmp_path):
+    # 不执行 __init__，只准备被测方法用到的属性
+    inst = SpeedRate.__new__(SpeedRate)
+    inst.cache_folder = tmp_path.as_posix()
+    inst.noextname = 'movie'
+    inst.novoice_mp4_original = (tmp_path / 'novoice.mp4').as_posix()
+    inst.novoice_mp4 = (tmp_path / 'out.mp4').as_posix()
+    inst.defer_video_encode = False
+    inst.queue_tts = []
+    inst._graph_clip_duration_ms = lambda task: 1000
+    inst._build_filter_graph = lambda tasks, offset_ms: '[0:v]null[vout]'
+    return inst
+
+
+def test_filter_graph_cancel_is_not_a_fallback(rate, monkeypatch):
+    clips = [{'type': 'gap', 'ss': 0, 'to': 1000}]
+    # 普通失败时回退到逐片段模式
+    monkeypatch.setattr(tools, 'runffmpeg', _failed)
+    assert rate._render_with_filter_graph(clips) is False
+    # 任务停止时直接结束
+    monkeypatch.setattr(tools, 'runffmpeg', _cancelled)
+    with pytest.raises(_procs.TaskCancelled):
+        rate._render_with_filter_graph(clips)
+
+
+def test_speedup_cancel_stops_the_task(rate, monkeypatch, tmp_path):
+    wav = tmp_path / '1.wav'
+    wav.write_bytes(b'audio')
+    rate.audio_speed_filter = 'atempo'
+    rate.AUDIO_SAMPLE_RATE, rate.AUDIO_CHANNELS = 44100, 2
+    it = {'line': 1, 'filename': wav.as_posix(), 'dubb_time': 3000}
+    # 普通失败只记录日志，保留原音频
+    monkeypatch.setattr(tools, 'runffmpeg', _failed)
+    rate._speedup_with_ffmpeg(it, 1.5, 2000)
+    assert it['dubb_time'] == 3000 and wav.read_bytes() == b'audio'
+    monkeypatch.setattr(tools, 'runffmpeg', _cancelled)
+    with pytest.raises(_procs.TaskCancelled):
+        rate._speedup_with_ffmpeg(it, 1.5, 2000)
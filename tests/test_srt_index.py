@@ -0,0 +1,128 @@
+import os
+import threading
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.task import _srt_index as srt_index
+
+SRT = """1
+00:00:01,000 --> 00:00:02,000
+{0}
+
+2
+00:00:03,000 --> 00:00:04,500
+{1}
+
+3
+00:00:05,000 --> 00:00:06,000
+{2}
+"""
+
+
+@pytest.fixture
+def apidata(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(srt_index, '_local', threading.local())
+    root = tmp_path / 'apidata'
+    _write(root / 'task1' / 'video.en.srt', 'hello world', 'the quick brown fox', 'goodbye world')
+    _write(root / 'task2' / 'movie.zh.srt', '你好世界', 'quick thinking', 'brown bread')
+    (root / 'task1' / 'video.mp4').write_bytes(b'')
+    return root
+
+
+def _write(path, *lines):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(SRT.format(*lines), encoding='utf-8')
+
+
+def _search(root, query, **kwargs):
+    return srt_index.search(root.as_posix(), query, query.lower().split(), **kwargs)
+
+
+def _file_ids():
+    return srt_index._conn().execute('SELECT id, path FROM files ORDER BY id').fetchall()
+
+
+def test_index_and_search(apidata):
+    srt_index.reconcile(apidata.as_posix())
+    assert len(_file_ids()) == 2
+    items = _search(apidata, 'quick brown')
+    # 整句命中的排在前面，其余按词频和 idf
+    assert [it['text'] for it in items] == ['the quick brown fox', 'quick thinking', 'brown bread']
+    first = items[0]
+    assert (first['uuid'], first['lang'], first['video'], first['line']) == ('task1', 'en', 'video.mp4', 2)
+    assert (first['start_ms'], first['end_ms']) == (3000, 4500)
+
+    assert [it['text'] for it in _search(apidata, 'quick brown', mode='all')] == ['the quick brown fox']
+    assert [it['uuid'] for it in _search(apidata, 'brown', video_id='task2')] == ['task2']
+    assert [it['text'] for it in _search(apidata, 'world', lang='en', limit=1, offset=1)] == ['goodbye world']
+    assert [it['text'] for it in _search(apidata, '世界')] == ['你好世界']
+    ctx = _search(apidata, 'fox', context_span=1)[0]['context']
+    assert [c['text'] for c in ctx] == ['hello world', 'goodbye world']
+
+
+def test_incremental_update(apidata):
+    srt_index.reconcile(apidata.as_posix())
+    ids = _file_ids()
+    # 未变化的文件不重新索引
+    srt_index.reconcile(apidata.as_posix())
+    srt_index.update_dir((apidata / 'task2').as_posix())
+    assert _file_ids() == ids
+
+    srt = apidata / 'task1' / 'video.en.srt'
+    st = os.stat(srt)
+    _write(srt, 'hello there', 'a slow red fox', 'bye')
+    os.utime(srt, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    srt_index.update_dir((apidata / 'task1').as_posix())
+    # 只有修改过的文件重新索引
+    new_ids = {path: i for i, path in _file_ids()}
+    old_ids = {path: i for i, path in ids}
+    assert new_ids[srt.as_posix()] != old_ids[srt.as_posix()]
+    task2 = (apidata / 'task2' / 'movie.zh.srt').as_posix()
+    assert new_ids[task2] == old_ids[task2]
+    assert [it['text'] for it in _search(apidata, 'fox')] == ['a slow red fox']
+    assert _search(apidata, 'quick brown fox', mode='phrase') == []
+
+    (apidata / 'task2' / 'movie.zh.srt').unlink()
+    srt_index.reconcile(apidata.as_posix())
+    assert _search(apidata, 'bread') == []
+
+
+def test_failed_sync_rolls_back(apidata, monkeypatch):
+    real = srt_index._index_file
+    calls = []
+
+    def _fail_second(conn, p, st):
+        calls.append(p)
+        if len(calls) == 2:
+            raise srt_index.sqlite3.OperationalError('disk I/O error')
+        real(conn, p, st)
+
+    monkeypatch.setattr(srt_index, '_index_file', _fail_second)
+    with pytest.raises(srt_index.sqlite3.Error):
+        srt_index._sync(sorted(apidata.rglob('*.srt')), apidata.as_posix() + '/')
+    conn = srt_index._conn()
+    # 未提交的部分已回滚，连接不再持有写事务
+    assert not conn.in_transaction
+    assert conn.execute('SELECT count(*) FROM files').fetchone()[0] == 0
+
+    monkeypatch.setattr(srt_index, '_index_file', real)
+    assert srt_index._sync(sorted(apidata.rglob('*.srt')), apidata.as_posix() + '/') == (2, 0)
+    assert len(_file_ids()) == 2
+
+
+def test_concurrent_reconcile_and_update_dir(apidata):
+    for i in range(3, 20):
+        _write(apidata / f'task{i}' / 'out.en.srt', f'line {i}', 'second', 'third')
+    threads = [threading.Thread(target=srt_index.reconcile, args=(apidata.as_posix(),))]
+    threads += [threading.Thread(target=srt_index.update_dir, args=((apidata / f'task{i}').as_posix(),))
+                for i in range(1, 20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    conn = srt_index._conn()
+    # 每个文件只索引一次
+    assert conn.execute('SELECT count(*), count(DISTINCT path) FROM files').fetchone() == (19, 19)
+    assert conn.execute('SELECT count(*) FROM segs').fetchone()[0] == 19 * 3
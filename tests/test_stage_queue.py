@@ -0,0 +1,82 @@
+import threading
+import time
+
+from videotrans.configure import config
+from videotrans.task import job
+
+
+class _Task:
+    shoud_dubbing = False
+
+    def __init__(self, uuid, delay=0.0, state=None):
+        self.uuid = uuid
+        self.delay = delay
+        self.state = state
+
+    def trans(self):
+        with self.state['lock']:
+            self.state['running'] += 1
+            self.state['peak'] = max(self.state['peak'], self.state['running'])
+        time.sleep(self.delay)
+        with self.state['lock']:
+            self.state['running'] -= 1
+
+
+def _drain(q):
+    while q.qsize():
+        q.get_nowait()
+
+
+def test_position_and_iter():
+    q = config.StageQueue()
+    for uuid in ('a', 'b', 'c'):
+        q.append(_Task(uuid))
+    assert len(q) == 3
+    assert [t.uuid for t in q] == ['a', 'b', 'c']
+    assert [q.position(u) for u in ('a', 'b', 'c', 'x')] == [1, 2, 3, 0]
+
+    assert q.get_nowait().uuid == 'a'
+    assert [q.position(u) for u in ('a', 'b', 'c')] == [0, 1, 2]
+
+    # 重复入队的任务以最后一次入队的位置为准，取出较早那次后仍在队列中
+    q.append(_Task('b'))
+    assert q.position('b') == 3
+    assert q.get_nowait().uuid == 'b'
+    assert q.position('b') == 2
+    assert [t.uuid for t in q] == ['c', 'b']
+    q.get_nowait()
+    q.get_nowait()
+    assert q.position('b') == 0 and len(q) == 0
+
+
+def test_stage_workers_overlap():
+    n = 3
+    state = {'lock': threading.Lock(), 'running': 0, 'peak': 0}
+    old_concurrency = config.settings.get('trans_concurrency')
+    config.settings['trans_concurrency'] = n
+    config.exit_soft = False
+    workers = [job.WorkerTrans() for _ in range(job.stage_concurrency('trans'))]
+    try:
+        for w in workers:
+            w.start()
+        start = time.time()
+        for i in range(n):
+            config.trans_queue.append(_Task(f'overlap-{i}', delay=0.5, state=state))
+        # 全部任务进入下一阶段队列
+        while len(config.assemb_queue) < n and time.time() - start < 5:
+            time.sleep(0.01)
+        elapsed = time.time() - start
+    finally:
+        config.exit_soft = True
+        for w in workers:
+            w.join(timeout=3)
+        config.exit_soft = False
+        if old_concurrency is None:
+            config.settings.pop('trans_concurrency', None)
+        else:
+            config.settings['trans_concurrency'] = old_concurrency
+    assert len(config.assemb_queue) == n
+    _drain(config.assemb_queue)
+    assert state['peak'] == n
+    # 串行执行需要 n*0.5 秒
+    assert elapsed < 0.5 * n - 0.2
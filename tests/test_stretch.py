@@ -0,0 +1,66 @@
+import wave
+
+import numpy as np
+import pytest
+
+from videotrans.process import _stretch
+
+SR = 16000
+
+
+def _tone(seconds, freq=440.0, channels=1):
+    t = np.arange(int(seconds * SR)) / SR
+    mono = (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+    return np.repeat(mono[:, None], channels, axis=1)
+
+
+def _peak_freq(samples):
+    spectrum = np.abs(np.fft.rfft(samples[:, 0]))
+    return np.fft.rfftfreq(len(samples), 1 / SR)[int(np.argmax(spectrum))]
+
+
+@pytest.mark.parametrize('ratio', [1.1, 1.5, 2.0, 3.3])
+@pytest.mark.parametrize('channels', [1, 2])
+def test_wsola_length_and_pitch(ratio, channels):
+    samples = _tone(2.0, channels=channels)
+    out = _stretch.wsola(samples, ratio, SR)
+    assert out.shape == (int(len(samples) / ratio), channels)
+    assert out.dtype == np.float32
+    # 只改变时长，不改变音调
+    assert abs(_peak_freq(out) - 440) < 5
+
+
+def test_wsola_empty_input():
+    assert _stretch.wsola(np.zeros((0, 2), dtype=np.float32), 1.5, SR).shape == (0, 2)
+    assert _stretch.wsola(np.zeros((1, 1), dtype=np.float32), 2.0, SR).shape == (0, 1)
+
+
+def _write_wav(path, samples, channels):
+    pcm = (samples * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(SR)
+        f.writeframes(pcm.tobytes())
+
+
+def _wav_ms(path):
+    with wave.open(path, 'rb') as f:
+        return f.getnframes() * 1000 / f.getframerate(), f.getnchannels(), f.getframerate()
+
+
+def test_stretch_file_duration(tmp_path):
+    src, dst = (tmp_path / 'in.wav').as_posix(), (tmp_path / 'out.wav').as_posix()
+    _write_wav(src, _tone(3.0), 1)
+
+    # 返回值由采样数计算，与写出的文件一致
+    ms = _stretch.stretch_file(src, dst, 1.5, 5000, SR, 2)
+    real_ms, channels, rate = _wav_ms(dst)
+    assert (channels, rate) == (2, SR)
+    assert ms == int(real_ms)
+    assert abs(ms - 2000) <= 1
+
+    # 不超过目标时长
+    ms = _stretch.stretch_file(src, dst, 1.2, 1800, SR, 1)
+    assert ms == 1800
+    assert _wav_ms(dst)[0] == 1800
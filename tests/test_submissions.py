@@ -0,0 +1,75 @@
+import os
+import threading
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.task import _submissions as submissions
+
+
+@pytest.fixture
+def sub_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(submissions, '_local', threading.local())
+    video = tmp_path / 'in.mp4'
+    video.write_bytes(b'video-1')
+    return video
+
+
+def test_key_follows_content_and_config(sub_env):
+    cfg = {'name': sub_env.as_posix(), 'target_language': 'en', 'voice_role': 'a'}
+    key = submissions.make_key('trans_video', sub_env.as_posix(), cfg)
+    # 路径不参与计算，内容相同的文件 key 相同
+    copy = sub_env.parent / 'copy.mp4'
+    copy.write_bytes(b'video-1')
+    assert submissions.make_key('trans_video', copy.as_posix(), {**cfg, 'name': copy.as_posix()}) == key
+    assert submissions.make_key('recogn', sub_env.as_posix(), cfg) != key
+    assert submissions.make_key('trans_video', sub_env.as_posix(), {**cfg, 'voice_role': 'b'}) != key
+    copy.write_bytes(b'video-2')
+    assert submissions.make_key('trans_video', copy.as_posix(), cfg) != key
+
+
+def test_file_md5_cached_by_size_and_mtime(sub_env):
+    md5 = submissions.file_md5(sub_env)
+    st = os.stat(sub_env)
+    # 大小和修改时间不变时不重新读取内容
+    sub_env.write_bytes(b'video-X')
+    os.utime(sub_env, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert submissions.file_md5(sub_env) == md5
+    os.utime(sub_env, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert submissions.file_md5(sub_env) != md5
+
+
+def test_record_lookup_done_forget(sub_env):
+    key = submissions.make_key('tts', sub_env.as_posix(), {})
+    assert submissions.lookup(key) is None
+    submissions.record(key, 'uuid-1')
+    assert submissions.lookup(key) == ('uuid-1', False)
+    submissions.mark_done('uuid-1')
+    assert submissions.lookup(key) == ('uuid-1', True)
+    # 重新提交覆盖旧记录
+    submissions.record(key, 'uuid-2')
+    assert submissions.lookup(key) == ('uuid-2', False)
+    submissions.forget(key)
+    assert submissions.lookup(key) is None
+
+
+def test_key_follows_global_settings_and_prompts(sub_env, monkeypatch):
+    monkeypatch.setitem(config.settings, 'chatgpt_model', 'model-a')
+    prompt = sub_env.parent / 'videotrans' / 'prompts' / 'srt' / 'chatgpt.txt'
+    prompt.parent.mkdir(parents=True)
+    prompt.write_text('prompt v1', encoding='utf-8')
+    cfg = {'target_language': 'en'}
+    key = submissions.make_key('trans_video', sub_env.as_posix(), cfg)
+
+    # 并发数和 api 自身的设置不影响结果
+    monkeypatch.setitem(config.settings, 'trans_concurrency', 7)
+    monkeypatch.setitem(config.settings, 'api_status_history', 7)
+    assert submissions.make_key('trans_video', sub_env.as_posix(), cfg) == key
+
+    monkeypatch.setitem(config.settings, 'chatgpt_model', 'model-b')
+    key_b = submissions.make_key('trans_video', sub_env.as_posix(), cfg)
+    assert key_b != key
+
+    prompt.write_text('prompt v2 with more words', encoding='utf-8')
+    assert submissions.make_key('trans_video', sub_env.as_posix(), cfg) != key_b
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.task import _postprocess
+from videotrans.task.trans_create import TransCreate
+from videotrans.util import tools
+
+
+@pytest.fixture
+def done_task(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(config, 'current_status', 'ing')
+    monkeypatch.setattr(config, 'exit_soft', False)
+    monkeypatch.setattr(tools, 'send_notification', lambda *args, **kwargs: None)
+    monkeypatch.setattr(_postprocess, '_oss_config', lambda: {'provider': 'aws'})
+    jobs = []
+    monkeypatch.setattr(_postprocess, 'submit', jobs.append)
+
+    target_dir = tmp_path / 'out' / 'movie-mp4'
+    target_dir.mkdir(parents=True)
+    (target_dir / 'movie.mp4').write_bytes(b'video')
+    (target_dir / 'en.srt').write_text('1\n00:00:00,000 --> 00:00:01,000\nhi\n', encoding='utf-8')
+    (tmp_path / 'cache').mkdir()
+    # 不执行 __post_init__，只准备 task_done 用到的配置
+    task = TransCreate.__new__(TransCreate)
+    task.uuid = 'task-done'
+    task.cfg = {
+        'app_mode': 'biaozhun',
+        'only_video': False,
+        'name': (tmp_path / 'movie.mp4').as_posix(),
+        'basename': 'movie.mp4',
+        'target_dir': target_dir.as_posix(),
+        'targetdir_mp4': (target_dir / 'movie.mp4').as_posix(),
+        'target_sub': (target_dir / 'en.srt').as_posix(),
+        'target_language_code': 'en',
+        'shibie_audio': (tmp_path / 'cache' / 'shibie.wav').as_posix(),
+        'cache_folder': (tmp_path / 'cache').as_posix(),
+    }
+    task._signal = lambda **kwargs: None
+    return task, jobs
+
+
+def test_only_video_queues_upload_of_moved_file(done_task):
+    task, jobs = done_task
+    task.cfg['only_video'] = True
+    task.task_done()
+    moved = Path(task.cfg['target_dir']).parent / 'movie.mp4'
+    assert moved.read_bytes() == b'video'
+    assert not Path(task.cfg['target_dir']).exists()
+    assert len(jobs) == 1
+    assert jobs[0]['steps'] == ['oss'] and jobs[0]['video_file'] == moved.as_posix()
+
+
+def test_keeps_output_dir(done_task):
+    task, jobs = done_task
+    task.task_done()
+    assert Path(task.cfg['targetdir_mp4']).exists()
+    assert len(jobs) == 1
+    assert jobs[0]['video_file'] == task.cfg['targetdir_mp4']
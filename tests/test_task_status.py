@@ -0,0 +1,153 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.task import _task_status as status_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(status_store, '_tasks', {})
+    monkeypatch.setattr(status_store, '_finished', OrderedDict())
+    monkeypatch.setattr(status_store, '_dirty', set())
+    monkeypatch.setattr(status_store, '_local', threading.local())
+    monkeypatch.setattr(status_store, 'FLUSH_INTERVAL', 0.05)
+    for k, v in {'api_status_history': 5, 'api_status_persist': False,
+                 'api_status_max_finished': 1000, 'api_status_ttl': 3600}.items():
+        monkeypatch.setitem(config.settings, k, v)
+    return tmp_path
+
+
+def _wait_written(root, uuid, timeout=3):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with sqlite3.connect(root / 'task_status' / 'status.db') as conn:
+                row = conn.execute('SELECT type FROM status WHERE uuid=?', (uuid,)).fetchone()
+            if row:
+                return row[0]
+        except sqlite3.OperationalError:
+            # 写入线程尚未建表
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def test_put_get_and_changes(store):
+    assert status_store.get('t1') is None
+    for i in range(8):
+        status_store.put('t1', {'text': f'log {i}', 'type': 'logs'})
+    snap = status_store.get('t1')
+    assert (snap['type'], snap['text'], snap['version']) == ('logs', 'log 7', 8)
+
+    # 只保留最近 api_status_history 条
+    snap, recent = status_store.changes('t1')
+    assert [text for _, _, text in recent] == [f'log {i}' for i in range(3, 8)]
+    assert status_store.changes('t1', since=6)[1] == [(7, 'logs', 'log 6'), (8, 'logs', 'log 7')]
+
+    # 阶段消息只更新阶段
+    status_store.put('t1', {'text': 'trans', 'type': 'stage'})
+    snap, recent = status_store.changes('t1', since=8)
+    assert (snap['type'], snap['text'], snap['stage']) == ('logs', 'log 7', 'trans')
+    assert recent == [(9, 'stage', 'trans')]
+
+    status_store.put('t1', {'text': 'x' * 5000, 'type': 'succeed'})
+    snap, recent = status_store.changes('t1')
+    assert snap['type'] == 'succeed' and len(snap['text']) == status_store.MAX_TEXT
+    assert recent == []
+    assert status_store.changes('missing') == (None, [])
+
+
+def test_wait_wakes_on_change(store):
+    assert status_store.wait('t2', 0, timeout=0.1) is None
+    status_store.put('t2', {'text': 'start', 'type': 'logs'})
+    threading.Timer(0.1, status_store.put, args=('t2', {'text': 'next', 'type': 'logs'})).start()
+    start = time.time()
+    snap = status_store.wait('t2', 1, timeout=5)
+    assert snap['text'] == 'next' and snap['version'] == 2
+    assert time.time() - start < 2
+
+    start = time.time()
+    assert status_store.wait('t2', 2, timeout=0.2)['version'] == 2
+    assert time.time() - start >= 0.2
+
+
+def test_push_listeners_receive_set_process(store):
+    from videotrans.util.tools import set_process
+
+    config.push_listeners.append(status_store.put)
+    try:
+        set_process(text='hello', type='logs', uuid='t3')
+    finally:
+        config.push_listeners.remove(status_store.put)
+    assert status_store.get('t3')['text'] == 'hello'
+    assert 't3' not in config.uuid_logs_queue
+
+
+def test_take_task_reports_stage(store):
+    from videotrans.task import job
+
+    class _Task:
+        uuid = 't6'
+
+    q = config.StageQueue('trans')
+    # 界面模式没有注册回调，不发送阶段消息
+    q.append(_Task())
+    job.take_task(q)
+    assert status_store.get('t6') is None
+
+    config.push_listeners.append(status_store.put)
+    try:
+        q.append(_Task())
+        assert job.take_task(q).uuid == 't6'
+    finally:
+        config.push_listeners.remove(status_store.put)
+    assert status_store.get('t6')['stage'] == 'trans'
+
+
+def test_persisted_status_survives_restart(store, monkeypatch):
+    monkeypatch.setitem(config.settings, 'api_status_persist', True)
+    status_store.put('t4', {'text': 'running', 'type': 'logs'})
+    status_store.put('t4', {'text': 'done', 'type': 'succeed'})
+    assert _wait_written(store, 't4') == 'succeed'
+
+    # 模拟重启，内存中已没有该任务
+    monkeypatch.setattr(status_store, '_tasks', {})
+    snap = status_store.get('t4')
+    assert (snap['type'], snap['text']) == ('succeed', 'done')
+    assert status_store.wait('t4', 0, timeout=0.1) is None
+
+
+def test_prune_finished_tasks(store, monkeypatch):
+    monkeypatch.setitem(config.settings, 'api_status_max_finished', 2)
+    status_store.put('running', {'text': 'working', 'type': 'logs'})
+    for i in range(4):
+        status_store.put(f'done{i}', {'text': 'ok', 'type': 'succeed'})
+    # 只保留最近结束的 2 个，未结束的任务不移除
+    assert [status_store.get(f'done{i}') is not None for i in range(4)] == [False, False, True, True]
+    assert status_store.get('running') is not None
+
+    # 重新开始的任务不再计入已结束
+    status_store.put('done3', {'text': 'again', 'type': 'logs'})
+    status_store.put('done4', {'text': 'ok', 'type': 'succeed'})
+    status_store.put('done5', {'text': 'ok', 'type': 'succeed'})
+    assert status_store.get('done2') is None
+    assert status_store.get('done3')['text'] == 'again'
+
+
+def test_prune_by_ttl_after_written(store, monkeypatch):
+    monkeypatch.setitem(config.settings, 'api_status_persist', True)
+    monkeypatch.setitem(config.settings, 'api_status_ttl', 0)
+    status_store.put('t5', {'text': 'done', 'type': 'succeed'})
+    assert _wait_written(store, 't5') == 'succeed'
+    deadline = time.time() + 3
+    while 't5' in status_store._tasks and time.time() < deadline:
+        time.sleep(0.02)
+    # 已写入 SQLite 后从内存移除，仍可查询
+    assert 't5' not in status_store._tasks
+    assert status_store.get('t5')['type'] == 'succeed'
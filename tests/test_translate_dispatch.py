@@ -0,0 +1,68 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.translator._base import BaseTrans, TokenBucket
+
+
+@dataclass
+class _SlowTrans(BaseTrans):
+    state = None
+
+    def _item_task(self, data):
+        st = _SlowTrans.state
+        with st['lock']:
+            st['running'] += 1
+            st['peak'] = max(st['peak'], st['running'])
+            st['calls'] += 1
+        time.sleep(random.uniform(0.01, 0.05))
+        with st['lock']:
+            st['running'] -= 1
+        return "\n".join(f'T:{line}' for line in data)
+
+
+@pytest.fixture
+def trans_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(config, 'TEMP_DIR', (tmp_path / 'tmp').as_posix())
+    monkeypatch.setattr(config, 'TEMP_HOME', (tmp_path / 'tmp').as_posix())
+    for k, v in {'trans_thread': 2, 'aisendsrt': False, 'translation_wait': 0, 'trans_max_inflight': 3}.items():
+        monkeypatch.setitem(config.settings, k, v)
+    _SlowTrans.state = {'lock': threading.Lock(), 'running': 0, 'peak': 0, 'calls': 0}
+    return tmp_path
+
+
+def _srt(lines):
+    return [{'line': i + 1, 'time': '00:00:00,000 --> 00:00:01,000', 'text': t} for i, t in enumerate(lines)]
+
+
+def test_batches_run_concurrently_in_order(trans_env):
+    lines = [f'dispatch {i}' for i in range(20)]
+    result = _SlowTrans(text_list=_srt(lines), source_code='zh', target_code='en', is_test=True).run()
+    assert [it['text'] for it in result] == [f'T:{t}' for t in lines]
+    st = _SlowTrans.state
+    assert st['calls'] == 10
+    assert 1 < st['peak'] <= 3
+
+
+def test_translation_wait_spaces_requests(trans_env):
+    config.settings['translation_wait'] = 0.1
+    lines = [f'wait {i}' for i in range(10)]
+    start = time.monotonic()
+    result = _SlowTrans(text_list=_srt(lines), source_code='zh', target_code='en', is_test=True).run()
+    elapsed = time.monotonic() - start
+    assert [it['text'] for it in result] == [f'T:{t}' for t in lines]
+    # 5 个批次，令牌桶每 0.1 秒放行一个，首个立即放行
+    assert elapsed >= 0.35
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(5):
+        assert bucket.acquire()
+    assert 0.15 <= time.monotonic() - start < 1
@@ -0,0 +1,80 @@
+import threading
+from dataclasses import dataclass
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.translator import _memory
+from videotrans.translator._base import BaseTrans
+
+
+@dataclass
+class _CountingTrans(BaseTrans):
+    calls = 0
+    lock = threading.Lock()
+
+    def _item_task(self, data):
+        with _CountingTrans.lock:
+            _CountingTrans.calls += 1
+        return "\n".join(f'T:{line}' for line in data)
+
+
+@pytest.fixture
+def memory_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setattr(config, 'TEMP_HOME', (tmp_path / 'tmp').as_posix())
+    monkeypatch.setattr(config, 'current_status', 'ing')
+    monkeypatch.setattr(_memory, '_local', threading.local())
+    for k, v in {'trans_thread': 10, 'trans_memory_size_mb': 200, 'aisendsrt': False,
+                 'translation_wait': 0, 'trans_max_inflight': 3}.items():
+        monkeypatch.setitem(config.settings, k, v)
+    _CountingTrans.calls = 0
+    return tmp_path
+
+
+def _translate(lines):
+    srt = [{'line': i + 1, 'time': '00:00:00,000 --> 00:00:01,000', 'text': t} for i, t in enumerate(lines)]
+    trans = _CountingTrans(text_list=srt, source_code='zh', target_code='en')
+    return [it['text'] for it in trans.run()]
+
+
+def test_trans_thread_change_hits_memory(memory_root):
+    lines = [f'第 {i} 行' for i in range(50)]
+    first = _translate(lines)
+    assert first == [f'T:{t}' for t in lines]
+    assert _CountingTrans.calls == 5
+    assert (memory_root / 'translate_cache' / 'memory.db').exists()
+
+    # 批次大小变化不影响逐行的翻译记忆
+    config.settings['trans_thread'] = 7
+    _CountingTrans.calls = 0
+    assert _translate(lines) == first
+    assert _CountingTrans.calls == 0
+
+    # 只有修改过的行重新请求
+    lines[3], lines[20], lines[41] = 'a', 'b', 'c'
+    result = _translate(lines)
+    assert _CountingTrans.calls == 1
+    assert [result[i] for i in (3, 20, 41)] == ['T:a', 'T:b', 'T:c']
+
+
+def _translate_at(lines, api_url):
+    srt = [{'line': i + 1, 'time': '00:00:00,000 --> 00:00:01,000', 'text': t} for i, t in enumerate(lines)]
+    trans = _CountingTrans(text_list=srt, source_code='zh', target_code='en')
+    trans.api_url = api_url
+    return [it['text'] for it in trans.run()]
+
+
+def test_api_url_change_misses_memory(memory_root):
+    lines = [f'接口 {i}' for i in range(10)]
+    _translate_at(lines, 'http://127.0.0.1:8000/v1')
+    assert _CountingTrans.calls == 1
+
+    # 同一接口地址命中
+    _CountingTrans.calls = 0
+    _translate_at(lines, 'http://127.0.0.1:8000/v1')
+    assert _CountingTrans.calls == 0
+
+    # 不同接口地址（如本地模型换了服务）不复用翻译记忆
+    _translate_at(lines, 'http://127.0.0.1:9000/v1')
+    assert _CountingTrans.calls == 1
@@ -0,0 +1,103 @@
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.tts import _aimd
+
+
+def _round(limiter, latency):
+    # 有足够多待配音的行，每完成一行立即补上，模拟名额始终用满的一轮请求
+    while limiter.try_acquire():
+        pass
+    for _ in range(int(limiter.limit)):
+        limiter.release(True, latency)
+        while limiter.try_acquire():
+            pass
+    while limiter.inflight:
+        limiter.release(True, latency)
+
+
+def test_additive_increase_when_saturated():
+    limiter = _aimd.AIMDLimiter(4, 8)
+    for _ in range(3):
+        _round(limiter, 0.2)
+    assert 6 <= int(limiter.limit) <= 8
+    for _ in range(20):
+        _round(limiter, 0.2)
+    assert limiter.limit == 8
+
+    # 未用满名额时不增加
+    limiter = _aimd.AIMDLimiter(4, 8)
+    for _ in range(10):
+        assert limiter.try_acquire()
+        limiter.release(True, 0.2)
+    assert limiter.limit == 4
+
+
+def test_latency_growth_stops_increase():
+    limiter = _aimd.AIMDLimiter(4, 32)
+    _round(limiter, 0.2)
+    before = limiter.limit
+    for _ in range(10):
+        _round(limiter, 1.0)
+    # 耗时明显变长后并发数不再增加，基准也不随之升高
+    assert limiter.limit < before + 2
+    assert limiter.baseline == pytest.approx(0.2)
+
+
+def test_overload_cuts_once_per_burst():
+    limiter = _aimd.AIMDLimiter(10, 16)
+    for _ in range(5):
+        limiter.overloaded()
+    assert limiter.limit == pytest.approx(7)
+    limiter.last_cut -= 1
+    limiter.overloaded()
+    assert limiter.limit == pytest.approx(4.9)
+    for _ in range(10):
+        limiter.last_cut -= 1
+        limiter.overloaded()
+    assert limiter.limit == 1
+
+
+def test_acquire_gives_up_on_exit():
+    limiter = _aimd.AIMDLimiter(1, 1)
+    assert limiter.acquire()
+    start = time.time()
+    assert limiter.acquire(exit_fn=lambda: time.time() - start > 0.1) is False
+    limiter.release(False)
+    assert limiter.try_acquire()
+
+
+def test_retry_after():
+    assert _aimd.parse_retry_after('3') == 3
+    assert _aimd.parse_retry_after(None) is None
+    assert _aimd.parse_retry_after('soon') is None
+    assert 8 <= _aimd.parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+    wait = _aimd.wait_retry_after(5)
+
+    def _state(exc):
+        return SimpleNamespace(outcome=SimpleNamespace(exception=lambda: exc))
+
+    exc = Exception('429')
+    exc.response = SimpleNamespace(headers={'Retry-After': '2'})
+    assert wait(_state(exc)) == 2
+    exc.response.headers['Retry-After'] = '3600'
+    assert wait(_state(exc)) == 300
+    assert wait(_state(Exception('timeout'))) == 5
+
+
+def test_get_limiter_shared_per_engine(monkeypatch):
+    monkeypatch.setattr(_aimd, '_limiters', {})
+    monkeypatch.setitem(config.settings, 'dubbing_thread', 3)
+    monkeypatch.setitem(config.settings, 'tts_max_concurrency', 0)
+    limiter = _aimd.get_limiter('EdgeTTS')
+    assert (limiter.limit, limiter.maximum) == (3, 12)
+    assert _aimd.get_limiter('EdgeTTS') is limiter
+    assert _aimd.get_limiter('OpenAITTS') is not limiter
+
+    monkeypatch.setitem(config.settings, 'tts_max_concurrency', 5)
+    assert _aimd.get_limiter('EdgeTTS').maximum == 5
@@ -0,0 +1,90 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from videotrans.configure import config
+from videotrans.tts import _cache
+
+
+@pytest.fixture
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ROOT_DIR', tmp_path.as_posix())
+    monkeypatch.setitem(config.settings, 'tts_cache_size_mb', 1)
+    (tmp_path / 'run').mkdir()
+    return tmp_path
+
+
+def _items(root, texts, run='run'):
+    return [{'text': t, 'role': 'r', 'rate': '+0%', 'pitch': '+0Hz', 'volume': '+0%', 'tts_type': 0,
+             'filename': (root / run / f'{i}-{i * 1000}.wav').as_posix()} for i, t in enumerate(texts)]
+
+
+def _synth(items):
+    # 模拟配音渠道，文件内容为文本
+    for it in items:
+        Path(it['filename']).write_bytes(f'audio:{it["text"]}'.encode())
+
+
+def test_hits_across_runs_and_duplicates(cache_root):
+    texts = ['a', 'b', 'a', 'c', 'b']
+    first = _items(cache_root, texts)
+    miss, dup = _cache.fetch_cache(first, language='en')
+    # 同一次运行中相同的句子只合成一次
+    assert [it['text'] for it in miss] == ['a', 'b', 'c']
+    assert [it['text'] for it in dup] == ['a', 'b']
+    _synth(miss)
+    _cache.store_cache(miss, language='en', duplicates=dup)
+    assert all(Path(it['filename']).read_bytes() == f'audio:{it["text"]}'.encode() for it in first)
+
+    # 时间和行号变化后全部命中
+    (cache_root / 'run2').mkdir()
+    second = _items(cache_root, texts, run='run2')
+    for it in second:
+        it['filename'] = it['filename'].replace('.wav', '-shifted.wav')
+    miss, dup = _cache.fetch_cache(second, language='en')
+    assert miss == [] and dup == []
+    assert all(Path(it['filename']).read_bytes() == f'audio:{it["text"]}'.encode() for it in second)
+
+    # 语言不同不命中
+    (cache_root / 'run3').mkdir()
+    miss, _ = _cache.fetch_cache(_items(cache_root, ['a'], run='run3'), language='fr')
+    assert len(miss) == 1
+
+
+def test_disabled_and_eviction(cache_root, monkeypatch):
+    items = _items(cache_root, ['x'])
+    monkeypatch.setitem(config.settings, 'tts_cache_size_mb', 0)
+    miss, dup = _cache.fetch_cache(items, language='en')
+    assert miss == items and dup == []
+
+    monkeypatch.setitem(config.settings, 'tts_cache_size_mb', 0.01)
+    texts = [f'line {i}' for i in range(8)]
+    items = _items(cache_root, texts)
+    for it in items:
+        Path(it['filename']).write_bytes(b'\0' * 2048)
+    _cache.store_cache(items, language='en')
+    total = sum(f.stat().st_size for f in (cache_root / 'tts_cache').glob('*.wav'))
+    assert 0 < total <= 0.01 * 1024 * 1024
+
+
+def test_trim_does_not_touch_cache(cache_root, monkeypatch):
+    monkeypatch.setitem(config.settings, 'remove_silence', False)
+    items = _items(cache_root, ['hello'])
+    miss, _ = _cache.fetch_cache(items, language='en')
+    _synth(miss)
+    _cache.store_cache(miss, language='en')
+    cache_file = next((cache_root / 'tts_cache').glob('*.wav'))
+    assert os.stat(items[0]['filename']).st_ino == cache_file.stat().st_ino
+
+    # 原地修改前断开硬链接
+    _cache.unshare(items[0]['filename'])
+    with open(items[0]['filename'], 'ab') as f:
+        f.write(b'trimmed')
+    assert cache_file.read_bytes() == b'audio:hello'
+
+    # 是否去除末尾静音不同，不复用缓存
+    monkeypatch.setitem(config.settings, 'remove_silence', True)
+    (cache_root / 'run2').mkdir()
+    miss, _ = _cache.fetch_cache(_items(cache_root, ['hello'], run='run2'), language='en')
+    assert len(miss) == 1
@@ -0,0 +1,122 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from videotrans.hearsight import volcengine_vector as vv
+
+DIM = 16
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vv, '_indexes', {})
+    rng = np.random.default_rng(0)
+    client = vv.VolcengineVectorClient(api_key='test')
+    queries = {}
+    client._get_embedding = lambda text: queries[text]
+    client._batch_get_embeddings = lambda texts: [rng.standard_normal(DIM).tolist() for _ in texts]
+    path = (tmp_path / 'vectors').as_posix()
+    for v in range(12):
+        paragraphs = [{'text': f'p{v}-{i}', 'summary': f's{v}-{i}', 'start_time': i, 'end_time': i + 1}
+                      for i in range(v % 4)]
+        assert client.store_summary(f'/videos/{v}.mp4', {'topic': f'topic {v}', 'summary': f'summary {v}'},
+                                    paragraphs, local_storage_path=path)
+    return client, queries, path, rng
+
+
+def _brute_force(client, path, query, n_results, video_id=None, filter_type=None):
+    # 逐个 JSON 文件计算相似度，即原先的检索方式
+    results = []
+    for name in os.listdir(path):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(path, name), encoding='utf-8') as f:
+            data = json.load(f)
+        if video_id and data['video_id'] != video_id:
+            continue
+        for doc in data['documents']:
+            if filter_type and doc['metadata'].get('type') != filter_type:
+                continue
+            results.append((client._cosine_similarity(query, doc['embedding']), doc['id']))
+    results.sort(key=lambda x: -x[0])
+    return results[:n_results]
+
+
+def _check(client, queries, path, rng, **kwargs):
+    for _ in range(5):
+        queries['q'] = rng.standard_normal(DIM).tolist()
+        got = client.search('q', local_storage_path=path, **kwargs)
+        want = _brute_force(client, path, queries['q'], kwargs.get('n_results', 5), kwargs.get('video_id'),
+                            kwargs.get('filter_type'))
+        assert [it['id'] for it in got] == [doc_id for _, doc_id in want]
+        assert [it['similarity'] for it in got] == pytest.approx([s for s, _ in want], abs=1e-5)
+
+
+def test_search_matches_brute_force(store):
+    client, queries, path, rng = store
+    _check(client, queries, path, rng, n_results=7)
+    _check(client, queries, path, rng, n_results=3, filter_type='paragraph')
+    _check(client, queries, path, rng, n_results=3, video_id=client._generate_video_id('/videos/5.mp4'))
+    assert os.path.exists(os.path.join(path, vv.INDEX_DIR, 'vectors.f32'))
+
+
+def test_delete_overwrite_and_reload(store, monkeypatch):
+    client, queries, path, rng = store
+    client.delete_video('/videos/3.mp4', local_storage_path=path)
+    client.store_summary('/videos/4.mp4', {'topic': 'new', 'summary': 'new'}, [{'text': 'x'}],
+                         local_storage_path=path)
+    _check(client, queries, path, rng, n_results=50)
+
+    # 重启后从索引文件加载
+    monkeypatch.setattr(vv, '_indexes', {})
+    _check(client, queries, path, rng, n_results=50)
+
+
+def test_crash_tail_and_corrupt_index(store, monkeypatch):
+    client, queries, path, rng = store
+    index_dir = os.path.join(path, vv.INDEX_DIR)
+    # 写入中途崩溃留下的残余数据
+    with open(os.path.join(index_dir, 'vectors.f32'), 'ab') as f:
+        f.write(b'\0' * 100)
+    with open(os.path.join(index_dir, 'docs.jsonl'), 'ab') as f:
+        f.write(b'[garbage')
+    with open(os.path.join(index_dir, 'index.jsonl'), 'ab') as f:
+        f.write(b'{"name":')
+    monkeypatch.setattr(vv, '_indexes', {})
+    _check(client, queries, path, rng, n_results=10)
+
+    # 向量文件被截断时从 JSON 文件重建
+    with open(os.path.join(index_dir, 'vectors.f32'), 'r+b') as f:
+        f.truncate(64)
+    monkeypatch.setattr(vv, '_indexes', {})
+    _check(client, queries, path, rng, n_results=10)
+
+
+def test_external_changes_and_compaction(store, monkeypatch):
+    client, queries, path, rng = store
+    monkeypatch.setattr(vv, 'SYNC_INTERVAL', 0)
+    # 其他进程写入或删除 JSON 文件
+    src = os.path.join(path, client._generate_video_id('/videos/5.mp4') + '.json')
+    with open(src, encoding='utf-8') as f:
+        data = json.load(f)
+    data['video_id'] = 'external'
+    for doc in data['documents']:
+        doc['id'] = 'external-' + doc['id']
+        doc['embedding'] = rng.standard_normal(DIM).tolist()
+    with open(os.path.join(path, 'external.json'), 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.remove(os.path.join(path, client._generate_video_id('/videos/6.mp4') + '.json'))
+    _check(client, queries, path, rng, n_results=50)
+
+    monkeypatch.setattr(vv, 'COMPACT_MIN_ROWS', 4)
+    for v in range(10):
+        client.delete_video(f'/videos/{v}.mp4', local_storage_path=path)
+    client.store_summary('/videos/new.mp4', {'topic': 't', 'summary': 's'}, [{'text': 'y'}], local_storage_path=path)
+    index = vv._get_index(path)
+    # 压缩后不再保留已删除的行
+    assert index.rows == int(index._alive[:index.rows].sum())
+    _check(client, queries, path, rng, n_results=50)
+    monkeypatch.setattr(vv, '_indexes', {})
+    _check(client, queries, path, rng, n_results=50)
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from types import SimpleNamespace
+
+import pytest
+
+from videotrans.configure import config
+
+
+@pytest.fixture
+def overall(monkeypatch):
+    # 本地未安装 faster-whisper 时用空模块代替，模型由各测试替换
+    if 'faster_whisper' not in sys.modules:
+        try:
+            import faster_whisper  # noqa: F401
+        except ImportError:
+            fw = types.ModuleType('faster_whisper')
+            fw.WhisperModel = None
+            hf = types.ModuleType('huggingface_hub')
+            errors = types.ModuleType('huggingface_hub.errors')
+            errors.LocalEntryNotFoundError = type('LocalEntryNotFoundError', (Exception,), {})
+            monkeypatch.setitem(sys.modules, 'faster_whisper', fw)
+            monkeypatch.setitem(sys.modules, 'huggingface_hub', hf)
+            monkeypatch.setitem(sys.modules, 'huggingface_hub.errors', errors)
+    for name in ('videotrans.process._overall', 'videotrans.recognition._overall'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    from videotrans.process import _overall as process_overall
+    from videotrans.recognition import _overall as recognition_overall
+    return process_overall, recognition_overall
+
+
+class _FakeModel:
+    loads = []
+
+    def __init__(self, model_name, **kwargs):
+        _FakeModel.loads.append(kwargs)
+
+    def transcribe(self, audio, **kwargs):
+        word = SimpleNamespace(start=0.0, end=1.0, word='hi')
+        return iter([SimpleNamespace(words=[word], text='hi')]), SimpleNamespace(language='en')
+
+
+def test_serve_uses_threads_and_proxy(overall, tmp_path, monkeypatch):
+    process_overall, _ = overall
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('http_proxy', raising=False)
+    monkeypatch.delenv('https_proxy', raising=False)
+    monkeypatch.setattr(process_overall, 'WhisperModel', _FakeModel)
+    _FakeModel.loads = []
+    (tmp_path / f'{os.getpid()}.lock').write_text('')
+
+    parent, child = multiprocessing.Pipe()
+    t = threading.Thread(target=process_overall.serve, args=(child,), kwargs={
+        'ROOT_DIR': tmp_path.as_posix(), 'TEMP_DIR': tmp_path.as_posix(),
+        'defaulelang': 'en', 'proxy': 'http://127.0.0.1:7890'}, daemon=True)
+    t.start()
+    settings = dict(config.settings, whisper_threads=3, vad=False)
+    for _ in range(2):
+        parent.send({'model_name': 'tiny', 'is_cuda': False, 'detect_language': 'en',
+                     'settings': settings, 'audio_file': 'a.wav'})
+        msgs = []
+        while not msgs or msgs[-1]['type'] != 'done':
+            assert parent.poll(5)
+            msgs.append(parent.recv())
+        assert [m['data']['text'] for m in msgs if m['type'] == 'segment'] == ['hi']
+        assert not [m for m in msgs if m['type'] == 'error']
+    parent.send(None)
+    t.join(5)
+
+    # 模型只加载一次，并使用设置的线程数和代理
+    assert len(_FakeModel.loads) == 1
+    assert _FakeModel.loads[0]['cpu_threads'] == 3
+    assert os.environ.get('https_proxy') == 'http://127.0.0.1:7890'
+
+
+def test_worker_key_follows_threads_and_proxy(overall):
+    _, recognition_overall = overall
+    settings = dict(config.settings, whisper_threads=2)
+    key = recognition_overall._worker_key('tiny', False, settings, None)
+    assert key == recognition_overall._worker_key('tiny', False, dict(settings), None)
+    # 线程数或代理变化时不复用已加载的模型
+    assert key != recognition_overall._worker_key('tiny', False, dict(settings, whisper_threads=4), None)
+    assert key != recognition_overall._worker_key('tiny', False, settings, 'http://127.0.0.1:7890')
@@ -51,8 +51,8 @@ class BaseCon:
         from . import config
 
         try:
-            subprocess.run(cmd_list, capture_output=True, text=True, check=True, encoding='utf-8', creationflags=0,
-                           cwd=os.path.dirname(cmd_list[0]))
+            from ._procs import run
+            run(cmd_list, uuid=self.uuid, text=True, check=True, encoding='utf-8', cwd=os.path.dirname(cmd_list[0]))
         except subprocess.CalledProcessError as e:
             if os.name == 'nt' and config.IS_FROZEN:
                 raise RuntimeError(
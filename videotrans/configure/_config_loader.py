@@ -107,11 +107,20 @@ if defaulelang == 'zh' and not Path(ROOT_DIR+"/huggingface.lock").exists():
 # 存储所有任务的进度队列，以uuid为键
 # 根据uuid将日志进度等信息存入队列，如果不存在则创建
 uuid_logs_queue = {}
+# 注册回调后消息直接交给回调处理，不再放入 uuid_logs_queue，api 模式使用
+push_listeners = []
 
 
 def push_queue(uuid, jsondata):
     if uuid in stoped_uuid_set:
         return
+    if push_listeners:
+        for fn in push_listeners:
+            try:
+                fn(uuid, jsondata)
+            except Exception:
+                pass
+        return
     if uuid not in uuid_logs_queue:
         uuid_logs_queue[uuid] = Queue()
     try:
@@ -123,7 +132,15 @@ def push_queue(uuid, jsondata):
 
 
 # 存储已停止/暂停的任务
-stoped_uuid_set = set()
+class _StopedUuidSet(set):
+    # 加入时立即结束该任务登记的子进程，不必等待其自行检查
+    def add(self, uuid):
+        super().add(uuid)
+        from videotrans.configure import _procs
+        _procs.kill(uuid)
+
+
+stoped_uuid_set = _StopedUuidSet()
 # 全局消息，不存在uuid，用于控制软件
 global_msg = []
 # 软件退出
@@ -146,18 +163,68 @@ box_recogn = 'stop'
 # 倒计时数秒
 task_countdown = 0
 #####################################
+
+
+# 各阶段任务队列，阻塞式 Queue，保留 list 的 append/len/遍历 用法，便于原有调用处不变
+# 入队时按序号记录 uuid，position() 无需遍历即可得到任务在队列中的位置
+class StageQueue(Queue):
+    def __init__(self, name=''):
+        super().__init__()
+        # 阶段名，与 {stage}_concurrency 设置中的名称一致
+        self.name = name
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._seq_put = 0
+        self._seq_get = 0
+        self._seq_of = {}
+
+    def _put(self, item):
+        super()._put(item)
+        self._seq_put += 1
+        self._seq_of[getattr(item, 'uuid', None)] = self._seq_put
+
+    def _get(self):
+        item = super()._get()
+        self._seq_get += 1
+        uuid = getattr(item, 'uuid', None)
+        # 同一任务重复入队时只在取出最后一次入队的那个时删除
+        if self._seq_of.get(uuid) == self._seq_get:
+            del self._seq_of[uuid]
+        return item
+
+    def position(self, uuid):
+        """
+        任务在队列中的位置，从 1 开始，不在队列中返回 0
+        """
+        with self.mutex:
+            seq = self._seq_of.get(uuid)
+            return seq - self._seq_get if seq else 0
+
+    def append(self, item):
+        self.put(item)
+
+    def __len__(self):
+        return self.qsize()
+
+    def __iter__(self):
+        # 返回快照，遍历时不阻塞工作线程取任务
+        with self.mutex:
+            return iter(list(self.queue))
+
+
 # 预先处理队列
-prepare_queue = []
+prepare_queue = StageQueue('prepare')
 # 识别队列
-regcon_queue = []
+regcon_queue = StageQueue('regcon')
 # 翻译队列
-trans_queue = []
+trans_queue = StageQueue('trans')
 # 配音队列
-dubb_queue = []
+dubb_queue = StageQueue('dubb')
 # 音视频画面对齐
-align_queue = []
+align_queue = StageQueue('align')
 # 合成队列
-assemb_queue = []
+assemb_queue = StageQueue('assemb')
 # 执行模式 gui 或 api
 exec_mode = "gui"
 # funasr模型
@@ -226,6 +293,24 @@ def parse_init(update_data=None):
         "ffmpeg_cmd": "",
         "aisendsrt": False,
         "video_codec": 264,
+        # 视频慢速时的渲染方式 graph=单个filter_complex一次编码，clips=逐片段裁切后拼接
+        "video_render_mode": "graph",
+        # graph 模式下单个 filter_complex 最多包含的片段数，超过则分组渲染后拼接
+        "video_graph_max_clips": 200,
+        # clips 模式下未变速的片段在关键帧之间直接复制原视频码流，只重新编码首尾不足一个关键帧间隔的部分；仅原视频为 h264/yuv420p 时生效
+        "video_smart_cut": True,
+        # 视频慢速和末尾定格时中间视频使用无损编码(x264 -qp 0)，最终合成时与定格、硬字幕一起只做一次有损编码；中间文件较大
+        "video_lossless_intermediate": False,
+        # 配音加速引擎 numpy=进程内WSOLA变速，ffmpeg=逐条调用ffmpeg rubberband/atempo
+        "audio_stretch_backend": "numpy",
+        # numpy 变速的进程池大小，0=自动
+        "audio_stretch_workers": 0,
+        # 跨任务配音缓存的容量上限(MB)，0=禁用
+        "tts_cache_size_mb": 2048,
+        # 边翻译边配音，每批译文返回后立即合成，需启用配音缓存
+        "trans_dub_streaming": False,
+        # ffprobe 结果是否同时持久化到 SQLite，内存缓存始终启用
+        "ffprobe_cache_sqlite": False,
         "openaitts_model": "tts-1,tts-1-hd,gpt-4o-mini-tts",
         "openairecognapi_model": "whisper-1,gpt-4o-transcribe,gpt-4o-mini-transcribe",
         "chatgpt_model": "gpt-4.1,gpt-4o-mini,gpt-4o,gpt-4,gpt-4-turbo,gpt-4.5,o1,o1-pro,o3-mini,moonshot-v1-8k,deepseek-chat,deepseek-reasoner",
@@ -250,18 +335,57 @@ def parse_init(update_data=None):
         "voice_silence": 200,
         "interval_split": 10,
         "bgm_split_time": 300,
+        # 人声背景分离时每次送入模型的窗口数，0=自动(GPU为4，CPU为1)，显存不足时调小
+        "uvr_batch_size": 0,
+        # 语音降噪时每块音频的秒数，相邻块重叠0.5秒交叉淡化，0=整个文件一次送入模型
+        "remove_noise_chunk_sec": 60,
         "trans_thread": 20,
+        # 翻译时同时进行中的批次请求数，translation_wait 作为请求间的最小间隔
+        "trans_max_inflight": 3,
+        # 句子级翻译记忆容量上限(MB)，0=禁用
+        "trans_memory_size_mb": 200,
         "aitrans_thread": 50,
         "retries": 2,
         "translation_wait": 0,
         "dubbing_wait": 1,
         "dubbing_thread": 5,
+        # 配音并发数的上限，按成功率和耗时在 1 与该值之间自动调整，0 为 dubbing_thread 的 4 倍且不超过 32
+        "tts_max_concurrency": 0,
+        # 每个阶段同时处理的任务数
+        "prepare_concurrency": 1,
+        "regcon_concurrency": 1,
+        "trans_concurrency": 1,
+        "dubb_concurrency": 1,
+        "align_concurrency": 1,
+        "assemb_concurrency": 1,
+        # 任务完成后上传、导出作业的并发数
+        "postprocess_workers": 2,
+        # 上传、导出失败后的最大重试次数，按指数退避
+        "postprocess_max_retries": 5,
+        # api 每个任务在内存中保留的最近日志条数
+        "api_status_history": 50,
+        # api 任务状态是否定期批量写入 SQLite，重启后仍可查询已结束的任务
+        "api_status_persist": False,
+        # 已结束的任务在内存中最多保留的个数，超出时移除最早结束的
+        "api_status_max_finished": 1000,
+        # api_status_persist 开启时，已结束的任务写入 SQLite 并超过该秒数后从内存移除，之后从 SQLite 查询
+        "api_status_ttl": 3600,
+        # /task_events 每秒最多推送的进度事件数，其间的更新合并为一次
+        "api_events_max_rate": 5,
+        # /task_events 无更新时发送心跳的间隔秒数
+        "api_events_heartbeat": 15,
+        # 同时打开的 /task_events 连接数上限，每个连接占用一个服务线程
+        "api_events_max_streams": 16,
         "save_segment_audio": False,
         "countdown_sec": 120,
         "backaudio_volume": 0.8,
         "separate_sec": 600,
         "loop_backaudio": True,
         "cuda_com_type": "default",  # int8 int8_float16 int8_float32
+        # faster-whisper 常驻识别进程空闲多少秒后退出，0=每次识别都重新加载模型
+        "whisper_worker_ttl": 600,
+        # faster-whisper 使用 CPU 识别时的线程数，0=由 faster-whisper 自动决定
+        "whisper_threads": 0,
         "initial_prompt_zh-cn": "在每行末尾添加标点符号，在每个句子末尾添加标点符号。",
         "initial_prompt_zh-tw": "在每行末尾添加標點符號，在每個句子末尾添加標點符號。",
         "initial_prompt_en": "Add punctuation at the end of each line, and punctuation at the end of each sentence.",
@@ -0,0 +1,143 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+"""
+按任务 uuid 登记子进程，任务停止时立即结束其进程树
+子进程包括 ffmpeg、ffprobe、Faster-Whisper-XXL 以及 multiprocessing 启动的识别进程
+工作线程取得任务时调用 bind(uuid)，未显式传入 uuid 时使用当前线程绑定的任务
+"""
+
+_local = threading.local()
+_lock = threading.Lock()
+# uuid -> set(Popen 或 multiprocessing.Process)
+_procs = {}
+# 因任务停止被结束的进程 id
+_killed = set()
+# terminate 后等待的秒数，超时则强制 kill
+_GRACE = 0.5
+
+
+class TaskCancelled(RuntimeError):
+    pass
+
+
+def bind(uuid):
+    _local.uuid = uuid
+
+
+def current():
+    return getattr(_local, 'uuid', None)
+
+
+def register(proc, uuid=None):
+    """
+    返回实际登记的 uuid，没有所属任务时返回 None
+    """
+    uuid = uuid or current()
+    if not uuid:
+        return None
+    with _lock:
+        _procs.setdefault(uuid, set()).add(proc)
+    # 任务已在停止中，立即结束
+    from videotrans.configure import config
+    if uuid in config.stoped_uuid_set:
+        kill(uuid)
+    return uuid
+
+
+def unregister(proc, uuid):
+    """
+    返回该进程是否因任务停止被结束
+    """
+    with _lock:
+        procs = _procs.get(uuid)
+        if procs is not None:
+            procs.discard(proc)
+            if not procs:
+                _procs.pop(uuid, None)
+        if proc.pid in _killed:
+            _killed.discard(proc.pid)
+            return True
+    return False
+
+
+def _popen_kwargs():
+    # 子进程放在单独的进程组，便于连同其子进程一起结束
+    if sys.platform == 'win32':
+        return {"creationflags": subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def _kill_tree(proc):
+    if isinstance(proc, subprocess.Popen):
+        if proc.poll() is not None:
+            return
+        if sys.platform == 'win32':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(proc.pid)], capture_output=True,
+                           creationflags=subprocess.CREATE_NO_WINDOW)
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(_GRACE)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        return
+    # multiprocessing.Process
+    if not proc.is_alive():
+        return
+    proc.terminate()
+    proc.join(_GRACE)
+    if proc.is_alive():
+        proc.kill()
+
+
+def kill(uuid):
+    """
+    结束该任务登记的所有子进程，在后台线程执行，不阻塞调用方
+    """
+    with _lock:
+        procs = list(_procs.pop(uuid, ()))
+        _killed.update(p.pid for p in procs if p.pid)
+    if not procs:
+        return None
+
+    def _run():
+        for p in procs:
+            try:
+                _kill_tree(p)
+            except Exception:
+                pass
+
+    t = threading.Thread(target=_run, daemon=True)
+    t.start()
+    return t
+
+
+def run(cmd, *, uuid=None, check=True, **kwargs):
+    """
+    与 subprocess.run(stdout=PIPE, stderr=PIPE) 相同，进程登记到任务，任务停止时抛出 TaskCancelled
+    """
+    kwargs = {**_popen_kwargs(), **kwargs}
+    if 'creationflags' in kwargs and sys.platform == 'win32':
+        kwargs['creationflags'] |= subprocess.CREATE_NEW_PROCESS_GROUP
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+    uuid = register(proc, uuid)
+    try:
+        stdout, stderr = proc.communicate()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        killed = unregister(proc, uuid)
+    if killed:
+        raise TaskCancelled(f'stopped {uuid}')
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
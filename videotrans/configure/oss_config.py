@@ -355,7 +355,9 @@ class OSSConfigManager:
             "upload_on_complete": True,
             "upload_timeout": 300,
             "retry_count": 3,
-            "multipart_threshold": 104857600
+            "multipart_threshold": 104857600,
+            "multipart_part_size": 10485760,
+            "multipart_workers": 4
         }
 
     def get_config(self) -> Dict:
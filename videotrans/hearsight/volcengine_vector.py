@@ -5,12 +5,379 @@
 参考文档: https://www.volcengine.com/docs/82379/1521766
 """
 import os
+import bisect
+import threading
+import time
 import requests
 import json
 import hashlib
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+import numpy as np
+
+# 本地检索索引所在的子目录，位于 local_storage_path 下
+INDEX_DIR = '_index'
+# 存储目录未变化时，至少间隔该秒数才重新检查 JSON 文件是否被外部修改
+SYNC_INTERVAL = 5.0
+# 已删除的行超过一半且不少于该行数时压缩索引
+COMPACT_MIN_ROWS = 1024
+
+
+class _LocalVectorIndex:
+    """
+    local_storage_path 下全部 JSON 文档向量的本地索引，只需加载一次，新增视频时增量追加
+    JSON 文件仍是唯一数据源，索引损坏或删除后会从 JSON 文件重新建立
+
+    _index/vectors.f32  归一化后的 float32 向量，按行追加，检索时以 np.memmap 映射，一次矩阵向量乘法得到全部相似度
+    _index/docs.jsonl   每个视频一行，保存各文档的 id、text 和 metadata，不含向量，只在返回结果时读取
+    _index/index.jsonl  每个视频一条记录：文件名、video_id、源文件 [mtime_ns, size]、行数、维度、文档类型及在 docs.jsonl 中的位置，
+                        删除时追加 {"delete": 文件名}
+    写入顺序为向量、文档、记录，记录是提交点，中途崩溃留下的多余向量和文档在下次写入或加载时截断
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dir = os.path.join(path, INDEX_DIR)
+        self.vec_file = os.path.join(self.dir, 'vectors.f32')
+        self.docs_file = os.path.join(self.dir, 'docs.jsonl')
+        self.index_file = os.path.join(self.dir, 'index.jsonl')
+        self.lock = threading.RLock()
+        self._dir_mtime = None
+        self._synced = 0.0
+        # 无法解析的 JSON 文件 -> 源文件信息，文件未变化前不再重试
+        self._failed = {}
+        self._clear()
+        self._load()
+
+    def _clear(self):
+        self.dim = 0
+        self.rows = 0
+        self.docs_size = 0
+        self.index_size = 0
+        # [start, end, 文件名, video_id, docs 偏移, docs 长度]，按 start 递增
+        self._segments = []
+        self._starts = []
+        # 文件名 -> (segments 下标, 源文件信息)
+        self._videos = {}
+        # 按容量分配，有效长度为 rows
+        self._alive = np.zeros(0, dtype=bool)
+        self._types = np.zeros(0, dtype=np.int16)
+        self._type_codes = {}
+        self._mm = None
+
+    def _reset(self):
+        self._mm = None
+        for file in (self.index_file, self.docs_file, self.vec_file):
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+        self._clear()
+
+    def _load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'rb') as f:
+                for line in f:
+                    # 未写完的最后一行视为未提交
+                    if not line.endswith(b'\n'):
+                        break
+                    self._apply(json.loads(line))
+                    self.index_size += len(line)
+            vec_size = os.path.getsize(self.vec_file) if os.path.exists(self.vec_file) else 0
+            docs_size = os.path.getsize(self.docs_file) if os.path.exists(self.docs_file) else 0
+            if vec_size < self.rows * self.dim * 4 or docs_size < self.docs_size:
+                raise ValueError('索引文件不完整')
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+            print(f"[volcengine] 本地索引损坏，将重新建立: {e}")
+            self._reset()
+            return
+        self._truncate(self.index_file, self.index_size)
+        self._truncate(self.vec_file, self.rows * self.dim * 4)
+        self._truncate(self.docs_file, self.docs_size)
+
+    @staticmethod
+    def _truncate(file, size):
+        if os.path.exists(file) and os.path.getsize(file) > size:
+            with open(file, 'r+b') as f:
+                f.truncate(size)
+
+    def _type_code(self, doc_type):
+        code = self._type_codes.get(doc_type)
+        if code is None:
+            code = self._type_codes[doc_type] = len(self._type_codes)
+        return code
+
+    def _drop(self, name):
+        video = self._videos.pop(name, None)
+        if video is not None:
+            start, end = self._segments[video[0]][:2]
+            self._alive[start:end] = False
+
+    def _apply(self, rec):
+        """将一条索引记录应用到内存状态"""
+        if 'delete' in rec:
+            self._drop(rec['delete'])
+            return
+        self._drop(rec['name'])
+        n = rec['rows']
+        start = self.rows
+        if start + n > len(self._alive):
+            cap = max(start + n, 2 * len(self._alive), 1024)
+            alive = np.zeros(cap, dtype=bool)
+            alive[:start] = self._alive[:start]
+            types = np.zeros(cap, dtype=np.int16)
+            types[:start] = self._types[:start]
+            self._alive, self._types = alive, types
+        self._alive[start:start + n] = True
+        self._types[start:start + n] = [self._type_code(t) for t in rec['types']]
+        self._segments.append([start, start + n, rec['name'], rec['video_id'], rec['docs'][0], rec['docs'][1]])
+        self._starts.append(start)
+        self._videos[rec['name']] = (len(self._segments) - 1, tuple(rec['source']))
+        self.rows += n
+        if n:
+            self.dim = rec['dim']
+        self.docs_size = rec['docs'][0] + rec['docs'][1]
+
+    def _append_file(self, file, size, data):
+        with open(file, 'ab') as f:
+            if f.tell() > size:
+                f.truncate(size)
+            f.write(data)
+
+    def _append(self, name, source, data):
+        """将一个 JSON 文件的全部文档追加到索引，同名旧数据标记为删除"""
+        docs = data.get('documents') or []
+        dim = self.dim
+        vectors = np.zeros((0, dim), dtype=np.float32)
+        if docs:
+            vectors = np.asarray([doc['embedding'] for doc in docs], dtype=np.float32)
+            if vectors.ndim != 2:
+                raise ValueError('embedding 维度不一致')
+            dim = vectors.shape[1]
+            if self.dim and dim != self.dim:
+                if self._alive[:self.rows].any():
+                    raise ValueError(f'embedding 维度 {dim} 与索引维度 {self.dim} 不一致')
+                # 已无有效数据时允许更换 embedding 模型
+                self._reset()
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            vectors /= norms
+        doc_line = (json.dumps(
+            [{"id": doc['id'], "text": doc['text'], "metadata": doc['metadata']} for doc in docs],
+            ensure_ascii=False) + '\n').encode('utf-8')
+        rec = {
+            "name": name,
+            "video_id": data.get('video_id'),
+            "source": list(source),
+            "rows": len(docs),
+            "dim": dim,
+            "types": [doc['metadata'].get('type') for doc in docs],
+            "docs": [self.docs_size, len(doc_line)]
+        }
+        rec_line = (json.dumps(rec, ensure_ascii=False) + '\n').encode('utf-8')
+        os.makedirs(self.dir, exist_ok=True)
+        # Windows 下已映射的文件无法截断，写入前先释放映射
+        self._mm = None
+        self._append_file(self.vec_file, self.rows * self.dim * 4, vectors.astype('<f4').tobytes())
+        self._append_file(self.docs_file, self.docs_size, doc_line)
+        self._append_file(self.index_file, self.index_size, rec_line)
+        self.index_size += len(rec_line)
+        self._apply(rec)
+
+    def _compact(self):
+        """只保留有效数据重写索引文件"""
+        mm = self._matrix()
+        type_names = {code: name for name, code in self._type_codes.items()}
+        tmp = [f'{file}.tmp' for file in (self.vec_file, self.docs_file, self.index_file)]
+        with open(tmp[0], 'wb') as vec_f, open(tmp[1], 'wb') as docs_f, open(tmp[2], 'wb') as index_f, \
+                open(self.docs_file, 'rb') as old_docs:
+            for name, (i, source) in sorted(self._videos.items(), key=lambda x: x[1][0]):
+                start, end, _, video_id, offset, length = self._segments[i]
+                if end > start:
+                    vec_f.write(np.ascontiguousarray(mm[start:end]).tobytes())
+                old_docs.seek(offset)
+                doc_line = old_docs.read(length)
+                rec = {
+                    "name": name,
+                    "video_id": video_id,
+                    "source": list(source),
+                    "rows": end - start,
+                    "dim": self.dim,
+                    "types": [type_names[code] for code in self._types[start:end].tolist()],
+                    "docs": [docs_f.tell(), length]
+                }
+                docs_f.write(doc_line)
+                index_f.write((json.dumps(rec, ensure_ascii=False) + '\n').encode('utf-8'))
+        mm = None
+        self._mm = None
+        # 索引记录最后替换，中途失败时加载会发现文件不一致并重新建立
+        for src, dst in zip(tmp, (self.vec_file, self.docs_file, self.index_file)):
+            os.replace(src, dst)
+        self._clear()
+        self._load()
+
+    def _maybe_compact(self):
+        dead = self.rows - int(np.count_nonzero(self._alive[:self.rows]))
+        if dead < COMPACT_MIN_ROWS or dead * 2 <= self.rows:
+            return
+        try:
+            self._compact()
+        except OSError as e:
+            print(f"[volcengine] 压缩本地索引失败: {e}")
+
+    def _matrix(self):
+        if self._mm is None and self.rows and self.dim:
+            self._mm = np.memmap(self.vec_file, dtype='<f4', mode='r', shape=(self.rows, self.dim))
+        return self._mm
+
+    def sync(self, force: bool = False):
+        """按 JSON 文件的修改时间和大小同步索引，只处理新增、修改和删除的文件"""
+        with self.lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            now = time.monotonic()
+            if not force and mtime == self._dir_mtime and now - self._synced < SYNC_INTERVAL:
+                return
+            files = {}
+            if mtime is not None:
+                for entry in os.scandir(self.path):
+                    if entry.name.endswith('.json') and entry.is_file():
+                        st = entry.stat()
+                        files[entry.name] = (st.st_mtime_ns, st.st_size)
+            for name in [name for name in self._videos if name not in files]:
+                self.remove(name)
+            for name, source in files.items():
+                video = self._videos.get(name)
+                if (video is not None and video[1] == source) or self._failed.get(name) == source:
+                    continue
+                try:
+                    with open(os.path.join(self.path, name), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    self._append(name, source, data)
+                    self._failed.pop(name, None)
+                except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                    print(f"[volcengine] 索引 {name} 失败: {e}")
+                    self._failed[name] = source
+            self._dir_mtime = mtime
+            self._synced = now
+            self._maybe_compact()
+
+    def put(self, name: str, data: Dict[str, Any]):
+        """store_summary 写入 JSON 文件后直接追加，无需重新读取文件"""
+        with self.lock:
+            st = os.stat(os.path.join(self.path, name))
+            self._append(name, (st.st_mtime_ns, st.st_size), data)
+            self._failed.pop(name, None)
+            self._maybe_compact()
+
+    def remove(self, name: str):
+        with self.lock:
+            if name not in self._videos:
+                return
+            rec_line = (json.dumps({"delete": name}, ensure_ascii=False) + '\n').encode('utf-8')
+            self._append_file(self.index_file, self.index_size, rec_line)
+            self.index_size += len(rec_line)
+            self._drop(name)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        n_results: int = 5,
+        video_id: Optional[str] = None,
+        filter_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        返回与查询向量余弦相似度最高的 n_results 个文档，结果格式与逐文件计算时相同
+
+        Args:
+            query_embedding: 查询向量
+            n_results: 返回结果数量
+            video_id: 限制在特定视频中搜索
+            filter_type: 过滤类型
+
+        Returns:
+            List[Dict]: 按相似度降序排列的结果
+        """
+        with self.lock:
+            self.sync()
+            if n_results <= 0 or not self.rows or not self.dim:
+                return []
+            query = np.asarray(query_embedding, dtype=np.float32)
+            if query.shape != (self.dim,):
+                print(f"[volcengine] 查询向量维度 {query.shape[-1] if query.ndim else 0} 与索引维度 {self.dim} 不一致")
+                return []
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+            code = None
+            if filter_type:
+                code = self._type_codes.get(filter_type)
+                if code is None:
+                    return []
+            if video_id:
+                ranges = [self._segments[i][:2] for i, _ in self._videos.values() if self._segments[i][3] == video_id]
+            else:
+                ranges = [(0, self.rows)]
+
+            mm = self._matrix()
+            cand_rows, cand_sims = [], []
+            for start, end in ranges:
+                mask = self._alive[start:end]
+                if code is not None:
+                    mask = mask & (self._types[start:end] == code)
+                count = int(np.count_nonzero(mask))
+                if not count:
+                    continue
+                sims = np.dot(mm[start:end], query)
+                sims[~mask] = -np.inf
+                k = min(n_results, count)
+                top = np.argpartition(-sims, k - 1)[:k]
+                cand_rows.append(top + start)
+                cand_sims.append(sims[top])
+            if not cand_rows:
+                return []
+            rows = np.concatenate(cand_rows)
+            sims = np.concatenate(cand_sims)
+            order = np.argsort(-sims, kind='stable')[:n_results]
+
+            results = []
+            docs_cache = {}
+            with open(self.docs_file, 'rb') as f:
+                for row, sim in zip(rows[order].tolist(), sims[order].tolist()):
+                    i = bisect.bisect_right(self._starts, row) - 1
+                    start, _, _, _, offset, length = self._segments[i]
+                    if i not in docs_cache:
+                        f.seek(offset)
+                        docs_cache[i] = json.loads(f.read(length))
+                    doc = docs_cache[i][row - start]
+                    results.append({
+                        "document": doc['text'],
+                        "metadata": doc['metadata'],
+                        "id": doc['id'],
+                        "distance": 1 - sim,  # 转换为距离（越小越相似）
+                        "similarity": sim
+                    })
+            return results
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_index(path: str) -> _LocalVectorIndex:
+    """每个存储目录只加载一次索引"""
+    key = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = _LocalVectorIndex(key)
+        return index
+
 
 class VolcengineVectorClient:
     """火山引擎向量化服务客户端"""
@@ -269,6 +636,12 @@ class VolcengineVectorClient:
             with open(storage_file, 'w', encoding='utf-8') as f:
                 json.dump(storage_data, f, ensure_ascii=False, indent=2)
 
+            # 同步追加到本地检索索引，失败时下次检索会从 JSON 文件补齐
+            try:
+                _get_index(local_storage_path).put(f"{video_id}.json", storage_data)
+            except Exception as index_error:
+                print(f"[volcengine] 更新本地索引失败（非致命）: {index_error}")
+
             print(f"[volcengine] 成功存储视频摘要: {os.path.basename(video_path)}")
             print(f"   - 整体摘要: 1 条")
             print(f"   - 段落摘要: {len(paragraphs)} 条")
@@ -329,7 +702,6 @@ class VolcengineVectorClient:
                 print("[volcengine] 查询文本向量化失败")
                 return []
 
-            # 读取所有存储的文档
             if local_storage_path is None:
                 from videotrans.configure import config
                 local_storage_path = os.path.join(config.ROOT_DIR, 'vector_db', 'volcengine')
@@ -337,42 +709,8 @@ class VolcengineVectorClient:
             if not os.path.exists(local_storage_path):
                 return []
 
-            all_results = []
-
-            # 遍历所有JSON文件
-            for filename in os.listdir(local_storage_path):
-                if not filename.endswith('.json'):
-                    continue
-
-                filepath = os.path.join(local_storage_path, filename)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                # 如果指定了video_id，跳过不匹配的
-                if video_id and data['video_id'] != video_id:
-                    continue
-
-                # 计算相似度
-                for doc in data['documents']:
-                    meta = doc['metadata']
-
-                    # 类型过滤
-                    if filter_type and meta.get('type') != filter_type:
-                        continue
-
-                    similarity = self._cosine_similarity(query_embedding, doc['embedding'])
-
-                    all_results.append({
-                        "document": doc['text'],
-                        "metadata": meta,
-                        "id": doc['id'],
-                        "distance": 1 - similarity,  # 转换为距离（越小越相似）
-                        "similarity": similarity
-                    })
-
-            # 按相似度排序并返回前n个
-            all_results.sort(key=lambda x: x['distance'])
-            return all_results[:n_results]
+            # 向量常驻本地索引，不再每次读取全部 JSON 文件
+            return _get_index(local_storage_path).search(query_embedding, n_results, video_id, filter_type)
 
         except Exception as e:
             print(f"[volcengine] 搜索失败: {e}")
@@ -406,6 +744,10 @@ class VolcengineVectorClient:
                 os.remove(storage_file)
                 print(f"[volcengine] 已删除本地JSON: {os.path.basename(video_path)}")
                 json_deleted = True
+                try:
+                    _get_index(local_storage_path).remove(f"{video_id}.json")
+                except Exception as index_error:
+                    print(f"[volcengine] 更新本地索引失败（非致命）: {index_error}")
 
             # 2. 删除PostgreSQL数据
             pg_deleted = self._delete_from_postgresql(video_path)
@@ -1019,6 +1019,9 @@ class WinAction(WinActionSub):
 
         # 删除本次任务的所有进度队列
         self._clear_task()
+        # 本批任务结束，释放降噪模型
+        from videotrans.task._remove_noise import release_model
+        release_model()
         # 启用
         self.disabled_widget(False)
         # 启用相关模式
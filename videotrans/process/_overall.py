@@ -10,11 +10,87 @@ from huggingface_hub.errors import LocalEntryNotFoundError
 from videotrans.util.tools import cleartext
 
 
+def _compute_type(model_name, is_cuda, settings):
+    if model_name.startswith('distil-'):
+        return "default"
+    return settings['cuda_com_type']
+
+
+# 子进程不继承父进程运行中设置的代理，模型下载前重新设置
+def _set_proxy(proxy):
+    if proxy:
+        os.environ['http_proxy'] = proxy
+        os.environ['https_proxy'] = proxy
+
+
+# 加载模型，失败时返回 (None, 错误信息)
+def _load_model(model_name, is_cuda, settings, down_root, defaulelang):
+    try:
+        model = WhisperModel(
+            model_name,
+            device="cuda" if is_cuda else "cpu",
+            compute_type=_compute_type(model_name, is_cuda, settings),
+            cpu_threads=int(float(settings.get('whisper_threads', 0))),
+            download_root=down_root
+        )
+    except LocalEntryNotFoundError:
+        return None, '下载模型失败了请确认网络稳定后重试，如果已使用代理，请尝试关闭。 访问网址  https://pvt9.com/820  可查看详细详细解决方案' if defaulelang == 'zh' else 'Download model failed, please confirm network stable and try again. Visit https://pvt9.com/820 for more detail.'
+    except Exception as e:
+        print(f'@@@@@@@@@@@@@{e}')
+        error = str(e)
+        if "Unable to open file 'model.bin'" in error:
+            return None, '可能网络原因模型下载中断，请尝试删掉models文件夹内相应模型文件夹，然后重试' if defaulelang == 'zh' else 'Maybe model download failed, please delete the corresponding model folder in the models directory and try again'
+        if "CUBLAS_STATUS_NOT_SUPPORTED" in error:
+            return None, "数据类型不兼容：请打开菜单--工具--高级选项--faster/openai语音识别调整--CUDA数据类型--选择 float16，保存后重试" if defaulelang == 'zh' else 'Incompatible data type: Please open the menu - Tools - Advanced options - Faster/OpenAI speech recognition adjustment - CUDA data type - select float16, save and try again'
+        if "cudaErrorNoKernelImageForDevice" in error:
+            return None, "pytorch和cuda版本不兼容，请更新显卡驱动后，安装或重装CUDA12.x及cuDNN9.x" if defaulelang == 'zh' else 'Pytorch and cuda versions are incompatible. Please update the graphics card driver and install or reinstall CUDA12.x and cuDNN9.x'
+        return None, str(e)
+    return model, ''
+
+
+# 识别，逐条产出 (识别出的语言, {"words":[],"text":""})
+def _transcribe(model, audio, *, detect_language, settings):
+    prompt = settings.get(f'initial_prompt_{detect_language}') if detect_language != 'auto' else None
+    segments, info = model.transcribe(
+        audio,
+        beam_size=int(settings['beam_size']),
+        best_of=int(settings['best_of']),
+        condition_on_previous_text=bool(settings['condition_on_previous_text']),
+        vad_filter=bool(settings['vad']),
+        vad_parameters=dict(
+            threshold=float(settings['threshold']),
+            min_speech_duration_ms=int(settings['min_speech_duration_ms']),
+            max_speech_duration_s=float(settings['max_speech_duration_s']) if float(
+                settings['max_speech_duration_s']) > 0 else float('inf'),
+            min_silence_duration_ms=int(settings['min_silence_duration_ms']),
+            speech_pad_ms=int(settings['speech_pad_ms'])
+        ),
+        word_timestamps=True,
+        language=detect_language.split('-')[0] if detect_language != 'auto' else None,
+        initial_prompt=prompt if prompt else None
+    )
+    langcode = 'zh-cn' if info.language[:2] == 'zh' else info.language
+    for segment in segments:
+        new_seg = []
+        for idx, word in enumerate(segment.words):
+            new_seg.append({"start": word.start, "end": word.end, "word": word.word})
+        yield langcode, {"words": new_seg, "text": cleartext(segment.text, remove_start_end=False)}
+
+
+def _empty_cache():
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except:
+        pass
+
+
 def run(raws, err, detect, *, model_name, is_cuda, detect_language, audio_file,
         q: multiprocessing.Queue, ROOT_DIR, TEMP_DIR, settings, defaulelang, proxy=None):
     os.chdir(ROOT_DIR)
     down_root = ROOT_DIR + "/models"
-    settings['whisper_threads'] = int(float(settings.get('whisper_threads', 1)))
+    _set_proxy(proxy)
 
     def write_log(jsondata):
         try:
@@ -26,69 +102,20 @@ def run(raws, err, detect, *, model_name, is_cuda, detect_language, audio_file,
 
         msg = f'[{model_name}]若不存在将从 hf-mirror.com 下载到 models 目录内' if defaulelang == 'zh' else f'If [{model_name}] not exists, download model from huggingface'
         write_log({"text": msg, "type": "logs"})
-        if model_name.startswith('distil-'):
-            com_type = "default"
-        elif is_cuda:
-            com_type = settings['cuda_com_type']
-        else:
-            com_type = settings['cuda_com_type']
-        try:
-            model = WhisperModel(
-                model_name,
-                device="cuda" if is_cuda else "cpu",
-                compute_type=com_type,
-                download_root=down_root
-            )
-        except LocalEntryNotFoundError:
-            err['msg'] = '下载模型失败了请确认网络稳定后重试，如果已使用代理，请尝试关闭。 访问网址  https://pvt9.com/820  可查看详细详细解决方案' if defaulelang == 'zh' else 'Download model failed, please confirm network stable and try again. Visit https://pvt9.com/820 for more detail.'
-            return
-        except Exception as e:
-            print(f'@@@@@@@@@@@@@{e}')
-            error = str(e)
-            if "Unable to open file 'model.bin'" in error:
-                err['msg'] = '可能网络原因模型下载中断，请尝试删掉models文件夹内相应模型文件夹，然后重试' if defaulelang == 'zh' else 'Maybe model download failed, please delete the corresponding model folder in the models directory and try again'
-            elif "CUBLAS_STATUS_NOT_SUPPORTED" in error:
-                err['msg'] = "数据类型不兼容：请打开菜单--工具--高级选项--faster/openai语音识别调整--CUDA数据类型--选择 float16，保存后重试" if defaulelang == 'zh' else 'Incompatible data type: Please open the menu - Tools - Advanced options - Faster/OpenAI speech recognition adjustment - CUDA data type - select float16, save and try again'
-            elif "cudaErrorNoKernelImageForDevice" in error:
-                err['msg'] = "pytorch和cuda版本不兼容，请更新显卡驱动后，安装或重装CUDA12.x及cuDNN9.x" if defaulelang == 'zh' else 'Pytorch and cuda versions are incompatible. Please update the graphics card driver and install or reinstall CUDA12.x and cuDNN9.x'
-            else:
-                err['msg'] = str(e)
+        model, error = _load_model(model_name, is_cuda, settings, down_root, defaulelang)
+        if model is None:
+            err['msg'] = error
             return
 
         write_log({"text": model_name + " Loaded", "type": "logs"})
-        prompt = settings.get(f'initial_prompt_{detect_language}') if detect_language != 'auto' else None
-        segments, info = model.transcribe(
-            audio_file,
-            beam_size=int(settings['beam_size']),
-            best_of=int(settings['best_of']),
-            condition_on_previous_text=bool(settings['condition_on_previous_text']),
-            vad_filter=bool(settings['vad']),
-            vad_parameters=dict(
-                threshold=float(settings['threshold']),
-                min_speech_duration_ms=int(settings['min_speech_duration_ms']),
-                max_speech_duration_s=float(settings['max_speech_duration_s']) if float(
-                    settings['max_speech_duration_s']) > 0 else float('inf'),
-                min_silence_duration_ms=int(settings['min_silence_duration_ms']),
-                speech_pad_ms=int(settings['speech_pad_ms'])
-            ),
-            word_timestamps=True,
-            language=detect_language.split('-')[0] if detect_language != 'auto' else None,
-            initial_prompt=prompt if prompt else None
-        )
-        if detect_language == 'auto' and info.language != detect['langcode']:
-            detect['langcode'] = 'zh-cn' if info.language[:2] == 'zh' else info.language
-        nums = 0
-        for segment in segments:
-            nums += 1
+        for langcode, seg in _transcribe(model, audio_file, detect_language=detect_language, settings=settings):
+            if detect_language == 'auto' and langcode != detect['langcode']:
+                detect['langcode'] = langcode
             if not Path(TEMP_DIR + f'/{os.getpid()}.lock').exists():
                 return
-            new_seg = []
-            for idx, word in enumerate(segment.words):
-                new_seg.append({"start": word.start, "end": word.end, "word": word.word})
-            text = cleartext(segment.text, remove_start_end=False)
-            raws.append({"words": new_seg, "text": text})
+            raws.append(seg)
 
-            q.put_nowait({"text": f'{text}\n', "type": "subtitle"})
+            q.put_nowait({"text": f'{seg["text"]}\n', "type": "subtitle"})
             q.put_nowait({"text": f' {"字幕" if defaulelang == "zh" else "Subtitles"} {len(raws) + 1} ', "type": "logs"})
     except (LookupError, ValueError, AttributeError, ArithmeticError) as e:
         err['msg'] = f'{e}'
@@ -97,10 +124,66 @@ def run(raws, err, detect, *, model_name, is_cuda, detect_language, audio_file,
     except BaseException as e:
         err['msg'] = '_process:' + str(e)
     finally:
-        try:
-            import torch
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-        except:
-            pass
+        _empty_cache()
         time.sleep(2)
+
+
+def serve(conn, *, ROOT_DIR, TEMP_DIR, defaulelang, proxy=None):
+    """
+    常驻识别进程：模型只在第一个任务时加载，之后复用
+    通过 conn 接收任务 dict，None 表示退出
+        {"model_name","is_cuda","detect_language","settings","audio_file"}
+    逐条回传 {"type":"logs"|"subtitle","text"} {"type":"segment","data"} {"type":"detect","langcode"}
+    出错回传 {"type":"error","text"}，每个任务以 {"type":"done"} 结束
+    每个任务期间父进程创建 TEMP_DIR/{pid}.lock，删除即表示取消当前任务
+    """
+    os.chdir(ROOT_DIR)
+    down_root = ROOT_DIR + "/models"
+    _set_proxy(proxy)
+    lockfile = Path(TEMP_DIR + f'/{os.getpid()}.lock')
+    model = None
+    while 1:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        model_name = job['model_name']
+        detect_language = job['detect_language']
+        settings = job['settings']
+        try:
+            if model is None:
+                msg = f'[{model_name}]若不存在将从 hf-mirror.com 下载到 models 目录内' if defaulelang == 'zh' else f'If [{model_name}] not exists, download model from huggingface'
+                conn.send({"text": msg, "type": "logs"})
+                model, error = _load_model(model_name, job['is_cuda'], settings, down_root, defaulelang)
+                if model is None:
+                    conn.send({"text": error, "type": "error"})
+                    continue
+                conn.send({"text": model_name + " Loaded", "type": "logs"})
+            nums = 0
+            langcode = None
+            for code, seg in _transcribe(model, job['audio_file'], detect_language=detect_language, settings=settings):
+                if not lockfile.exists():
+                    break
+                if detect_language == 'auto' and code != langcode:
+                    langcode = code
+                    conn.send({"type": "detect", "langcode": code})
+                nums += 1
+                conn.send({"type": "segment", "data": seg})
+                conn.send({"text": f'{seg["text"]}\n', "type": "subtitle"})
+                conn.send({"text": f' {"字幕" if defaulelang == "zh" else "Subtitles"} {nums + 1} ', "type": "logs"})
+        except (LookupError, ValueError, AttributeError, ArithmeticError) as e:
+            msg = f'{e}'
+            if detect_language == 'auto':
+                msg += 'Failed to detect language, please set the voice language'
+            conn.send({"text": msg, "type": "error"})
+        except Exception as e:
+            conn.send({"text": '_process:' + str(e), "type": "error"})
+        finally:
+            try:
+                conn.send({"type": "done"})
+            except (EOFError, OSError):
+                break
+    model = None
+    _empty_cache()
@@ -0,0 +1,84 @@
+import wave
+
+import numpy as np
+from pydub import AudioSegment
+
+# 在独立进程中执行的音频变速(WSOLA)，只依赖 numpy/pydub，便于 spawn 进程池快速启动
+
+# 分析帧长(秒)，合成步长为帧长一半
+FRAME_SEC = 0.04
+# 相似度搜索范围(秒)
+TOLERANCE_SEC = 0.01
+# 相似度搜索时的降采样倍数，搜索后在原采样率下做小范围精调
+SEARCH_DECIMATE = 4
+
+
+def wsola(samples, ratio, sample_rate):
+    """
+    WSOLA 时间伸缩，不改变音调
+    samples: float32 数组，形状 (n, channels)
+    ratio: 速度倍率，>1 为加速(变短)
+    返回伸缩后的 float32 数组，长度约为 n/ratio
+    """
+    n_in, channels = samples.shape
+    n_out = int(n_in / ratio)
+    if n_in == 0 or n_out == 0:
+        return np.zeros((0, channels), dtype=np.float32)
+
+    frame = max(64, int(sample_rate * FRAME_SEC) // 2 * 2)
+    hs = frame // 2
+    ha = hs * ratio
+    tol = max(SEARCH_DECIMATE, int(sample_rate * TOLERANCE_SEC))
+    win = np.hanning(frame + 1)[:-1].astype(np.float32)
+
+    n_frames = n_out // hs + 1
+    tail = frame + 2 * tol + int(np.ceil(ha)) + hs
+    x = np.pad(samples, ((tol, tail), (0, 0)))
+    mono = x.mean(axis=1)
+    mono_dec = mono[::SEARCH_DECIMATE]
+    frame_dec = frame // SEARCH_DECIMATE
+    tol_dec = tol // SEARCH_DECIMATE
+
+    out = np.zeros((n_frames * hs + frame, channels), dtype=np.float32)
+    norm = np.zeros(n_frames * hs + frame, dtype=np.float32)
+    prev = tol
+    for k in range(n_frames):
+        nominal = int(round(k * ha)) + tol
+        if k == 0:
+            pos = nominal
+        else:
+            # 寻找与上一帧自然延续部分最相似的位置，保证相位连续
+            natural = prev + hs
+            lo = (nominal - tol) // SEARCH_DECIMATE
+            n0 = natural // SEARCH_DECIMATE
+            corr = np.correlate(mono_dec[lo:lo + 2 * tol_dec + frame_dec],
+                                mono_dec[n0:n0 + frame_dec], 'valid')
+            coarse = (lo + int(np.argmax(corr))) * SEARCH_DECIMATE
+            lo = max(0, coarse - SEARCH_DECIMATE)
+            corr = np.correlate(mono[lo:lo + 2 * SEARCH_DECIMATE + frame],
+                                mono[natural:natural + frame], 'valid')
+            pos = lo + int(np.argmax(corr))
+        start = k * hs
+        out[start:start + frame] += x[pos:pos + frame] * win[:, None]
+        norm[start:start + frame] += win
+        prev = pos
+    norm[norm < 1e-3] = 1.0
+    out /= norm[:, None]
+    return out[:n_out]
+
+
+def stretch_file(input_file, output_file, ratio, target_ms, sample_rate, channels):
+    """
+    读取配音文件，变速后写为 16bit wav，时长不超过 target_ms
+    返回由采样数计算出的新时长(毫秒)，无需再 ffprobe
+    """
+    seg = AudioSegment.from_file(input_file).set_frame_rate(sample_rate).set_channels(channels).set_sample_width(2)
+    samples = np.frombuffer(seg.raw_data, dtype=np.int16).reshape(-1, channels).astype(np.float32) / 32768.0
+    result = wsola(samples, ratio, sample_rate)[:int(target_ms * sample_rate / 1000)]
+    pcm = (np.clip(result, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(output_file, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return int(len(pcm) * 1000 / sample_rate)
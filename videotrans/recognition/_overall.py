@@ -7,8 +7,8 @@ from typing import List
 
 
 
-from videotrans.configure import config
-from videotrans.process._overall import run
+from videotrans.configure import config, _procs
+from videotrans.process._overall import run, serve, _compute_type
 from videotrans.recognition._base import BaseRecogn
 from videotrans.util import tools
 
@@ -20,6 +20,88 @@ funasr
 """
 
 
+# 常驻进程的复用键，任一项变化都需重建进程并重新加载模型
+def _worker_key(model_name, is_cuda, settings, proxy):
+    return (model_name, bool(is_cuda), _compute_type(model_name, is_cuda, settings),
+            int(float(settings.get('whisper_threads', 0))), proxy or '')
+
+
+class _WarmWorker:
+    """
+    常驻 faster-whisper 识别进程，模型只加载一次，后续任务通过管道发送
+    模型名、设备、计算类型、CPU线程数或代理变化时重建进程，空闲超过 whisper_worker_ttl 秒后退出，0=每个任务后退出
+    同一时间只执行一个识别任务
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.process = None
+        self.conn = None
+        self.key = None
+        self.last_used = 0
+        self._reaper = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, key, proxy=None):
+        if self.is_alive() and self.key == key:
+            return
+        self.stop()
+        ctx = multiprocessing.get_context('spawn')
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=serve, args=(child_conn,), kwargs={
+            "defaulelang": config.defaulelang,
+            "ROOT_DIR": config.ROOT_DIR,
+            "TEMP_DIR": config.TEMP_DIR,
+            "proxy": proxy
+        }, daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.key = key
+        config.logger.info(f'启动常驻识别进程 pid:{self.process.pid} {key=}')
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap, daemon=True)
+            self._reaper.start()
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        config.logger.info(f'常驻识别进程已退出 pid:{self.process.pid}')
+        self.process = None
+        self.conn = None
+        self.key = None
+
+    def _reap(self):
+        while not config.exit_soft:
+            time.sleep(5)
+            if not self.lock.acquire(blocking=False):
+                continue
+            try:
+                ttl = float(config.settings.get('whisper_worker_ttl', 600))
+                if self.process is not None and time.time() - self.last_used > ttl:
+                    self.stop()
+            finally:
+                self.lock.release()
+        with self.lock:
+            self.stop()
+
+
+_warm_worker = _WarmWorker()
+
+
 @dataclass
 class FasterAll(BaseRecogn):
 
@@ -73,6 +155,9 @@ class FasterAll(BaseRecogn):
                 continue
             break
 
+        if float(config.settings.get('whisper_worker_ttl', 600)) > 0:
+            return self._exec_warm()
+
         ctx = multiprocessing.get_context('spawn')
         # 创建队列用于在进程间传递结果
         result_queue = ctx.Queue()
@@ -98,6 +183,8 @@ class FasterAll(BaseRecogn):
                     "proxy": tools.set_proxy()
                 })
                 process.start()
+                # 任务停止时由 _procs 立即结束识别进程
+                _procs.register(process, self.uuid)
                 self.pidfile = config.TEMP_DIR + f'/{process.pid}.lock'
                 config.logger.info(f'开始创建 pid:{self.pidfile=}')
                 with open(self.pidfile, 'w', encoding='utf-8') as f:
@@ -124,6 +211,7 @@ class FasterAll(BaseRecogn):
                         except:
                             self.get_srtlist(raws)
                 try:
+                    _procs.unregister(process, self.uuid)
                     if process.is_alive():
                         process.terminate()
                 except:
@@ -142,3 +230,96 @@ class FasterAll(BaseRecogn):
             return self.raws
 
         raise RuntimeError(self.error if self.error else (f"没有识别到任何说话声,请确认所选音视频中是否包含人类说话声，以及说话语言是否同所选一致 {',请尝试取消选中CUDA加速后重试' if self.is_cuda else ''}" if config.defaulelang == 'zh' else "No speech was detected, please make sure there is human speech in the selected audio/video and that the language is the same as the selected one."))
+
+    # 交给常驻进程识别，逐条接收结果
+    def _exec_warm(self):
+        proxy = tools.set_proxy()
+        key = _worker_key(self.model_name, self.is_cuda, config.settings, proxy)
+        raws = []
+        self.error = ''
+        process = None
+        with _warm_worker.lock:
+            try:
+                _warm_worker.start(key, proxy)
+                if self.inst and self.inst.precent < 50:
+                    self.inst.precent += 1
+                # 识别期间常驻进程登记到当前任务，停止任务时直接结束，下个任务重新启动
+                process = _warm_worker.process
+                _procs.register(process, self.uuid)
+                self.pidfile = config.TEMP_DIR + f'/{_warm_worker.process.pid}.lock'
+                with open(self.pidfile, 'w', encoding='utf-8') as f:
+                    f.write(f'{_warm_worker.process.pid}')
+                _warm_worker.conn.send({
+                    "model_name": self.model_name,
+                    "is_cuda": self.is_cuda,
+                    "detect_language": self.detect_language,
+                    "audio_file": self.audio_file,
+                    "settings": config.settings,
+                })
+                stop_at = None
+                while 1:
+                    if stop_at is None and self._exit():
+                        # 删除锁文件通知子进程停止当前任务，超时未结束则杀掉进程
+                        Path(self.pidfile).unlink(missing_ok=True)
+                        stop_at = time.time() + 10
+                    if stop_at is not None and time.time() > stop_at:
+                        _warm_worker.stop()
+                        return
+                    if not _warm_worker.conn.poll(0.2):
+                        if not _warm_worker.is_alive():
+                            if self._exit():
+                                # 任务停止时已被结束
+                                _warm_worker.stop()
+                                return
+                            raise RuntimeError('faster-whisper process exited unexpectedly')
+                        continue
+                    data = _warm_worker.conn.recv()
+                    if data['type'] == 'done':
+                        break
+                    if data['type'] == 'segment':
+                        raws.append(data['data'])
+                        continue
+                    if data['type'] == 'detect':
+                        if self.inst and hasattr(self.inst, 'set_source_language'):
+                            config.logger.info(f'需要自动检测语言，当前检测出的语言为{data["langcode"]=}')
+                            self.detect_language = data['langcode']
+                        continue
+                    if data['type'] == 'error':
+                        self.error = data['text']
+                        continue
+                    if self.inst and self.inst.precent < 50:
+                        self.inst.precent += 0.1
+                    if self.inst and self.inst.status_text and data['type'] == 'logs':
+                        self.inst.status_text = data['text']
+                    self._signal(text=data['text'], type=data['type'])
+            except (EOFError, OSError) as e:
+                config.logger.exception(f'{e}', exc_info=True)
+                self.error = f"{e}"
+                _warm_worker.stop()
+            except Exception as e:
+                config.logger.exception(f'{e}', exc_info=True)
+                self.error = f"{e}"
+            finally:
+                if process is not None:
+                    _procs.unregister(process, self.uuid)
+                if self.pidfile:
+                    Path(self.pidfile).unlink(missing_ok=True)
+                _warm_worker.last_used = time.time()
+
+        if not self.error and len(raws) > 0:
+            if not config.settings['rephrase']:
+                self.get_srtlist(raws)
+            else:
+                try:
+                    words_list = []
+                    for it in raws:
+                        words_list += it['words']
+                    self._signal(text="正在重新断句..." if config.defaulelang == 'zh' else "Re-segmenting...")
+                    self.raws = self.re_segment_sentences(words_list, self.detect_language[:2])
+                except:
+                    self.get_srtlist(raws)
+
+        if not self.error and len(self.raws) > 0:
+            return self.raws
+
+        raise RuntimeError(self.error if self.error else (f"没有识别到任何说话声,请确认所选音视频中是否包含人类说话声，以及说话语言是否同所选一致 {',请尝试取消选中CUDA加速后重试' if self.is_cuda else ''}" if config.defaulelang == 'zh' else "No speech was detected, please make sure there is human speech in the selected audio/video and that the language is the same as the selected one."))
@@ -3,9 +3,6 @@ import os
 import traceback
 from pathlib import Path
 
-import librosa
-import soundfile as sf
-
 from pydub import AudioSegment
 
 from videotrans.configure import config
@@ -13,47 +10,51 @@ from videotrans.configure import config
 from videotrans.separate.vr import AudioPre
 
 
-def uvr(*, model_name=None, save_root=None, inp_path=None, source="logs", uuid=None, percent=[0, 1]):
+def load_model(model_name="HP2", source="logs"):
+    import torch
+    return AudioPre(
+        agg=10,
+        model_path=config.ROOT_DIR + f"/uvr5_weights/{model_name}.pth",
+        device="cuda" if torch.cuda.is_available() else "cpu",
+        is_half=False,
+        source=source
+    )
+
+
+def release_model(pre_fun):
+    try:
+        if hasattr(pre_fun, "model"):
+            del pre_fun.model
+        del pre_fun
+    except Exception:
+        traceback.print_exc()
+    import torch
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# pre_fun 为已加载的模型，传入时复用且不释放，用于同一任务的多个分段
+def uvr(*, model_name=None, save_root=None, inp_path=None, source="logs", uuid=None, percent=[0, 1], pre_fun=None):
     infos = []
-    pre_fun=None
+    own_model = pre_fun is None
     try:
-        import torch
-        func = AudioPre
-        pre_fun = func(
-            agg=10,
-            model_path=config.ROOT_DIR + f"/uvr5_weights/{model_name}.pth",
-            device="cuda" if torch.cuda.is_available() else "cpu",
-            is_half=False,
-            source=source
-        )
-        done = 0
+        if own_model:
+            pre_fun = load_model(model_name, source)
         try:
-            y, sr = librosa.load(inp_path, sr=None)
-            info = sf.info(inp_path)
-            channels = info.channels
-            need_reformat = 0
             pre_fun._path_audio_(
                 inp_path,
                 ins_root=save_root,
                 uuid=uuid,
                 percent=percent
             )
-            done = 1
         except  Exception:
             traceback.print_exc()
     except:
         infos.append(traceback.format_exc())
         yield "\n".join(infos)
     finally:
-        try:
-            if hasattr(pre_fun, "model"):
-                del pre_fun.model
-            del pre_fun
-        except Exception:
-            traceback.print_exc()
-        import torch
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+        if own_model and pre_fun is not None:
+            release_model(pre_fun)
     yield "\n".join(infos)
 
 
@@ -117,22 +118,27 @@ def start(audio, path, source="logs", uuid=None):
     instr_list = []
     grouplen = len(reslist)
     per = round(1 / grouplen, 2)
-    for i, audio_seg in enumerate(reslist):
-        if config.exit_soft or (uuid in config.stoped_uuid_set):
-            return
-        audio_path = Path(audio_seg)
-        path_dir = audio_path.parent / audio_path.stem
-        path_dir.mkdir(parents=True, exist_ok=True)
-        try:
-            gr = uvr(model_name="HP2", save_root=path_dir.as_posix(), inp_path=Path(audio_seg).as_posix(),
-                     source=source, uuid=uuid, percent=[i * per, per])
-            print(next(gr))
-            print(next(gr))
-        except StopIteration:
-            vocal_list.append((path_dir / 'vocal.wav').as_posix())
-            instr_list.append((path_dir / 'instrument.wav').as_posix())
-        except Exception as e:
-            raise
+    # 整个任务只加载一次模型，所有分段复用
+    pre_fun = load_model("HP2", source)
+    try:
+        for i, audio_seg in enumerate(reslist):
+            if config.exit_soft or (uuid in config.stoped_uuid_set):
+                return
+            audio_path = Path(audio_seg)
+            path_dir = audio_path.parent / audio_path.stem
+            path_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                gr = uvr(model_name="HP2", save_root=path_dir.as_posix(), inp_path=Path(audio_seg).as_posix(),
+                         source=source, uuid=uuid, percent=[i * per, per], pre_fun=pre_fun)
+                print(next(gr))
+                print(next(gr))
+            except StopIteration:
+                vocal_list.append((path_dir / 'vocal.wav').as_posix())
+                instr_list.append((path_dir / 'instrument.wav').as_posix())
+            except Exception as e:
+                raise
+    finally:
+        release_model(pre_fun)
 
     if len(vocal_list) < 1 or len(instr_list) < 1:
         raise Exception('separate bgm error')
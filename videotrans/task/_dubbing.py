@@ -9,6 +9,7 @@ from videotrans import tts
 from videotrans.configure import config
 from videotrans.task._base import BaseTask
 from videotrans.task._rate import SpeedRate
+from videotrans.tts._cache import fetch_cache, store_cache
 from videotrans.util import tools
 
 """
@@ -181,12 +182,16 @@ class DubbingSrt(BaseTask):
         self.queue_tts = queue_tts
         if not self.queue_tts or len(self.queue_tts) < 1:
             raise RuntimeError(f'Queue tts length is 0')
+        # 命中跨任务配音缓存的条目直接使用，仅合成未命中的
+        queue_miss, queue_dup = fetch_cache(self.queue_tts, language=self.cfg['target_language_code'])
         # 具体配音操作
-        tts.run(
-            queue_tts=copy.deepcopy(self.queue_tts),
-            language=self.cfg['target_language_code'],
-            uuid=self.uuid
-        )
+        if queue_miss:
+            tts.run(
+                queue_tts=copy.deepcopy(queue_miss),
+                language=self.cfg['target_language_code'],
+                uuid=self.uuid
+            )
+            store_cache(queue_miss, language=self.cfg['target_language_code'], duplicates=queue_dup)
         if config.settings.get('save_segment_audio', False):
             outname = self.cfg['target_dir'] + f'/segment_audio_{self.cfg["noextname"]}'
             Path(outname).mkdir(parents=True, exist_ok=True)
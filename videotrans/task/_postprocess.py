@@ -0,0 +1,332 @@
+import json
+import shutil
+import sqlite3
+import threading
+import time
+import uuid as _uuid
+from pathlib import Path
+
+from videotrans.configure import config
+from videotrans.util import tools
+
+"""
+任务完成后的后处理队列：上传 OSS、提交 HearSight 摘要、导出 Qdrant
+task_done 只负责入队，不再等待上传，合成线程可立即处理下一个任务
+作业以 SQLite(WAL) 存储在 ROOT_DIR/postprocess/jobs.db，失败后按指数退避重试，程序重启后继续执行未完成的作业
+同时执行的作业数由 postprocess_workers 设置，最大重试次数由 postprocess_max_retries 设置
+"""
+
+# 依次执行的步骤，hearsight 和 qdrant 使用 oss 步骤得到的地址
+STEPS = ('oss', 'hearsight', 'qdrant')
+
+_local = threading.local()
+_lock = threading.Lock()
+_cond = threading.Condition()
+_started = False
+
+
+def _job_dir():
+    job_dir = Path(f'{config.ROOT_DIR}/postprocess')
+    job_dir.mkdir(parents=True, exist_ok=True)
+    return job_dir.as_posix()
+
+
+def _conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(f'{_job_dir()}/jobs.db', timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_run REAL NOT NULL, error TEXT)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_next_run ON jobs(status, next_run)')
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _int_setting(name, default):
+    try:
+        return int(float(config.settings.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _oss_config():
+    try:
+        from videotrans.configure.oss_config import get_oss_config_manager
+        oss_config = get_oss_config_manager().load_config()
+    except Exception:
+        return None
+    if not oss_config.get('enabled', False) or not oss_config.get('upload_on_complete', True):
+        return None
+    return oss_config
+
+
+def build_job(cfg, uuid=None, video_file=None):
+    """
+    根据任务配置生成作业，没有需要执行的步骤时返回 None
+    video_file 为最终的视频路径，字幕会复制到 postprocess 目录，任务目录清理后仍可使用
+    需在清理任务目录前调用
+    """
+    steps = []
+    if video_file and Path(video_file).exists() and _oss_config():
+        steps.append('oss')
+
+    sub_file = None
+    language = None
+    if cfg.get('target_sub') and Path(cfg['target_sub']).exists():
+        sub_file, language = cfg['target_sub'], cfg.get('target_language_code', 'zh-cn')
+    elif cfg.get('source_sub') and Path(cfg['source_sub']).exists():
+        sub_file, language = cfg['source_sub'], cfg.get('source_language_code', 'zh-cn')
+    if sub_file:
+        if (config.params.get('hearsight_url') or '').strip():
+            steps.append('hearsight')
+        if config.params.get('enable_hearsight', False) and config.params.get('qdrant_enabled', True):
+            steps.append('qdrant')
+    if not steps:
+        return None
+
+    job_id = _uuid.uuid4().hex
+    job = {
+        'id': job_id,
+        'uuid': uuid,
+        'steps': steps,
+        'done': [],
+        'video_file': video_file,
+        'basename': cfg.get('basename'),
+        'name': cfg.get('name'),
+        'language': language,
+        'sub_file': None,
+        'oss_url': None,
+    }
+    if 'hearsight' in steps or 'qdrant' in steps:
+        job['sub_file'] = f'{_job_dir()}/{job_id}.srt'
+        shutil.copy2(sub_file, job['sub_file'])
+    return job
+
+
+def submit(job):
+    if not job:
+        return
+    conn = _conn()
+    conn.execute('INSERT INTO jobs (id, payload, status, attempts, next_run) VALUES (?,?,?,?,?)',
+                 (job['id'], json.dumps(job, ensure_ascii=False), 'pending', 0, time.time()))
+    conn.commit()
+    config.logger.info(f'[postprocess] 入队 {job["basename"]} steps={job["steps"]}')
+    start()
+    with _cond:
+        _cond.notify()
+
+
+def start():
+    """
+    启动后处理线程，重复调用无影响
+    上次退出时仍在执行的作业重新置为待执行
+    """
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+        try:
+            conn = _conn()
+            conn.execute("UPDATE jobs SET status='pending' WHERE status='running'")
+            conn.commit()
+        except sqlite3.Error as e:
+            config.logger.warning(f'[postprocess] 读取后处理作业失败:{e}')
+        for _ in range(max(1, _int_setting('postprocess_workers', 2))):
+            threading.Thread(target=_worker, daemon=True).start()
+
+
+def _claim():
+    # 取出一个到期的作业，返回 (作业, 已尝试次数) 或 (None, 距下一个作业到期的秒数)
+    with _lock:
+        conn = _conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT id, payload, attempts, next_run FROM jobs WHERE status='pending' ORDER BY next_run LIMIT 1").fetchone()
+        if row is None:
+            return None, None
+        if row[3] > now:
+            return None, row[3] - now
+        conn.execute("UPDATE jobs SET status='running' WHERE id=?", (row[0],))
+        conn.commit()
+        return json.loads(row[1]), row[2]
+
+
+def _worker():
+    while not config.exit_soft:
+        try:
+            job, attempts = _claim()
+        except sqlite3.Error as e:
+            config.logger.warning(f'[postprocess] 读取后处理作业失败:{e}')
+            job, attempts = None, None
+        if job is None:
+            with _cond:
+                _cond.wait(timeout=min(attempts, 5) if attempts else 5)
+            continue
+        _run_job(job, attempts)
+
+
+def _run_job(job, attempts):
+    conn = _conn()
+    error = None
+    for step in job['steps']:
+        if step in job['done']:
+            continue
+        try:
+            _STEP_FUNCS[step](job)
+        except Exception as e:
+            error = f'{step}: {e}'
+            config.logger.exception(f'[postprocess] {job["basename"]} {error}', exc_info=True)
+            break
+        job['done'].append(step)
+        # 每完成一步即保存，重试时跳过已完成的步骤
+        conn.execute('UPDATE jobs SET payload=? WHERE id=?', (json.dumps(job, ensure_ascii=False), job['id']))
+        conn.commit()
+
+    if error is None:
+        _finish(job)
+        return
+    attempts += 1
+    if attempts > _int_setting('postprocess_max_retries', 5):
+        config.logger.error(f'[postprocess] {job["basename"]} 已重试 {attempts - 1} 次，放弃: {error}')
+        conn.execute("UPDATE jobs SET status='failed', attempts=?, error=? WHERE id=?", (attempts, error, job['id']))
+        conn.commit()
+        if job.get('sub_file'):
+            Path(job['sub_file']).unlink(missing_ok=True)
+        if job.get('video_file'):
+            from videotrans.util.oss_uploader import OSSUploader
+            OSSUploader.remove_checkpoint(job['video_file'])
+        return
+    delay = min(3600, 30 * 2 ** (attempts - 1))
+    conn.execute("UPDATE jobs SET status='pending', attempts=?, next_run=?, error=? WHERE id=?",
+                 (attempts, time.time() + delay, error, job['id']))
+    conn.commit()
+    config.logger.info(f'[postprocess] {job["basename"]} {delay}s 后重试: {error}')
+
+
+def _finish(job):
+    conn = _conn()
+    conn.execute('DELETE FROM jobs WHERE id=?', (job['id'],))
+    conn.commit()
+    if job.get('sub_file'):
+        Path(job['sub_file']).unlink(missing_ok=True)
+
+
+def _log(job, text):
+    tools.set_process(text=text, type='logs', uuid=job.get('uuid'))
+
+
+def _media_path(job):
+    return job['oss_url'] or job['video_file'] or job['name']
+
+
+def _step_oss(job):
+    from videotrans.util.oss_uploader import OSSUploader
+    oss_config = _oss_config()
+    if not oss_config:
+        config.logger.info('[OSS] Upload disabled, skipping')
+        return
+    if not Path(job['video_file']).exists():
+        config.logger.warning(f"[OSS] Video file not found: {job['video_file']}")
+        return
+    config.logger.info(f"[OSS] Starting upload: {job['video_file']}")
+    _log(job, "正在上传到 OSS..." if config.defaulelang == 'zh' else "Uploading to OSS...")
+
+    def progress_callback(consumed, total):
+        _log(job, f"OSS {consumed / total * 100:.1f}%")
+
+    result = OSSUploader(oss_config).upload_file_with_retry(job['video_file'], callback=progress_callback)
+    if not result['success']:
+        _log(job, f"[X] OSS upload failed: {result.get('error', 'Unknown error')}")
+        raise RuntimeError(result.get('error', 'Unknown error'))
+    job['oss_url'] = result['url']
+    config.logger.info(f"[OSS] Upload success: {job['oss_url']}")
+    _log(job, f"[OK] OSS: {job['oss_url']}")
+
+
+def _step_hearsight(job):
+    import requests
+    from videotrans.util import help_srt
+    hs_url = (config.params.get('hearsight_url') or '').strip()
+    hs_path = (config.params.get('hearsight_summarize_path') or '/api/summarize').strip()
+    if not hs_url:
+        return
+    segments = []
+    for it in help_srt.get_subtitle_from_srt(job['sub_file']):
+        try:
+            st = float(it.get('start_time', 0)) / 1000.0
+            et = float(it.get('end_time', 0)) / 1000.0
+            if et <= st:
+                continue
+            segments.append({
+                'index': int(it.get('line', len(segments) + 1)),
+                'sentence': str(it.get('text', '')).strip(),
+                'start_time': st,
+                'end_time': et,
+            })
+        except Exception:
+            continue
+    if not segments:
+        return
+    payload = {
+        'segments': segments,
+        'media_path': _media_path(job),
+        'title': job['basename'],
+        'is_oss': bool(job['oss_url']),  # 标记是否使用 OSS URL
+    }
+    url = hs_url.rstrip('/') + (hs_path if hs_path.startswith('/') else '/' + hs_path)
+    resp = requests.post(url, json=payload, timeout=60)
+    config.logger.info(f"HearSight summarize status={resp.status_code} body={resp.text[:500]}")
+    # 仅服务端错误重试，4xx 重试也不会成功
+    if resp.status_code >= 500:
+        raise RuntimeError(f'HearSight status={resp.status_code}')
+
+
+def _step_qdrant(job):
+    from videotrans.qdrant_export import export_to_qdrant, ExportConfig, validate_export_config
+    if not config.params.get('enable_hearsight', False) or not config.params.get('qdrant_enabled', True):
+        config.logger.info("[Qdrant] Export disabled, skipping")
+        return
+    folder_id = config.params.get('hearsight_folder_id', None)
+    config.logger.info(f"[Qdrant] Exporting to folder: {folder_id or 'uncategorized'}")
+    export_config = ExportConfig(
+        qdrant_url=config.params.get('qdrant_url', 'http://localhost:6333'),
+        qdrant_api_key=config.params.get('qdrant_api_key', None) or None,
+        enable_summaries=config.params.get('qdrant_export_summaries', True),
+        llm_api_url=config.params.get('qdrant_llm_api_url', ''),
+        llm_api_key=config.params.get('qdrant_llm_api_key', ''),
+        llm_model=config.params.get('qdrant_llm_model', 'deepseek-ai/DeepSeek-V3'),
+        embedding_api_url=config.params.get('qdrant_embedding_api_url', ''),
+        embedding_api_key=config.params.get('qdrant_embedding_api_key', ''),
+        embedding_model=config.params.get('qdrant_embedding_model', 'BAAI/bge-large-zh-v1.5'),
+        folder_id=folder_id
+    )
+    is_valid, error_msg = validate_export_config(export_config)
+    if not is_valid:
+        config.logger.warning(f"Qdrant export skipped: {error_msg}")
+        return
+    config.logger.info(f"Starting Qdrant export for: {job['basename']}")
+    result = export_to_qdrant(
+        srt_path=job['sub_file'],
+        video_path=_media_path(job),
+        video_title=job['basename'] or '',
+        language=job['language'],
+        config=export_config
+    )
+    if not result.success:
+        raise RuntimeError(result.error_message)
+    config.logger.info(f"✓ Qdrant export succeeded: video_id={result.video_id}, chunks={result.chunks_count}")
+    tools.send_notification(
+        "已导出到 Qdrant 向量库" if config.defaulelang == 'zh' else "Exported to Qdrant",
+        f"{job['basename']} ({result.chunks_count} chunks)"
+    )
+
+
+_STEP_FUNCS = {
+    'oss': _step_oss,
+    'hearsight': _step_hearsight,
+    'qdrant': _step_qdrant,
+}
@@ -1,13 +1,15 @@
 import json
 import os
 import shutil
+import struct
 import subprocess
 import time
 from pathlib import Path
 
+import numpy as np
 from pydub import AudioSegment
 
-from videotrans.configure import config
+from videotrans.configure import config, _procs
 from videotrans.util import tools
 
 
@@ -74,6 +76,8 @@ class SpeedRate:
     """
 
     MIN_CLIP_DURATION_MS = 50
+    # 关键帧之间可复制的部分短于该值时，整段重新编码
+    SMART_CUT_MIN_MS = 1000
     # [新增] 统一所有中间音频文件的参数，防止拼接错误
     AUDIO_SAMPLE_RATE = 44100
     AUDIO_CHANNELS = 2
@@ -88,7 +92,8 @@ class SpeedRate:
                  raw_total_time=0,
                  noextname=None,
                  target_audio=None,
-                 cache_folder=None
+                 cache_folder=None,
+                 defer_video_encode=False
                  ):
         self.noextname = noextname
         self.raw_total_time = raw_total_time
@@ -108,6 +113,12 @@ class SpeedRate:
         self.target_audio_original = target_audio
         self.target_audio = Path(f'{self.cache_folder}/final_audio{Path(target_audio).suffix}').as_posix()
 
+        # 为 True 时中间视频无损编码，末尾定格只记录在 video_pad_ms，由调用方在最终合成时一并编码
+        self.defer_video_encode = defer_video_encode
+        # 输出的 novoice_mp4 是否为无损中间文件，需要调用方重新编码
+        self.video_lossless = False
+        self.video_pad_ms = 0
+
         self.max_audio_speed_rate = 100
         self.max_video_pts_rate = 10
         self.source_video_fps = 30
@@ -167,11 +178,11 @@ class SpeedRate:
     def _run_no_rate_change_mode(self):
         """
         模式 不对音频视频做任何加减速处理。
-        [重构] 现在此模式也使用基于FFmpeg的流式拼接，以处理大文件。
+        整条配音音轨直接写入一个预分配的 WAV 文件，每个配音片段解码为 numpy 数组后写到其采样偏移处，
+        静音部分保持为零，无需为每个片段和静音导出临时文件再用 FFmpeg 拼接。
         1. 准备数据。
-        2. 循环中，生成每个音频片段（配音+静音）的临时WAV文件。
-        3. 生成一个文件列表供FFmpeg concat使用。
-        4. 调用通用的 `_finalize_files` 方法来处理拼接和与视频的最终对齐。
+        2. 按原有规则计算每个片段的位置，解码后写入音轨。
+        3. 调用通用的 `_finalize_files` 方法转为目标格式，并与视频做最终对齐。
         """
         process_text = "[纯净模式] 正在拼接音频..." if config.defaulelang == 'zh' else "[Pure Mode] Merging audio..."
         tools.set_process(text=process_text, uuid=self.uuid)
@@ -179,82 +190,87 @@ class SpeedRate:
 
         self._prepare_data()
 
-        audio_concat_list = []
-        last_end_time = 0
-        total_audio_duration = 0
-
+        sr = self.AUDIO_SAMPLE_RATE
+        ch = self.AUDIO_CHANNELS
+        track_path = Path(f'{self.cache_folder}/temp_track.wav').as_posix()
+        # 按探测到的配音时长预估音轨长度，实际解码长度超出时文件自动变长
+        estimate_ms = 1000 + self.queue_tts[0]['start_time_source']
         for i, it in enumerate(self.queue_tts):
-            # 1. 填充字幕前的静音
-            silence_duration = it['start_time_source'] - last_end_time
-            if silence_duration > self.MIN_CLIP_DURATION_MS:
-                silence_clip_path = Path(self.audio_clips_folder, f"{i:05d}_pre_silence.wav").as_posix()
-                # 确保目录存在
-                Path(silence_clip_path).parent.mkdir(parents=True, exist_ok=True)
-                # [修正] 标准化静音参数
-                silent_segment = AudioSegment.silent(duration=silence_duration)
-                self._standardize_audio_segment(silent_segment).export(silence_clip_path, format="wav")
-                audio_concat_list.append(silence_clip_path)
-                config.logger.info(f"字幕[{it['line']}]前，生成静音片段 {silence_duration}ms")
-                total_audio_duration += silence_duration
-
-            # 加载并处理配音片段
-            segment = None
-            dubb_duration = 0
-            if tools.vail_file(it['filename']):
-                try:
-                    # [修正] 标准化加载的音频
-                    segment = AudioSegment.from_file(it['filename'])
-                    segment = self._standardize_audio_segment(segment)
-                    dubb_duration = len(segment)
-                except Exception as e:
-                    config.logger.error(f"字幕[{it['line']}] 加载音频文件 {it['filename']} 失败: {e}，将忽略此片段。")
-            else:
-                config.logger.warning(f"字幕[{it['line']}] 配音文件不存在: {it['filename']}，将忽略此片段。")
+            next_start = self.queue_tts[i + 1]['start_time_source'] if i < len(self.queue_tts) - 1 else it[
+                'start_time_source']
+            estimate_ms += max(next_start - it['start_time_source'], 0) + it['dubb_time'] + 100
+        track = _TrackBuffer(track_path, int(estimate_ms * sr / 1000), sr, ch)
 
-            it['dubb_time'] = dubb_duration
+        last_end_time = 0
+        total_audio_duration = 0
+        # 音轨的采样数
+        length = 0
+        try:
+            for i, it in enumerate(self.queue_tts):
+                # 1. 字幕前的静音
+                silence_duration = it['start_time_source'] - last_end_time
+                if silence_duration > self.MIN_CLIP_DURATION_MS:
+                    config.logger.info(f"字幕[{it['line']}]前，填充静音 {silence_duration}ms")
+                    total_audio_duration += silence_duration
+
+                # 加载并处理配音片段
+                samples = None
+                dubb_duration = 0
+                if tools.vail_file(it['filename']):
+                    try:
+                        segment = self._standardize_audio_segment(AudioSegment.from_file(it['filename'])).set_sample_width(2)
+                        samples = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, ch)
+                        dubb_duration = len(segment)
+                    except Exception as e:
+                        config.logger.error(f"字幕[{it['line']}] 加载音频文件 {it['filename']} 失败: {e}，将忽略此片段。")
+                else:
+                    config.logger.warning(f"字幕[{it['line']}] 配音文件不存在: {it['filename']}，将忽略此片段。")
 
-            if not segment:
-                last_end_time = it['end_time_source']
-                continue
+                it['dubb_time'] = dubb_duration
 
-            it['start_time'] = total_audio_duration
-            it['end_time'] = it['start_time'] + it['dubb_time']
-            it['startraw'], it['endraw'] = tools.ms_to_time_string(ms=it['start_time']), tools.ms_to_time_string(
-                ms=it['end_time'])
+                if samples is None or dubb_duration == 0:
+                    last_end_time = it['end_time_source']
+                    continue
 
-            # 导出当前配音片段
-            dub_clip_path = Path(self.audio_clips_folder, f"{i:05d}_dub.wav").as_posix()
-            # 确保目录存在
-            Path(dub_clip_path).parent.mkdir(parents=True, exist_ok=True)
-            segment.export(dub_clip_path, format="wav")
-            audio_concat_list.append(dub_clip_path)
-            total_audio_duration += dubb_duration
-            config.logger.info(
-                f"字幕[{it['line']}] 已生成配音片段，时长: {dubb_duration}ms, 新时间区间: {it['start_time']}-{it['end_time']}")
+                it['start_time'] = total_audio_duration
+                it['end_time'] = it['start_time'] + it['dubb_time']
+                it['startraw'], it['endraw'] = tools.ms_to_time_string(ms=it['start_time']), tools.ms_to_time_string(
+                    ms=it['end_time'])
 
-            # 填充配音后的静音
-            if i < len(self.queue_tts) - 1:
-                next_start_time = self.queue_tts[i + 1]['start_time_source']
-                available_space = next_start_time - it['start_time_source']
-                if available_space >= dubb_duration:
-                    remaining_silence = available_space - dubb_duration
-                    if remaining_silence > self.MIN_CLIP_DURATION_MS:
-                        post_silence_path = Path(self.audio_clips_folder, f"{i:05d}_post_silence.wav").as_posix()
-                        # 确保目录存在
-                        Path(post_silence_path).parent.mkdir(parents=True, exist_ok=True)
-                        # [修正] 标准化静音参数
-                        silent_segment = AudioSegment.silent(duration=remaining_silence)
-                        self._standardize_audio_segment(silent_segment).export(post_silence_path, format="wav")
-                        audio_concat_list.append(post_silence_path)
-                        total_audio_duration += remaining_silence
-                        config.logger.info(f"字幕[{it['line']}]后，生成剩余静音片段 {remaining_silence}ms")
-                    last_end_time = next_start_time
+                # 按毫秒时间轴换算采样偏移，与 start_time 严格对应，不会因逐段取整而累积偏差
+                offset = int(round(it['start_time'] * sr / 1000))
+                track.write(offset, samples)
+                length = max(length, offset + len(samples))
+                total_audio_duration += dubb_duration
+                config.logger.info(
+                    f"字幕[{it['line']}] 已写入配音片段，时长: {dubb_duration}ms, 新时间区间: {it['start_time']}-{it['end_time']}")
+
+                # 配音后的剩余静音
+                if i < len(self.queue_tts) - 1:
+                    next_start_time = self.queue_tts[i + 1]['start_time_source']
+                    available_space = next_start_time - it['start_time_source']
+                    if available_space >= dubb_duration:
+                        remaining_silence = available_space - dubb_duration
+                        if remaining_silence > self.MIN_CLIP_DURATION_MS:
+                            total_audio_duration += remaining_silence
+                            config.logger.info(f"字幕[{it['line']}]后，填充剩余静音 {remaining_silence}ms")
+                        last_end_time = next_start_time
+                    else:
+                        last_end_time = it['start_time_source'] + dubb_duration
                 else:
-                    last_end_time = it['start_time_source'] + dubb_duration
-            else:
-                last_end_time = it['start_time'] + it['dubb_time']
+                    last_end_time = it['start_time'] + it['dubb_time']
+        finally:
+            length = max(length, int(round(total_audio_duration * sr / 1000)))
+            track.close(length)
 
-        self._finalize_files(audio_concat_list)
+        try:
+            if length == 0:
+                config.logger.warning("没有可用的配音片段，无法生成最终音频。")
+                self._finalize_files([])
+            else:
+                self._finalize_files(merged_wav=track_path)
+        finally:
+            Path(track_path).unlink(missing_ok=True)
         config.logger.info("================== [纯净模式] 处理完成 ==================")
 
     def _prepare_data(self):
@@ -398,16 +414,14 @@ class SpeedRate:
 
     def _execute_audio_speedup(self):
         """
-        使用FFmpeg的`rubberband`或`atempo`滤镜进行高质量音频变速。
+        执行音频加速。默认使用进程内 numpy WSOLA 引擎并行处理，
+        audio_stretch_backend=ffmpeg 时或 numpy 处理失败的片段，使用FFmpeg的`rubberband`或`atempo`滤镜。
         """
         tools.set_process(text="[3/5] 处理音频..." if config.defaulelang == 'zh' else "[3/5] Processing audio...",
                           uuid=self.uuid)
         config.logger.info("================== [阶段 3/5] 执行音频加速 ==================")
 
-        if not self.audio_speed_filter:
-            config.logger.warning("音频加速被跳过，因为未找到合适的FFmpeg滤镜。")
-            return
-
+        jobs = []
         for it in self.queue_tts:
             target_duration_ms = int(it['final_audio_duration_theoretical'])
             current_duration_ms = it['dubb_time']
@@ -419,50 +433,131 @@ class SpeedRate:
 
                 speedup_ratio = current_duration_ms / target_duration_ms
                 if speedup_ratio < 1.01: continue
+                jobs.append((it, speedup_ratio, target_duration_ms))
 
+        if not jobs:
+            return
+        if config.settings.get('audio_stretch_backend', 'numpy') == 'numpy':
+            jobs = self._speedup_with_numpy(jobs)
+        if not jobs:
+            return
+        if not self.audio_speed_filter:
+            config.logger.warning("音频加速被跳过，因为未找到合适的FFmpeg滤镜。")
+            return
+        for it, speedup_ratio, target_duration_ms in jobs:
+            self._speedup_with_ffmpeg(it, speedup_ratio, target_duration_ms)
+
+    def _speedup_with_numpy(self, jobs):
+        """
+        进程池中并行执行 WSOLA 变速，新时长由输出采样数直接得到
+        返回处理失败的任务，交由 ffmpeg 处理
+        """
+        from videotrans.process._stretch import stretch_file
+        workers = int(float(config.settings.get('audio_stretch_workers', 0)))
+        if workers <= 0:
+            workers = min(8, max(1, (os.cpu_count() or 2) - 1))
+        workers = min(workers, len(jobs))
+        config.logger.info(f"使用 numpy 引擎加速 {len(jobs)} 条配音，进程数 {workers}")
+
+        def _args(it, speedup_ratio, target_duration_ms):
+            input_file = it['filename']
+            temp_output_file = f"{Path(input_file).parent / (Path(input_file).stem + '_temp')}.wav"
+            return (input_file, temp_output_file, speedup_ratio, target_duration_ms, self.AUDIO_SAMPLE_RATE,
+                    self.AUDIO_CHANNELS)
+
+        failed = []
+        succeeded = set()
+
+        def _done(job, args, result=None, error=None):
+            it = job[0]
+            if error is None and result and tools.vail_file(args[1]):
+                shutil.move(args[1], args[0])
+                it['dubb_time'] = result
+                succeeded.add(id(job))
                 config.logger.info(
-                    f"字幕[{it['line']}]：[执行] 音频加速，倍率={speedup_ratio:.2f} (从 {current_duration_ms}ms -> {target_duration_ms}ms) 使用 {self.audio_speed_filter} 引擎。")
-
-                input_file = it['filename']
-                temp_output_file = f"{Path(input_file).parent / (Path(input_file).stem + '_temp')}.wav"
-
-                cmd = ['-y', '-i', input_file]
-
-                filter_str = ""
-                if self.audio_speed_filter == 'rubberband':
-                    filter_str = f"rubberband=tempo={speedup_ratio}"
-                elif self.audio_speed_filter == 'atempo':
-                    tempo_filters = []
-                    current_tempo = speedup_ratio
-                    while current_tempo > 4.0:
-                        tempo_filters.append("atempo=4.0")
-                        current_tempo /= 4.0
-                    if current_tempo >= 0.5:
-                        tempo_filters.append(f"atempo={current_tempo}")
-                    filter_str = ",".join(tempo_filters)
-
-                if not filter_str:
-                    config.logger.error(f"字幕[{it['line']}] 无法为倍率 {speedup_ratio:.2f} 构建有效的filter字符串，跳过变速。")
-                    continue
+                    f"字幕[{it['line']}] 音频变速成功，倍率={job[1]:.2f}，新时长: {it['dubb_time']}ms")
+                return
+            config.logger.warning(f"字幕[{it['line']}]：numpy 音频加速失败，将使用 ffmpeg: {error}")
+            if Path(args[1]).exists():
+                os.remove(args[1])
+            failed.append(job)
+
+        # 片段很少时，启动进程池的开销大于收益，直接在当前进程处理
+        if workers <= 1 or len(jobs) < 4:
+            for job in jobs:
+                args = _args(*job)
+                try:
+                    _done(job, args, stretch_file(*args))
+                except Exception as e:
+                    _done(job, args, error=e)
+            return failed
 
-                target_duration_sec = target_duration_ms / 1000.0
-                cmd.extend(['-filter:a', filter_str, '-t', f'{target_duration_sec:.4f}'])
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = []
+                for job in jobs:
+                    args = _args(*job)
+                    futures.append((job, args, pool.submit(stretch_file, *args)))
+                for job, args, fu in futures:
+                    try:
+                        _done(job, args, fu.result())
+                    except Exception as e:
+                        _done(job, args, error=e)
+        except Exception as e:
+            config.logger.exception(f"numpy 音频加速进程池出错，剩余片段使用 ffmpeg: {e}")
+            failed = [job for job in jobs if id(job) not in succeeded]
+        return failed
 
-                # [修正] 确保输出是标准化的WAV
-                cmd.extend(['-ar', str(self.AUDIO_SAMPLE_RATE), '-ac', str(self.AUDIO_CHANNELS), '-c:a', 'pcm_s16le',
-                            temp_output_file])
+    def _speedup_with_ffmpeg(self, it, speedup_ratio, target_duration_ms):
+        current_duration_ms = it['dubb_time']
+        config.logger.info(
+            f"字幕[{it['line']}]：[执行] 音频加速，倍率={speedup_ratio:.2f} (从 {current_duration_ms}ms -> {target_duration_ms}ms) 使用 {self.audio_speed_filter} 引擎。")
+
+        input_file = it['filename']
+        temp_output_file = f"{Path(input_file).parent / (Path(input_file).stem + '_temp')}.wav"
+
+        cmd = ['-y', '-i', input_file]
+
+        filter_str = ""
+        if self.audio_speed_filter == 'rubberband':
+            filter_str = f"rubberband=tempo={speedup_ratio}"
+        elif self.audio_speed_filter == 'atempo':
+            tempo_filters = []
+            current_tempo = speedup_ratio
+            while current_tempo > 4.0:
+                tempo_filters.append("atempo=4.0")
+                current_tempo /= 4.0
+            if current_tempo >= 0.5:
+                tempo_filters.append(f"atempo={current_tempo}")
+            filter_str = ",".join(tempo_filters)
+
+        if not filter_str:
+            config.logger.error(f"字幕[{it['line']}] 无法为倍率 {speedup_ratio:.2f} 构建有效的filter字符串，跳过变速。")
+            return
 
-                try:
-                    if tools.runffmpeg(cmd, force_cpu=True):
-                        shutil.move(temp_output_file, input_file)
-                        it['dubb_time'] = self._get_audio_time_ms(input_file, line=it['line'])
-                        config.logger.info(f"字幕[{it['line']}] 音频变速成功，新时长: {it['dubb_time']}ms")
-                    else:
-                        raise RuntimeError("ffmpeg command failed")
-                except Exception as e:
-                    config.logger.error(f"字幕[{it['line']}]：FFmpeg音频加速失败 {it['filename']}: {e}")
-                    if Path(temp_output_file).exists():
-                        os.remove(temp_output_file)
+        target_duration_sec = target_duration_ms / 1000.0
+        cmd.extend(['-filter:a', filter_str, '-t', f'{target_duration_sec:.4f}'])
+
+        # [修正] 确保输出是标准化的WAV
+        cmd.extend(['-ar', str(self.AUDIO_SAMPLE_RATE), '-ac', str(self.AUDIO_CHANNELS), '-c:a', 'pcm_s16le',
+                    temp_output_file])
+
+        try:
+            if tools.runffmpeg(cmd, force_cpu=True):
+                shutil.move(temp_output_file, input_file)
+                it['dubb_time'] = self._get_audio_time_ms(input_file, line=it['line'])
+                config.logger.info(f"字幕[{it['line']}] 音频变速成功，新时长: {it['dubb_time']}ms")
+            else:
+                raise RuntimeError("ffmpeg command failed")
+        except _procs.TaskCancelled:
+            Path(temp_output_file).unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            config.logger.error(f"字幕[{it['line']}]：FFmpeg音频加速失败 {it['filename']}: {e}")
+            if Path(temp_output_file).exists():
+                os.remove(temp_output_file)
 
     def _execute_video_processing(self):
         """
@@ -481,15 +576,24 @@ class SpeedRate:
 
         clip_meta_list = self._create_clip_meta()
 
+        if config.settings.get('video_render_mode', 'graph') == 'graph':
+            if self._render_with_filter_graph(clip_meta_list):
+                return clip_meta_list
+            config.logger.warning("filter_complex 单次渲染失败，回退到逐片段裁切模式。")
+
+        keyframes = self._smart_cut_keyframes()
         for task in clip_meta_list:
             if config.exit_soft: return None
             # PTS > 1.01 才应用，避免浮点数误差导致不必要的处理
             pts_param = str(task['pts']) if task.get('pts', 1.0) > 1.01 else None
-            self._cut_to_intermediate(ss=task['ss'], to=task['to'], source=self.novoice_mp4_original, pts=pts_param,
-                                      out=task['out'])
+            if pts_param or not keyframes or not self._smart_cut(task, keyframes):
+                self._cut_to_intermediate(ss=task['ss'], to=task['to'], source=self.novoice_mp4_original,
+                                          pts=pts_param, out=task['out'])
 
             real_duration_ms = 0
-            if Path(task['out']).exists() and Path(task['out']).stat().st_size > 1024:
+            if task.get('parts'):
+                real_duration_ms = sum(self._get_video_duration_safe(part) for part in task['parts'])
+            elif Path(task['out']).exists() and Path(task['out']).stat().st_size > 1024:
                 real_duration_ms = self._get_video_duration_safe(task['out'])
 
             task['real_duration_ms'] = real_duration_ms
@@ -550,11 +654,105 @@ class SpeedRate:
             json.dump(clip_meta_list, f, ensure_ascii=False, indent=2)
         return clip_meta_list
 
+    def _graph_clip_duration_ms(self, task):
+        """filter_complex 模式下片段经 fps 滤镜输出的帧数是确定的，直接换算为时长，无需再探测"""
+        pts = task['pts'] if task.get('pts', 1.0) > 1.01 else 1.0
+        frames = round((task['to'] - task['ss']) * pts * self.source_video_fps / 1000)
+        return int(frames * 1000 / self.source_video_fps)
+
+    def _build_filter_graph(self, tasks, offset_ms):
+        """
+        将一组片段构建为一个 filter_complex：split 后逐段 trim/setpts/fps，再 concat 为一路输出 [vout]
+        offset_ms 为本组输入的起始时间，trim 使用相对时间
+        """
+        fps = self.source_video_fps
+        n = len(tasks)
+        graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))]
+        for i, task in enumerate(tasks):
+            pts = task['pts'] if task.get('pts', 1.0) > 1.01 else 1.0
+            graph.append(
+                f"[s{i}]trim=start={(task['ss'] - offset_ms) / 1000:.3f}:end={(task['to'] - offset_ms) / 1000:.3f},"
+                f"setpts={pts:.4f}*(PTS-STARTPTS),fps={fps}[v{i}]")
+        graph.append("".join(f"[v{i}]" for i in range(n)) + f"concat=n={n}:v=1:a=0,format=yuv420p[vout]")
+        return ";".join(graph)
+
+    def _render_with_filter_graph(self, clip_meta_list):
+        """
+        单次渲染模式：整个片段列表构建为一个 filter_complex，只启动一个 ffmpeg 并只编码一次。
+        片段数超过 video_graph_max_clips 时分组渲染(同时避免命令行过长)，各组参数一致，最后无损拼接。
+        成功返回 True，失败返回 False 以便回退到逐片段模式。
+        """
+        tasks = []
+        for task in clip_meta_list:
+            task['real_duration_ms'] = self._graph_clip_duration_ms(task)
+            if task['real_duration_ms'] > 0:
+                tasks.append(task)
+        if not tasks:
+            return False
+
+        max_clips = max(1, int(float(config.settings.get('video_graph_max_clips', 200))))
+        chunks = [tasks[i:i + max_clips] for i in range(0, len(tasks), max_clips)]
+        final_video_path = Path(f'{self.cache_folder}/merged_{self.noextname}.mp4').as_posix()
+        chunk_files = []
+        concat_txt_path = Path(f'{self.cache_folder}/graph_concat_list.txt').as_posix()
+        config.logger.info(f"filter_complex 单次渲染：共 {len(tasks)} 个片段，分 {len(chunks)} 组")
+        try:
+            for n, chunk in enumerate(chunks):
+                if config.exit_soft:
+                    return False
+                out = final_video_path if len(chunks) == 1 else Path(
+                    f'{self.cache_folder}/graph_{n:04d}.mp4').as_posix()
+                start_ms, end_ms = chunk[0]['ss'], chunk[-1]['to']
+                cmd = ['-y', '-ss', tools.ms_to_time_string(ms=start_ms, sepflag='.'), '-to',
+                       tools.ms_to_time_string(ms=end_ms, sepflag='.'), '-i', self.novoice_mp4_original,
+                       '-filter_complex', self._build_filter_graph(chunk, start_ms), '-map', '[vout]', '-an',
+                       *self._video_encode_args(), out]
+                # 无损编码不能使用硬件编码器
+                tools.runffmpeg(cmd, force_cpu=self.defer_video_encode)
+                if not tools.vail_file(out):
+                    raise RuntimeError(f"No {out}")
+                if out != final_video_path:
+                    chunk_files.append(out)
+            if chunk_files:
+                tools.create_concat_txt(chunk_files, concat_txt=concat_txt_path)
+                tools.runffmpeg(['-y', '-f', 'concat', '-safe', '0', '-i', concat_txt_path, '-c', 'copy',
+                                 final_video_path])
+                os.chdir(config.ROOT_DIR)
+            if not tools.vail_file(final_video_path):
+                raise RuntimeError(f"No {final_video_path}")
+        except _procs.TaskCancelled:
+            # 任务已停止，不回退到逐片段模式
+            raise
+        except Exception as e:
+            config.logger.exception(f"filter_complex 渲染失败: {e}")
+            return False
+        finally:
+            for f in chunk_files + [concat_txt_path]:
+                try:
+                    Path(f).unlink(missing_ok=True)
+                except:
+                    pass
+
+        shutil.copy2(final_video_path, self.novoice_mp4)
+        self.video_lossless = self.defer_video_encode
+        config.logger.info(f"最终无声视频已成功生成并复制到: {self.novoice_mp4}")
+        for task in clip_meta_list:
+            if task['type'] == 'sub':
+                self.queue_tts[task['index']]['final_video_duration_real'] = task['real_duration_ms']
+        return True
+
+    def _video_encode_args(self):
+        """渲染慢速视频时的编码参数，延迟编码时为无损"""
+        if self.defer_video_encode:
+            return ['-c:v', 'libx264', '-preset', 'ultrafast', '-qp', '0', '-pix_fmt', 'yuv420p']
+        return ['-c:v', f'libx{config.settings["video_codec"]}', '-crf', str(config.settings.get("crf", 23)),
+                '-preset', config.settings.get('preset', 'fast')]
+
     def _cut_to_intermediate(self, ss, to, source, pts, out):
         """将视频片段裁切为标准化的中间格式"""
         cmd = ['-y', '-ss', tools.ms_to_time_string(ms=ss, sepflag='.'), '-to',
                tools.ms_to_time_string(ms=to, sepflag='.'), '-i', source,
-               '-an', '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '10',
+               '-an', '-c:v', 'libx264', '-preset', 'ultrafast', *(['-qp', '0'] if self.defer_video_encode else ['-crf', '10']),
                '-pix_fmt', 'yuv420p', '-r', str(self.source_video_fps)]
         if pts: cmd.extend(['-vf', f'setpts={pts}*PTS,fps={self.source_video_fps}'])
         cmd.append(out)
@@ -578,10 +776,72 @@ class SpeedRate:
             except:
                 pass
 
+    def _smart_cut_keyframes(self):
+        """
+        clips 模式下可直接复制码流的关键帧列表，不满足条件时返回空列表
+        复制的码流与 libx264 中间片段拼接在一起，因此要求原视频为 h264/yuv420p
+        """
+        if not config.settings.get('video_smart_cut', True):
+            return []
+        try:
+            info = tools.get_video_info(self.novoice_mp4_original)
+            if info['video_codec_name'] != 'h264' or info['color'] != 'yuv420p':
+                config.logger.info(f"原视频为 {info['video_codec_name']}/{info['color']}，不使用关键帧复制。")
+                return []
+            keyframes = tools.get_keyframes(self.novoice_mp4_original)
+        except Exception as e:
+            config.logger.warning(f"获取关键帧失败，全部片段重新编码: {e}")
+            return []
+        config.logger.info(f"原视频共 {len(keyframes)} 个关键帧")
+        return keyframes
+
+    def _smart_cut(self, task, keyframes):
+        """
+        未变速的片段：首尾关键帧之间直接复制码流，只重新编码首尾不足一个关键帧间隔的部分
+        成功时按顺序将各部分写入 task['parts']，失败返回 False 由调用方整段重新编码
+        """
+        inner = [k for k in keyframes if task['ss'] <= k <= task['to']]
+        if len(inner) < 2 or inner[-1] - inner[0] < self.SMART_CUT_MIN_MS:
+            return False
+        frame_ms = 1000 / self.source_video_fps
+        copy_start, copy_end = inner[0], inner[-1]
+        stem = task['out'][:-4]
+        parts = []
+        if copy_start - task['ss'] >= frame_ms / 2:
+            parts.append(f'{stem}_head.mp4')
+            self._cut_to_intermediate(ss=task['ss'], to=copy_start, source=self.novoice_mp4_original, pts=None,
+                                      out=parts[-1])
+        parts.append(f'{stem}_copy.mp4')
+        # 闭合 GOP 内解码顺序与显示顺序包含相同的帧，按帧数截取可精确停在下一个关键帧之前
+        frames = round((copy_end - copy_start) * self.source_video_fps / 1000)
+        config.logger.info(f"复制关键帧之间的码流: {Path(parts[-1]).name}, 范围: {copy_start}-{copy_end}, {frames} 帧")
+        try:
+            # 复制时 -ss 必须正好是关键帧时间，否则会从前一个关键帧开始读取，丢弃的帧也计入 -frames:v
+            tools.runffmpeg(['-y', '-ss', f'{copy_start / 1000:.6f}', '-i',
+                             self.novoice_mp4_original, '-frames:v', str(frames), '-an', '-c:v', 'copy', parts[-1]],
+                            force_cpu=True)
+        except Exception as e:
+            config.logger.warning(f"复制码流失败: {e}")
+        if task['to'] - copy_end >= frame_ms / 2:
+            parts.append(f'{stem}_tail.mp4')
+            self._cut_to_intermediate(ss=copy_end, to=task['to'], source=self.novoice_mp4_original, pts=None,
+                                      out=parts[-1])
+
+        if all(Path(p).exists() and Path(p).stat().st_size > 1024 for p in parts):
+            task['parts'] = parts
+            return True
+        config.logger.warning(f"片段 {Path(task['out']).name} 关键帧复制失败，改为整段重新编码。")
+        for p in parts:
+            Path(p).unlink(missing_ok=True)
+        return False
+
     def _concat_and_finalize(self, clip_meta_list):
         """无损拼接中间片段，然后进行一次性的最终编码"""
-        valid_clips = [task['out'] for task in clip_meta_list if
-                       Path(task['out']).exists() and Path(task['out']).stat().st_size > 1024]
+        valid_clips = []
+        for task in clip_meta_list:
+            for clip in task.get('parts') or [task['out']]:
+                if Path(clip).exists() and Path(clip).stat().st_size > 1024:
+                    valid_clips.append(clip)
         if not valid_clips:
             config.logger.error("没有任何有效的视频中间片段生成，视频处理失败！")
             self.novoice_mp4 = self.novoice_mp4_original
@@ -603,11 +863,16 @@ class SpeedRate:
             return
 
         final_video_path = Path(f'{self.cache_folder}/merged_{self.noextname}.mp4').as_posix()
-        video_codec = config.settings['video_codec']
-        finalize_cmd = ['-y', '-i', intermediate_merged_path, '-c:v', f'libx{video_codec}', '-crf',
-                        str(config.settings.get("crf", 23)), '-preset', config.settings.get('preset', 'fast'), '-an',
-                        final_video_path]
-        tools.runffmpeg(finalize_cmd)
+        if self.defer_video_encode:
+            # 片段均为无损编码，拼接结果直接作为中间视频，留待最终合成时编码
+            shutil.move(intermediate_merged_path, final_video_path)
+            self.video_lossless = True
+        else:
+            video_codec = config.settings['video_codec']
+            finalize_cmd = ['-y', '-i', intermediate_merged_path, '-c:v', f'libx{video_codec}', '-crf',
+                            str(config.settings.get("crf", 23)), '-preset', config.settings.get('preset', 'fast'), '-an',
+                            final_video_path]
+            tools.runffmpeg(finalize_cmd)
 
         if Path(final_video_path).exists():
             shutil.copy2(final_video_path, self.novoice_mp4)
@@ -799,9 +1064,10 @@ class SpeedRate:
             config.logger.error(f"探测视频时长时发生严重错误: {e}。文件 -> {file_path}。将视其时长为0。")
             return 0
 
-    def _finalize_files(self, audio_concat_list):
+    def _finalize_files(self, audio_concat_list=None, merged_wav=None):
         """
         负责使用FFmpeg拼接音频片段列表，并执行最后的音视频对齐检查。
+        merged_wav 为已拼接好的 WAV 音轨，此时只需转为目标格式
         """
         final_step_text = "[最终步骤] 拼接音频并对齐..." if config.defaulelang == 'zh' else '[Final Step] Concatenating audio and finalizing...'
         tools.set_process(text=final_step_text, uuid=self.uuid)
@@ -809,7 +1075,10 @@ class SpeedRate:
 
         try:
             # 初始拼接
-            self._ffmpeg_concat_audio(audio_concat_list, self.target_audio)
+            if merged_wav:
+                self._export_wav(merged_wav, self.target_audio)
+            else:
+                self._ffmpeg_concat_audio(audio_concat_list, self.target_audio)
 
             if not tools.vail_file(self.target_audio):
                 raise RuntimeError(f"音频拼接失败，最终文件未生成: {self.target_audio}")
@@ -857,6 +1126,11 @@ class SpeedRate:
                         config.logger.error("使用apad滤镜填充静音失败！")
 
 
+                elif duration_diff < -TOLERANCE_MS and self.defer_video_encode:
+                    # 定格留到最终合成时与其他滤镜一起编码
+                    self.video_pad_ms = abs(duration_diff)
+                    config.logger.info(f"音频比视频长 {self.video_pad_ms}ms，最终合成时定格视频最后一帧以对齐。")
+
                 elif duration_diff < -TOLERANCE_MS:
                     freeze_duration_sec = abs(duration_diff) / 1000.0
                     config.logger.warning(f"音频比视频长 {abs(duration_diff)}ms，将定格视频最后一帧 {freeze_duration_sec:.3f} 秒以对齐。")
@@ -946,26 +1220,7 @@ class SpeedRate:
                 return
 
             # 步骤2: 将拼接好的临时WAV转码为最终格式
-            config.logger.info(f"混合拼接步骤2: 正在将临时WAV转码为最终格式: {output_path}")
-            cmd_step2 = ["-y", "-i", temp_wav_output]
-
-            ext = Path(output_path).suffix.lower()
-            if ext == '.wav':
-                # 如果目标就是wav，直接复制即可
-                cmd_step2.extend(["-c:a", "copy"])
-            elif ext == '.m4a':
-                cmd_step2.extend(["-c:a", "aac", "-b:a", "128k"])
-            else:  # 默认mp3
-                cmd_step2.extend(["-c:a", "libmp3lame", "-q:a", "2"])
-
-            cmd_step2.append(str(output_path))
-            if ext == '.wav' and output_path[-4:] == '.wav':
-                try:
-                    shutil.copy2(temp_wav_output, output_path)
-                except shutil.SameFileError:
-                    pass
-            else:
-                tools.runffmpeg(cmd_step2, force_cpu=True)
+            self._export_wav(temp_wav_output, output_path)
 
         finally:
             pass
@@ -978,3 +1233,61 @@ class SpeedRate:
                 config.logger.info("已清理音频拼接临时文件。")
             except Exception as e:
                 config.logger.warning(f"清理音频拼接临时文件失败: {e}")
+
+    def _export_wav(self, wav_path, output_path):
+        """
+        将拼接好的 WAV 转码为最终格式，目标为 wav 时直接复制
+        """
+        config.logger.info(f"正在将临时WAV转码为最终格式: {output_path}")
+        ext = Path(output_path).suffix.lower()
+        if ext == '.wav':
+            try:
+                shutil.copy2(wav_path, output_path)
+            except shutil.SameFileError:
+                pass
+            return
+        cmd = ["-y", "-i", wav_path]
+        if ext == '.m4a':
+            cmd.extend(["-c:a", "aac", "-b:a", "128k"])
+        else:  # 默认mp3
+            cmd.extend(["-c:a", "libmp3lame", "-q:a", "2"])
+        cmd.append(str(output_path))
+        tools.runffmpeg(cmd, force_cpu=True)
+
+
+class _TrackBuffer:
+    """
+    直接写入磁盘 WAV 文件的 16bit PCM 音轨
+    文件按预估长度预分配，每个片段按采样偏移写入，未写入的部分为零即静音，稀疏文件不占用实际磁盘空间；
+    不在内存中保留整条音轨，长视频的内存占用只与单个片段大小有关
+    """
+    HEADER_SIZE = 44
+
+    def __init__(self, path, capacity, sample_rate, channels):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.file = open(path, 'w+b')
+        self.file.write(self._header(0))
+        self.file.truncate(self.HEADER_SIZE + max(0, capacity) * channels * 2)
+
+    def _header(self, n_bytes):
+        block = self.channels * 2
+        return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + n_bytes, b'WAVE', b'fmt ', 16, 1, self.channels,
+                           self.sample_rate, self.sample_rate * block, block, 16, b'data', n_bytes)
+
+    def write(self, offset, samples):
+        # 超出预分配长度时文件自动变长，中间部分以零补齐
+        self.file.seek(self.HEADER_SIZE + offset * self.channels * 2)
+        self.file.write(np.ascontiguousarray(samples, dtype='<i2').tobytes())
+
+    def close(self, length):
+        """
+        length 为音轨的实际采样数，截断多余的预分配部分并写入正确的头信息
+        """
+        if self.file.closed:
+            return
+        n_bytes = length * self.channels * 2
+        self.file.truncate(self.HEADER_SIZE + n_bytes)
+        self.file.seek(0)
+        self.file.write(self._header(n_bytes))
+        self.file.close()
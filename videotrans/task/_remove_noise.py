@@ -1,24 +1,132 @@
+import io
+import os
+import threading
+import time
+from pathlib import Path
+
+from videotrans.configure import config
+from videotrans.util import tools
+
+"""
+语音降噪，使用 modelscope ANS 模型
+模型按 id 缓存在进程内，批量任务只加载一次，任务批次结束时调用 release_model() 释放
+长音频分块处理，相邻块重叠部分交叉淡化后相加，内存占用不随音频时长增长
+"""
+
+MODEL_ID = 'damo/speech_zipenhancer_ans_multiloss_16k_base'
+SAMPLE_RATE = 16000
+# 相邻块重叠的秒数
+OVERLAP_SEC = 0.5
+
+# model_id -> (pipeline, 推理锁)
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def _get_pipeline(model_id):
+    with _pipelines_lock:
+        item = _pipelines.get(model_id)
+        if item is None:
+            from modelscope.pipelines import pipeline
+            from modelscope.utils.constant import Tasks
+            config.logger.info(f'加载降噪模型 {model_id}')
+            item = (pipeline(Tasks.acoustic_noise_suppression, model=model_id), threading.Lock())
+            _pipelines[model_id] = item
+        return item
+
+
+def release_model(model_id=None):
+    """
+    释放已加载的降噪模型，model_id 为 None 时全部释放
+    """
+    with _pipelines_lock:
+        ids = list(_pipelines) if model_id is None else [model_id]
+        released = [_pipelines.pop(i) for i in ids if i in _pipelines]
+    if not released:
+        return
+    del released
+    import gc
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+    config.logger.info('已释放降噪模型')
+
+
+def _denoise_chunk(ans, data):
+    """
+    对一块 16k 单声道 float32 音频降噪，返回等长的 float32 数组
+    """
+    import numpy as np
+    import soundfile as sf
+    buf = io.BytesIO()
+    sf.write(buf, data, SAMPLE_RATE, format='WAV', subtype='PCM_16')
+    result = ans(buf.getvalue())
+    out = np.frombuffer(result['output_pcm'], dtype=np.int16).astype(np.float32) / 32768
+    if len(out) < len(data):
+        out = np.pad(out, (0, len(data) - len(out)))
+    return out[:len(data)]
+
+
+def _denoise_chunked(ans, audio_path, output_file, chunk_sec):
+    """
+    每次读取 chunk_sec 秒，相邻块重叠 OVERLAP_SEC 秒，重叠部分线性交叉淡化后写入输出
+    返回 False 表示音频不长于一块，由调用方整体处理
+    """
+    import numpy as np
+    import soundfile as sf
+    chunk = int(chunk_sec * SAMPLE_RATE)
+    overlap = int(OVERLAP_SEC * SAMPLE_RATE)
+    with sf.SoundFile(audio_path) as fin:
+        if chunk <= overlap or fin.frames <= chunk:
+            return False
+        total = fin.frames
+        fade_in = np.linspace(0, 1, overlap, endpoint=False, dtype=np.float32)
+        tail = None
+        pos = 0
+        with sf.SoundFile(output_file, 'w', SAMPLE_RATE, 1, 'PCM_16') as fout:
+            while pos < total:
+                if config.exit_soft:
+                    raise RuntimeError('stop')
+                fin.seek(pos)
+                data = fin.read(chunk, dtype='float32')
+                out = _denoise_chunk(ans, data)
+                if tail is not None:
+                    n = min(overlap, len(out))
+                    out[:n] = tail[:n] * (1 - fade_in[:n]) + out[:n] * fade_in[:n]
+                if pos + len(data) >= total:
+                    fout.write(out)
+                    break
+                fout.write(out[:-overlap])
+                tail = out[-overlap:]
+                pos += chunk - overlap
+    return True
+
+
 def remove_noise(audio_path, output_file):
     try:
-        from videotrans.configure import config
-        from videotrans.util import tools
-        from pathlib import Path
-        import time, os
-        from modelscope.pipelines import pipeline
-        from modelscope.utils.constant import Tasks
-        try:
-            os.environ['bak_proxy'] = os.environ.get('http_proxy') or os.environ.get('https_proxy')
-            del os.environ['http_proxy']
-            del os.environ['https_proxy']
-            del os.environ['all_proxy']
-        except:
-            pass
-        ans = pipeline(
-            Tasks.acoustic_noise_suppression,
-            model='damo/speech_zipenhancer_ans_multiloss_16k_base')
-        result = ans(
-            audio_path,
-            output_path=output_file)
+        os.environ['bak_proxy'] = os.environ.get('http_proxy') or os.environ.get('https_proxy')
+        del os.environ['http_proxy']
+        del os.environ['https_proxy']
+        del os.environ['all_proxy']
+    except:
+        pass
+    try:
+        import soundfile as sf
+        src_path = audio_path
+        info = sf.info(audio_path)
+        if info.samplerate != SAMPLE_RATE or info.channels != 1:
+            src_path = Path(output_file).parent.as_posix() + f'/noise-16k-{time.time()}.wav'
+            tools.conver_to_16k(audio_path, src_path)
+        ans, ans_lock = _get_pipeline(MODEL_ID)
+        chunk_sec = float(config.settings.get('remove_noise_chunk_sec', 60))
+        # 同一模型同时只处理一个文件
+        with ans_lock:
+            if chunk_sec <= 0 or not _denoise_chunked(ans, src_path, output_file, chunk_sec):
+                ans(src_path, output_path=output_file)
         tmp_name = Path(output_file).parent.as_posix() + f'/up_volume2-noise-{time.time()}.wav'
         tools.runffmpeg(['-y', '-i', output_file, '-af', "volume=2", tmp_name])
         return tmp_name
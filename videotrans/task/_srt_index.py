@@ -0,0 +1,273 @@
+import math
+import sqlite3
+import threading
+from pathlib import Path
+
+from videotrans.configure import config
+from videotrans.util import tools
+
+"""
+API 结果字幕的全文索引，供 /search_nodes 和 /ask 检索
+以 SQLite(WAL) 存储在 ROOT_DIR/search_index/srt.db：files 记录每个 srt 的路径、大小和修改时间，segs 保存每条字幕，
+segs_fts 为 segs 小写文本的 FTS5 trigram 索引(外部内容表，不重复存储文本)
+任务结束时由 update_dir() 增量索引其输出目录，启动时 reconcile() 按大小和修改时间与磁盘同步
+trigram 只能匹配 3 个字符及以上的词，更短的词及不支持 FTS5 的 SQLite 使用 LIKE 匹配
+打分方式与原先逐文件扫描时一致：按包含该词的字幕条数计算 idf，词频乘 idf，整句命中再加分
+得分在 SQLite 中计算并排序，得分相同的按文件入库顺序和字幕序号排列
+"""
+
+_local = threading.local()
+# 写入串行执行，读取不受影响
+_write_lock = threading.Lock()
+_fts = None
+# 索引每次变化时加一，用于使 _stats 中缓存的总条数和各词命中条数失效
+_gen = 0
+_stats = {}
+
+
+def _conn():
+    global _fts
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        Path(f'{config.ROOT_DIR}/search_index').mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(f'{config.ROOT_DIR}/search_index/srt.db', timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, uuid TEXT NOT NULL, name TEXT NOT NULL, lang TEXT NOT NULL, video TEXT, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS segs (id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL, idx INTEGER NOT NULL, line INTEGER NOT NULL, start_ms INTEGER NOT NULL, end_ms INTEGER NOT NULL, text TEXT NOT NULL, lower TEXT NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_segs_file ON segs(file_id, idx)')
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS segs_fts USING fts5(lower, content='segs', content_rowid='id', tokenize='trigram')")
+            _fts = True
+        except sqlite3.OperationalError as e:
+            if _fts is None:
+                config.logger.warning(f'SQLite 不支持 FTS5 trigram，字幕检索使用 LIKE: {e}')
+            _fts = False
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _subtitle_lang(name):
+    # 与原先一致：取文件名中 srt 扩展名前的一段作为语言
+    for sep in ['.', '-', '_']:
+        parts = name.split(sep)
+        if len(parts) >= 2 and parts[-1].lower().endswith('srt'):
+            return parts[-2].lower()
+    return ''
+
+
+def _find_video(d):
+    for ext in ['.mp4', '.mkv', '.mov', '.webm']:
+        for f in d.glob(f'*{ext}'):
+            return f.name
+    return None
+
+
+def _remove_file(conn, file_id):
+    if _fts:
+        conn.execute("INSERT INTO segs_fts(segs_fts, rowid, lower) SELECT 'delete', id, lower FROM segs WHERE file_id=?",
+                     (file_id,))
+    conn.execute('DELETE FROM segs WHERE file_id=?', (file_id,))
+    conn.execute('DELETE FROM files WHERE id=?', (file_id,))
+
+
+def _index_file(conn, p, st):
+    try:
+        segs = tools.get_subtitle_from_srt(p.as_posix(), is_file=True)
+    except Exception:
+        segs = []
+    cur = conn.execute('INSERT INTO files (path, uuid, name, lang, video, size, mtime_ns) VALUES (?,?,?,?,?,?,?)',
+                       (p.as_posix(), p.parent.name, p.name, _subtitle_lang(p.name), _find_video(p.parent), st.st_size,
+                        st.st_mtime_ns))
+    file_id = cur.lastrowid
+    rows = []
+    for idx, seg in enumerate(segs or []):
+        text = str(seg.get('text', '')).strip()
+        rows.append((file_id, idx, int(seg.get('line', 0) or 0), int(seg.get('start_time', 0)),
+                     int(seg.get('end_time', 0)), text, text.lower()))
+    conn.executemany('INSERT INTO segs (file_id, idx, line, start_ms, end_ms, text, lower) VALUES (?,?,?,?,?,?,?)',
+                     rows)
+    if _fts:
+        conn.execute('INSERT INTO segs_fts(rowid, lower) SELECT id, lower FROM segs WHERE file_id=?', (file_id,))
+
+
+def _sync(paths, prefix):
+    """
+    paths: 磁盘上现有的 srt；prefix: 目录前缀，索引中该前缀下的记录与 paths 同步
+    新增或变化的文件重新索引，磁盘上已不存在的删除，返回 (重新索引数, 删除数)
+    """
+    global _gen
+    changed = removed = 0
+    with _write_lock:
+        conn = _conn()
+        try:
+            # 已索引的记录在写锁内读取，启动时的 reconcile 与任务结束的 update_dir 同时执行时不会重复插入
+            known = {r[0]: r[1:] for r in conn.execute(
+                "SELECT path, id, size, mtime_ns FROM files WHERE substr(path, 1, ?)=?", (len(prefix), prefix))}
+            seen = set()
+            for p in paths:
+                key = p.as_posix()
+                seen.add(key)
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                old = known.get(key)
+                if old and old[1] == st.st_size and old[2] == st.st_mtime_ns:
+                    continue
+                if old:
+                    _remove_file(conn, old[0])
+                _index_file(conn, p, st)
+                changed += 1
+                # 大量文件时分批提交，避免单个事务过大
+                if changed % 200 == 0:
+                    conn.commit()
+            for key, old in known.items():
+                if key not in seen:
+                    _remove_file(conn, old[0])
+                    removed += 1
+            conn.commit()
+        except sqlite3.Error:
+            # 回滚未提交的部分，否则该线程的连接一直持有写事务，阻塞其他写入
+            conn.rollback()
+            raise
+        finally:
+            if changed or removed:
+                _gen += 1
+    return changed, removed
+
+
+def update_dir(dirname):
+    """
+    索引某个任务输出目录下的 srt，任务结束时调用
+    """
+    d = Path(dirname)
+    if not d.is_dir():
+        return
+    try:
+        _sync(list(d.rglob('*.srt')), d.as_posix().rstrip('/') + '/')
+    except sqlite3.Error as e:
+        config.logger.warning(f'更新字幕索引失败:{e}')
+
+
+def reconcile(root):
+    """
+    启动时将索引与 root 下的所有 srt 同步
+    """
+    try:
+        changed, removed = _sync(list(Path(root).rglob('*.srt')), Path(root).as_posix().rstrip('/') + '/')
+        config.logger.info(f'字幕索引已同步，重新索引 {changed} 个文件，删除 {removed} 个')
+    except sqlite3.Error as e:
+        config.logger.warning(f'同步字幕索引失败:{e}')
+
+
+def _escape_like(s):
+    return s.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _contains(tok):
+    # 包含该子串的字幕条件
+    if _fts and len(tok) >= 3:
+        return 's.id IN (SELECT rowid FROM segs_fts WHERE segs_fts MATCH ?)', '"' + tok.replace('"', '""') + '"'
+    return "s.lower LIKE ? ESCAPE '\\'", f'%{_escape_like(tok)}%'
+
+
+def _scope(root, video_id, lang):
+    where, params = ['substr(f.path, 1, ?)=?'], []
+    prefix = Path(root).as_posix().rstrip('/') + '/'
+    params += [len(prefix), prefix]
+    if video_id:
+        where.append('f.uuid=?')
+        params.append(str(video_id))
+    if lang:
+        lang = _escape_like(lang.lower())
+        where.append("(lower(f.name) LIKE ? ESCAPE '\\' OR lower(f.name) LIKE ? ESCAPE '\\' OR lower(f.name) LIKE ? ESCAPE '\\')")
+        params += [f'%.{lang}.srt%', f'%-{lang}.srt%', f'%\\_{lang}.srt%']
+    return where, params
+
+
+def _count(conn, key, sql, params):
+    # 总条数和各词命中条数只随索引变化，按索引版本缓存
+    key = (_gen,) + key
+    if key not in _stats:
+        if len(_stats) > 10000:
+            _stats.clear()
+        _stats[key] = conn.execute(sql, params).fetchone()[0]
+    return _stats[key]
+
+
+# 子串在字幕中不重叠出现的次数，与 str.count 一致，两个参数均为该子串
+_TF = "((length(s.lower) - length(replace(s.lower, ?, ''))) / length(?))"
+
+
+def search(root, query, tokens, limit=20, offset=0, video_id=None, lang=None, mode='auto', context_span=0):
+    """
+    返回按得分排序的命中字幕，每项包含所在文件信息、字幕内容，context_span > 0 时包含前后各 N 条
+    """
+    phrase = (query or '').strip().lower()
+    tokens = [t for t in tokens if t]
+    if not phrase or not tokens:
+        return []
+    try:
+        conn = _conn()
+        where, params = _scope(root, video_id, lang)
+        scope_key = (root, video_id, lang)
+        # 先选出范围内的文件，避免逐条字幕关联 files 表
+        base = ' FROM segs s WHERE s.file_id IN (SELECT f.id FROM files f WHERE ' + ' AND '.join(where) + ')'
+        total = _count(conn, scope_key, 'SELECT count(*)' + base, params)
+        if total == 0:
+            return []
+        uniq = list(dict.fromkeys(tokens))
+        conds = {tok: _contains(tok) for tok in uniq}
+        df = {tok: _count(conn, scope_key + (tok,), f'SELECT count(*){base} AND {c[0]}', params + [c[1]])
+              for tok, c in conds.items()}
+        # trigram 按字符折叠大小写，另用 instr 保证候选确实包含子串，从而得分必然大于 0
+        if mode == 'phrase':
+            cond, param = _contains(phrase)
+            cand, cand_params = [cond, 'instr(s.lower, ?) > 0'], [param, phrase]
+        elif mode == 'all':
+            cand = [conds[t][0] for t in uniq] + ['instr(s.lower, ?) > 0'] * len(uniq)
+            cand_params = [conds[t][1] for t in uniq] + uniq
+        else:
+            # 无任何词命中的字幕得分为 0，整句命中时必然包含各个词
+            cand = ['(' + ' OR '.join(conds[t][0] for t in uniq) + ')',
+                    '(' + ' OR '.join(['instr(s.lower, ?) > 0'] * len(uniq)) + ')']
+            cand_params = [conds[t][1] for t in uniq] + uniq
+        # 重复的词按出现次数重复计分
+        idf = {tok: math.log((total + 1) / (df[tok] + 1)) + 1.0 for tok in uniq}
+        score, score_params = ['0.0'], []
+        for tok in tokens:
+            score.append(f'{_TF} * ?')
+            score_params += [tok, tok, idf[tok]]
+        score.append(f'(CASE WHEN instr(s.lower, ?) > 0 THEN 10.0 + {_TF} ELSE 0 END)')
+        score_params += [phrase, phrase, phrase]
+        # 只对 id 和得分排序，得分相同按索引顺序，再取当前页的详细信息
+        ranked = conn.execute(
+            'SELECT s.id, ' + ' + '.join(score) + f' AS score{base} AND ' + ' AND '.join(cand)
+            + ' ORDER BY score DESC, s.file_id, s.idx LIMIT ? OFFSET ?',
+            score_params + params + cand_params + [max(1, int(limit or 20)), max(0, int(offset or 0))]).fetchall()
+        if not ranked:
+            return []
+        detail = {r[0]: r[1:] for r in conn.execute(
+            'SELECT s.id, s.file_id, s.idx, s.line, s.start_ms, s.end_ms, s.text, f.path, f.uuid, f.name, f.lang, f.video '
+            'FROM segs s JOIN files f ON f.id=s.file_id WHERE s.id IN (' + ','.join('?' * len(ranked)) + ')',
+            [r[0] for r in ranked]).fetchall()}
+        items = []
+        for seg_id, sc in ranked:
+            r = detail[seg_id]
+            items.append({'file_id': r[0], 'idx': r[1], 'line': r[2], 'start_ms': r[3], 'end_ms': r[4], 'text': r[5],
+                          'path': r[6], 'uuid': r[7], 'name': r[8], 'lang': r[9], 'video': r[10], 'score': sc})
+        if context_span and isinstance(context_span, int) and context_span > 0:
+            for it in items:
+                rows = conn.execute(
+                    'SELECT line, start_ms, end_ms, text FROM segs WHERE file_id=? AND idx BETWEEN ? AND ? AND idx<>? ORDER BY idx',
+                    (it['file_id'], it['idx'] - context_span, it['idx'] + context_span, it['idx'])).fetchall()
+                it['context'] = [{'line': r[0], 'start_ms': r[1], 'end_ms': r[2], 'text': r[3]} for r in rows]
+        return items
+    except sqlite3.Error as e:
+        config.logger.warning(f'字幕检索失败:{e}')
+        return []
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from videotrans.configure import config
+
+"""
+api 提交去重：按输入文件内容和生效配置计算 key，同一 key 再次提交时返回已有任务，不再重复执行
+生效配置包括请求参数，以及 config.params、config.settings 和提示词、术语表文件，修改模型、提示词、编码参数等全局设置后不再复用旧任务
+以 SQLite(WAL) 存储在 ROOT_DIR/task_status/submissions.db：submissions 记录 key 对应的任务 uuid 及是否已成功完成，
+file_hash 按路径、大小和修改时间缓存文件内容的 md5，大文件重复提交时无需再次读取
+"""
+
+# 不参与计算 key 的配置项：路径由文件内容代替，字幕列表由字幕文件内容决定
+_SKIP_KEYS = ('name', 'text_list')
+# 不影响输出结果的全局设置：界面状态、并发数、api 及后处理自身的设置
+_SKIP_PARAMS = ('last_opendir', 'target_dir')
+_SKIP_SETTING_PREFIXES = ('api_', 'postprocess_')
+_SKIP_SETTING_SUFFIXES = ('_concurrency',)
+
+_local = threading.local()
+
+
+def _conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        Path(f'{config.ROOT_DIR}/task_status').mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(f'{config.ROOT_DIR}/task_status/submissions.db', timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS submissions (key TEXT PRIMARY KEY, uuid TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_submissions_uuid ON submissions(uuid)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS file_hash (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, md5 TEXT NOT NULL)')
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def file_md5(file):
+    """
+    文件内容的 md5，路径、大小和修改时间未变时使用缓存
+    """
+    p = Path(file)
+    st = p.stat()
+    key = p.resolve().as_posix()
+    try:
+        row = _conn().execute('SELECT size, mtime_ns, md5 FROM file_hash WHERE path=?', (key,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+    except sqlite3.Error as e:
+        config.logger.warning(f'读取文件 hash 缓存失败:{e}')
+    md5 = hashlib.md5()
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+    value = md5.hexdigest()
+    try:
+        conn = _conn()
+        conn.execute('INSERT OR REPLACE INTO file_hash (path, size, mtime_ns, md5) VALUES (?,?,?,?)',
+                     (key, st.st_size, st.st_mtime_ns, value))
+        conn.commit()
+    except sqlite3.Error as e:
+        config.logger.warning(f'写入文件 hash 缓存失败:{e}')
+    return value
+
+
+def _global_cfg():
+    """
+    可能影响输出的全局配置，提示词和术语表文件以 路径、大小、修改时间 代替内容
+    """
+    params = {k: v for k, v in config.params.items() if k not in _SKIP_PARAMS}
+    settings = {k: v for k, v in config.settings.items() if
+                not k.startswith(_SKIP_SETTING_PREFIXES) and not k.endswith(_SKIP_SETTING_SUFFIXES)}
+    files = []
+    prompt_dir = Path(f'{config.ROOT_DIR}/videotrans/prompts')
+    for p in sorted(prompt_dir.rglob('*.txt')) + [Path(f'{config.ROOT_DIR}/videotrans/glossary.txt')]:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        files.append((p.as_posix(), st.st_size, st.st_mtime_ns))
+    return {'params': params, 'settings': settings, 'files': files}
+
+
+def make_key(kind, file, cfg):
+    """
+    kind 为接口名，file 为输入文件，cfg 为按请求参数和默认值得到的配置
+    """
+    data = {k: v for k, v in cfg.items() if k not in _SKIP_KEYS}
+    raw = json.dumps({'kind': kind, 'input': file_md5(file), 'cfg': data, 'global': _global_cfg()}, sort_keys=True,
+                     ensure_ascii=False, default=str)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def lookup(key):
+    """
+    返回 (uuid, 是否已成功完成)，不存在时返回 None
+    """
+    try:
+        row = _conn().execute('SELECT uuid, done FROM submissions WHERE key=?', (key,)).fetchone()
+    except sqlite3.Error as e:
+        config.logger.warning(f'读取提交记录失败:{e}')
+        return None
+    return (row[0], bool(row[1])) if row else None
+
+
+def record(key, uuid):
+    try:
+        conn = _conn()
+        conn.execute('INSERT OR REPLACE INTO submissions (key, uuid, done, created) VALUES (?,?,0,?)',
+                     (key, uuid, time.time()))
+        conn.commit()
+    except sqlite3.Error as e:
+        config.logger.warning(f'写入提交记录失败:{e}')
+
+
+def mark_done(uuid):
+    try:
+        conn = _conn()
+        conn.execute('UPDATE submissions SET done=1 WHERE uuid=?', (uuid,))
+        conn.commit()
+    except sqlite3.Error as e:
+        config.logger.warning(f'更新提交记录失败:{e}')
+
+
+def forget(key):
+    try:
+        conn = _conn()
+        conn.execute('DELETE FROM submissions WHERE key=?', (key,))
+        conn.commit()
+    except sqlite3.Error as e:
+        config.logger.warning(f'删除提交记录失败:{e}')
@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+from videotrans.configure import config
+
+"""
+api 任务状态存储
+set_process 产生的消息由 api 通过 config.push_listeners 直接写入内存，不再轮询 uuid_logs_queue 并逐条写 processinfo/*.json
+每个任务保存最新状态、所处阶段和最近 api_status_history 条消息，文本超过 MAX_TEXT 截断，任务结束后只保留最新状态
+type=stage 的消息只更新阶段，不改变最新状态
+读取方可调用 wait() 阻塞到状态变化，每个任务有各自的条件变量，只唤醒等待该任务的线程
+api_status_persist 开启时，后台线程每 FLUSH_INTERVAL 秒最多一次将有变化的状态批量写入 ROOT_DIR/task_status/status.db，
+重启后仍可查询已结束的任务
+已结束的任务超过 api_status_max_finished 个时从内存移除最早结束的；开启持久化时，结束超过 api_status_ttl 秒且已写入的也移除，之后从 SQLite 查询
+"""
+
+MAX_TEXT = 2000
+FLUSH_INTERVAL = 1.0
+END_TYPES = ('error', 'succeed', 'end', 'stop')
+
+_lock = threading.Lock()
+# 有待写入的任务时唤醒写入线程
+_dirty_cond = threading.Condition(_lock)
+_tasks = {}
+# 已结束的任务 uuid -> 结束时间，按结束先后排列
+_finished = OrderedDict()
+_dirty = set()
+_local = threading.local()
+_writer = None
+
+
+class _Entry:
+    __slots__ = ('type', 'text', 'stage', 'version', 'updated', 'history', 'cond')
+
+    def __init__(self, history_size):
+        self.type = 'logs'
+        self.text = ''
+        self.stage = ''
+        self.version = 0
+        self.updated = 0.0
+        # (version, type, text)，超过上限时丢弃最早的
+        self.history = deque(maxlen=history_size)
+        self.cond = threading.Condition(_lock)
+
+    def snapshot(self):
+        return {'type': self.type, 'text': self.text, 'stage': self.stage, 'version': self.version,
+                'updated': self.updated}
+
+
+def _history_size():
+    try:
+        return max(1, int(float(config.settings.get('api_status_history', 50))))
+    except (TypeError, ValueError):
+        return 50
+
+
+def _persist():
+    return bool(config.settings.get('api_status_persist', False))
+
+
+def _number_setting(name, default):
+    try:
+        return max(0, float(config.settings.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _prune(now):
+    # 调用方持有 _lock；尚未写入 SQLite 的任务等写入后再移除
+    persist = _persist()
+    limit = _number_setting('api_status_max_finished', 1000)
+    ttl = _number_setting('api_status_ttl', 3600)
+    while _finished:
+        uuid, ended = next(iter(_finished.items()))
+        if len(_finished) <= limit and not (persist and now - ended > ttl):
+            break
+        if uuid in _dirty:
+            break
+        del _finished[uuid]
+        _tasks.pop(uuid, None)
+
+
+def _conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        Path(f'{config.ROOT_DIR}/task_status').mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(f'{config.ROOT_DIR}/task_status/status.db', timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS status (uuid TEXT PRIMARY KEY, type TEXT NOT NULL, text TEXT NOT NULL, updated REAL NOT NULL)')
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _write_loop():
+    while True:
+        with _lock:
+            while not _dirty:
+                _dirty_cond.wait()
+        # 攒一段时间再写，同一任务的多次变化只写最后一次
+        time.sleep(FLUSH_INTERVAL)
+        with _lock:
+            rows, versions = [], []
+            for uuid in list(_dirty):
+                entry = _tasks.get(uuid)
+                if entry is None:
+                    _dirty.discard(uuid)
+                    continue
+                rows.append((uuid, entry.type, entry.text, entry.updated))
+                versions.append(entry.version)
+        try:
+            conn = _conn()
+            conn.executemany('INSERT OR REPLACE INTO status (uuid, type, text, updated) VALUES (?,?,?,?)', rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            # 保留在 _dirty 中下次重试，写入前不会从内存移除
+            config.logger.warning(f'写入任务状态失败:{e}')
+            continue
+        with _lock:
+            # 写入期间又有变化的任务留待下次写入
+            for row, version in zip(rows, versions):
+                entry = _tasks.get(row[0])
+                if entry is None or entry.version == version:
+                    _dirty.discard(row[0])
+            _prune(time.time())
+
+
+def put(uuid, data):
+    """
+    记录任务的一条消息，data 为 set_process 生成的 {text, type, uuid}
+    """
+    global _writer
+    msg_type = data.get('type', 'logs')
+    text = str(data.get('text', ''))[:MAX_TEXT]
+    with _lock:
+        entry = _tasks.get(uuid)
+        if entry is None:
+            entry = _tasks[uuid] = _Entry(_history_size())
+        if msg_type == 'stage':
+            entry.stage = text
+        else:
+            entry.type, entry.text = msg_type, text
+        entry.version += 1
+        entry.updated = time.time()
+        if msg_type in END_TYPES:
+            entry.history.clear()
+            _finished.pop(uuid, None)
+            _finished[uuid] = entry.updated
+        else:
+            entry.history.append((entry.version, msg_type, text))
+            if msg_type != 'stage':
+                _finished.pop(uuid, None)
+        entry.cond.notify_all()
+        if _persist():
+            _dirty.add(uuid)
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, daemon=True)
+                _writer.start()
+            _dirty_cond.notify()
+        if msg_type in END_TYPES:
+            _prune(entry.updated)
+
+
+def get(uuid):
+    """
+    返回任务最新状态 {type, text, version, updated}，不存在时返回 None
+    """
+    with _lock:
+        entry = _tasks.get(uuid)
+        if entry is not None:
+            return entry.snapshot()
+    if not _persist():
+        return None
+    try:
+        row = _conn().execute('SELECT type, text, updated FROM status WHERE uuid=?', (uuid,)).fetchone()
+    except sqlite3.Error as e:
+        config.logger.warning(f'读取任务状态失败:{e}')
+        return None
+    if not row:
+        return None
+    return {'type': row[0], 'text': row[1], 'stage': '', 'version': 0, 'updated': row[2]}
+
+
+def changes(uuid, since=0):
+    """
+    同时返回最新状态和版本号大于 since 的最近消息 [(version, type, text), ...]，任务不存在时返回 (None, [])
+    """
+    with _lock:
+        entry = _tasks.get(uuid)
+        if entry is None:
+            return None, []
+        return entry.snapshot(), [h for h in entry.history if h[0] > since]
+
+
+def wait(uuid, version=0, timeout=None):
+    """
+    阻塞到任务版本号大于 version 或超时，返回最新状态，任务不存在时立即返回 None
+    """
+    with _lock:
+        entry = _tasks.get(uuid)
+        if entry is None:
+            return None
+        entry.cond.wait_for(lambda: entry.version > version, timeout)
+        return entry.snapshot()
+
@@ -1,7 +1,7 @@
-import time
+from queue import Empty
 from threading import Thread
 
-from videotrans.configure import config
+from videotrans.configure import config, _procs
 from videotrans.task._base import BaseTask
 from videotrans.util.tools import set_process
 import traceback
@@ -12,6 +12,29 @@ def task_is_stop(uuid) -> bool:
         return True
     return False
 
+# 阻塞等待队列中的任务，有任务入队立即返回，超时仅用于检查是否退出
+# 取得任务后将当前线程绑定到该任务，此线程启动的子进程在任务停止时会被结束
+def take_task(q):
+    try:
+        trk = q.get(timeout=1)
+    except Empty:
+        return None
+    uuid = getattr(trk, "uuid", None)
+    _procs.bind(uuid)
+    # 阶段变化只有 api 的事件流需要，界面模式不发送
+    if uuid and config.push_listeners:
+        set_process(text=q.name, type='stage', uuid=uuid)
+    return trk
+
+
+# 每个阶段启动的工作线程数，由 {stage}_concurrency 设置
+def stage_concurrency(stage) -> int:
+    try:
+        return max(1, int(float(config.settings.get(f'{stage}_concurrency', 1))))
+    except (TypeError, ValueError):
+        return 1
+
+
 def get_recogn_type(type_index=None):
     from videotrans.recognition import RECOGN_NAME_LIST
     if type_index is None or type_index >= len(RECOGN_NAME_LIST):
@@ -51,12 +74,8 @@ class WorkerPrepare(Thread):
         while 1:
             if config.exit_soft:
                 return
-            if len(config.prepare_queue) < 1:
-                time.sleep(0.5)
-                continue
-            try:
-                trk: BaseTask = config.prepare_queue.pop(0)
-            except:
+            trk: BaseTask = take_task(config.prepare_queue)
+            if trk is None:
                 continue
             print(f"[DEBUG] WorkerPrepare processing task: {trk.uuid}")
             if task_is_stop(trk.uuid):
@@ -90,10 +109,9 @@ class WorkerRegcon(Thread):
             if config.exit_soft:
                 return
 
-            if len(config.regcon_queue) < 1:
-                time.sleep(0.5)
+            trk = take_task(config.regcon_queue)
+            if trk is None:
                 continue
-            trk = config.regcon_queue.pop(0)
             if task_is_stop(trk.uuid):
                 continue
             try:
@@ -122,10 +140,9 @@ class WorkerTrans(Thread):
         while 1:
             if config.exit_soft:
                 return
-            if len(config.trans_queue) < 1:
-                time.sleep(0.5)
+            trk = take_task(config.trans_queue)
+            if trk is None:
                 continue
-            trk = config.trans_queue.pop(0)
             if task_is_stop(trk.uuid):
                 continue
             try:
@@ -153,10 +170,9 @@ class WorkerDubb(Thread):
         while 1:
             if config.exit_soft:
                 return
-            if len(config.dubb_queue) < 1:
-                time.sleep(0.5)
+            trk = take_task(config.dubb_queue)
+            if trk is None:
                 continue
-            trk = config.dubb_queue.pop(0)
             if task_is_stop(trk.uuid):
                 continue
             try:
@@ -180,10 +196,9 @@ class WorkerAlign(Thread):
         while 1:
             if config.exit_soft:
                 return
-            if len(config.align_queue) < 1:
-                time.sleep(0.5)
+            trk = take_task(config.align_queue)
+            if trk is None:
                 continue
-            trk = config.align_queue.pop(0)
             if task_is_stop(trk.uuid):
                 continue
             try:
@@ -206,10 +221,9 @@ class WorkerAssemb(Thread):
         while 1:
             if config.exit_soft:
                 return
-            if len(config.assemb_queue) < 1:
-                time.sleep(0.5)
+            trk = take_task(config.assemb_queue)
+            if trk is None:
                 continue
-            trk = config.assemb_queue.pop(0)
             if task_is_stop(trk.uuid):
                 continue
             try:
@@ -224,9 +238,16 @@ class WorkerAssemb(Thread):
 
 
 def start_thread(parent=None):
-    WorkerPrepare(parent=parent).start()
-    WorkerRegcon(parent=parent).start()
-    WorkerTrans(parent=parent).start()
-    WorkerDubb(parent=parent).start()
-    WorkerAlign(parent=parent).start()
-    WorkerAssemb(parent=parent).start()
+    for stage, worker in [
+        ('prepare', WorkerPrepare),
+        ('regcon', WorkerRegcon),
+        ('trans', WorkerTrans),
+        ('dubb', WorkerDubb),
+        ('align', WorkerAlign),
+        ('assemb', WorkerAssemb),
+    ]:
+        for _ in range(stage_concurrency(stage)):
+            worker(parent=parent).start()
+    # 后处理线程，继续执行上次未完成的上传、导出作业
+    from videotrans.task import _postprocess
+    _postprocess.start()
@@ -16,6 +16,7 @@ from videotrans.recognition import run as run_recogn, Faster_Whisper_XXL
 from videotrans.translator import run as run_trans, get_audio_code
 from videotrans.tts import run as run_tts, CLONE_VOICE_TTS, CHATTERBOX_TTS, COSYVOICE_TTS, F5_TTS, EDGE_TTS, AZURE_TTS, \
     ELEVENLABS_TTS
+from videotrans.tts._cache import fetch_cache, store_cache
 from videotrans.util import tools
 from ._base import BaseTask
 from ._rate import SpeedRate
@@ -48,6 +49,12 @@ class TransCreate(BaseTask):
     # mp4编码类型 264 265
     video_codec_num: int = 264
     ignore_align: bool = False
+    # novoice_mp4 为无损中间文件时需在最终合成时编码；video_pad_ms 为最终合成时末尾定格的毫秒数
+    novoice_lossless: bool = False
+    video_pad_ms: int = 0
+    # 边翻译边配音时的后台合成队列，以及对应的原始字幕
+    _dub_prefetch: object = field(default=None, init=False, repr=False)
+    _prefetch_source: List = field(default=None, init=False, repr=False)
     """
     obj={name,dirname,basename,noextname,ext,target_dir,uuid}
     """
@@ -277,20 +284,46 @@ class TransCreate(BaseTask):
             self._preprocess_trim_video(trim_start, trim_end)
 
         # 将原始视频分离为无声视频和音频
+        novoice_in_pass = False
         if self.cfg['app_mode'] not in ['tiqu']:
             config.queue_novice[self.cfg['noextname']] = 'ing'
-            threading.Thread(target=self._split_novoice_byraw).start()
-            if not self.is_copy_video:
+            if self.is_copy_video:
+                # 仅复制视频流时耗时很少，与音频一起提取，只读取一次源文件
+                novoice_in_pass = True
+            else:
+                # 需要转码时单独执行，避免音频等待视频编码完成
+                threading.Thread(target=self._split_novoice_byraw).start()
                 self.status_text = '视频需要转码，耗时可能较久..' if config.defaulelang == 'zh' else 'Video needs transcoded and take a long time..'
         else:
             config.queue_novice[self.cfg['noextname']] = 'end'
 
+        need_separate = self.cfg['is_separate'] and (
+                    not tools.vail_file(self.cfg['vocal']) or not tools.vail_file(self.cfg['instrument']))
+        separate_raw = None
+        if need_separate:
+            tmpdir = config.TEMP_DIR + f"/{time.time()}"
+            os.makedirs(tmpdir, exist_ok=True)
+            separate_raw = tmpdir + "/raw.wav"
+        self.status_text = config.transobj['kaishitiquyinpin']
+        try:
+            self._demux_once(novoice=novoice_in_pass, separate_raw=separate_raw,
+                             to_16k=self.shoud_recogn and not self.cfg['is_separate'])
+        except Exception as e:
+            # 失败时回退为分别提取
+            config.logger.warning(f"单次提取音视频失败，改为分别提取: {e}")
+            if novoice_in_pass:
+                threading.Thread(target=self._split_novoice_byraw).start()
+            separate_raw = None
+
         # 添加是否保留背景选项
-        if self.cfg['is_separate'] and ( not tools.vail_file(self.cfg['vocal']) or not tools.vail_file(self.cfg['instrument'])):
+        if need_separate:
             try:
                 self._signal(text=config.transobj['Separating background music'])
                 self.status_text = config.transobj['Separating background music']
-                self._split_audio_byraw(True)
+                if separate_raw:
+                    self._separate_vocal(separate_raw)
+                else:
+                    self._split_audio_byraw(True)
             except Exception as e:
                 config.logger.error(f"人声分离失败: {str(e)}")
                 config.logger.exception(e, exc_info=True)
@@ -312,16 +345,16 @@ class TransCreate(BaseTask):
                     tools.conver_to_16k(self.cfg['vocal'], self.cfg['shibie_audio'])
         # 不分离，或分离失败
         if not self.cfg['is_separate']:
-            self.status_text = config.transobj['kaishitiquyinpin']
-            try:
-                self._split_audio_byraw()
-            except Exception as e:
-                error_msg = f"音频分离失败: {str(e)}" if config.defaulelang == 'zh' else f"Audio separation failed: {str(e)}"
-                config.logger.error(error_msg)
-                config.logger.exception(e, exc_info=True)
-                raise RuntimeError(error_msg)
+            if not tools.vail_file(self.cfg['source_wav']):
+                try:
+                    self._split_audio_byraw()
+                except Exception as e:
+                    error_msg = f"音频分离失败: {str(e)}" if config.defaulelang == 'zh' else f"Audio separation failed: {str(e)}"
+                    config.logger.error(error_msg)
+                    config.logger.exception(e, exc_info=True)
+                    raise RuntimeError(error_msg)
             # 需要识别
-            if self.shoud_recogn:
+            if self.shoud_recogn and not tools.vail_file(self.cfg['shibie_audio']):
                 tools.conver_to_16k(self.cfg['source_wav'], self.cfg['shibie_audio'])
 
         # 只有在文件确实存在时才复制
@@ -477,14 +510,19 @@ class TransCreate(BaseTask):
         try:
             rawsrt = tools.get_subtitle_from_srt(self.cfg['source_sub'], is_file=True)
             self.status_text = config.transobj['kaishitiquhefanyi']
-            target_srt = run_trans(
-                translate_type=self.cfg['translate_type'],
-                text_list=copy.deepcopy(rawsrt),
-                inst=self,
-                uuid=self.uuid,
-                source_code=self.cfg['source_language_code'],
-                target_code=self.cfg['target_language_code']
-            )
+            self._start_dub_prefetch(rawsrt)
+            try:
+                target_srt = run_trans(
+                    translate_type=self.cfg['translate_type'],
+                    text_list=copy.deepcopy(rawsrt),
+                    inst=self,
+                    uuid=self.uuid,
+                    source_code=self.cfg['source_language_code'],
+                    target_code=self.cfg['target_language_code']
+                )
+            finally:
+                if self._dub_prefetch is not None:
+                    self._dub_prefetch.close()
             self._save_srt_target(self._check_target_sub(rawsrt, target_srt), self.cfg['target_sub'])
 
             # 仅提取，该名字删原
@@ -508,6 +546,53 @@ class TransCreate(BaseTask):
             raise
         self.status_text = config.transobj['endtrans']
 
+    # 边翻译边配音，trans_dub_streaming 开启且使用配音缓存时有效，克隆角色需截取参考音频，不预先合成
+    def _start_dub_prefetch(self, rawsrt):
+        if not config.settings.get('trans_dub_streaming', False) or not self.shoud_dubbing or self.cfg[
+            'app_mode'] == 'tiqu' or self.cfg['voice_role'] == 'clone':
+            return
+        from videotrans.tts import _cache
+        from videotrans.tts._prefetch import DubPrefetch
+        if not _cache.enabled():
+            config.logger.info('配音缓存已禁用，trans_dub_streaming 无效')
+            return
+        self._prefetch_source = rawsrt
+        self._dub_prefetch = DubPrefetch(language=self.cfg['target_language_code'], uuid=self.uuid)
+
+    # 由翻译渠道在每批译文返回时调用，pairs=[(原字幕序号, 译文)]
+    def on_translated(self, pairs):
+        if self._dub_prefetch is None:
+            return
+        rate = self._tts_rate()
+        items = []
+        for i, text in pairs:
+            if i >= len(self._prefetch_source) or not text.strip():
+                continue
+            it = self._prefetch_source[i]
+            if it['end_time'] <= it['start_time']:
+                continue
+            voice_role = self._tts_role(it['line'])
+            if voice_role == 'clone':
+                continue
+            items.append({
+                "text": text,
+                "line": it['line'],
+                "ref_text": it['text'],
+                "role": voice_role,
+                "start_time_source": it['start_time'],
+                "end_time_source": it['end_time'],
+                "start_time": it['start_time'],
+                "end_time": it['end_time'],
+                "rate": rate,
+                "startraw": it['startraw'],
+                "endraw": it['endraw'],
+                "volume": self.cfg['volume'],
+                "pitch": self.cfg['pitch'],
+                "tts_type": self.cfg['tts_type'],
+                "filename": config.TEMP_DIR + f"/dubbing_cache/prefetch-{tools.get_md5(f'{self.uuid}-{i}-{text}')}.wav"
+            })
+        self._dub_prefetch.put(items)
+
     # 对字幕进行配音
     def dubbing(self) -> None:
         if self._exit():
@@ -568,12 +653,15 @@ class TransCreate(BaseTask):
                 raw_total_time=self.video_time,
                 noextname=self.cfg['noextname'],
                 target_audio=self.cfg['target_wav'],
-                cache_folder=self.cfg['cache_folder']
+                cache_folder=self.cfg['cache_folder'],
+                defer_video_encode=bool(config.settings.get('video_lossless_intermediate', False))
             )
             self.queue_tts = rate_inst.run()
+            self.novoice_lossless = self.novoice_lossless or rate_inst.video_lossless
+            self.video_pad_ms = rate_inst.video_pad_ms
             # 慢速处理后，更新新视频总时长，用于音视频对齐
             try:
-                self.video_time = tools.get_video_duration(self.cfg['novoice_mp4'])
+                self.video_time = tools.get_video_duration(self.cfg['novoice_mp4']) + self.video_pad_ms
             except:
                 pass
             # 更新字幕
@@ -651,236 +739,30 @@ class TransCreate(BaseTask):
         self.hasend = True
         self.precent = 100
 
-        # OSS Upload integration (optional, non-blocking)
-        oss_video_url = None  # Will store the OSS URL if upload succeeds
-
-        # Load OSS config first to get timeout
-        oss_upload_timeout = 300  # Default timeout
-        try:
-            from videotrans.configure.oss_config import get_oss_config_manager
-            _temp_manager = get_oss_config_manager()
-            _temp_config = _temp_manager.load_config()
-            oss_upload_timeout = _temp_config.get('upload_timeout', 300)
-        except Exception:
-            pass
-
-        def _upload_to_oss():
-            """Upload processed video to OSS (non-blocking)"""
-            nonlocal oss_video_url
-            try:
-                from videotrans.configure.oss_config import get_oss_config_manager
-                from videotrans.util.oss_uploader import OSSUploader
-
-                # Load OSS config
-                manager = get_oss_config_manager()
-                oss_config = manager.load_config()
-
-                # Check if OSS is enabled and upload_on_complete is True
-                if not oss_config.get('enabled', False):
-                    config.logger.info("[OSS] Upload disabled, skipping")
-                    return
-
-                if not oss_config.get('upload_on_complete', True):
-                    config.logger.info("[OSS] upload_on_complete is False, skipping")
-                    return
-
-                # Get the output video file
-                video_file = self.cfg.get('targetdir_mp4')
-                if not video_file or not Path(video_file).exists():
-                    config.logger.warning(f"[OSS] Video file not found: {video_file}")
-                    return
-
-                config.logger.info(f"[OSS] Starting upload: {video_file}")
-                self._signal(text="正在上传到 OSS..." if config.defaulelang == 'zh' else "Uploading to OSS...", type='logs')
-
-                # Initialize uploader
-                uploader = OSSUploader(oss_config)
-
-                # Upload with progress callback
-                def progress_callback(consumed, total):
-                    percent = (consumed / total) * 100
-                    self._signal(text=f"OSS {percent:.1f}%", type='logs')
-
-                # Upload with retry
-                result = uploader.upload_file_with_retry(
-                    video_file,
-                    callback=progress_callback
-                )
-
-                if result['success']:
-                    oss_video_url = result['url']
-                    config.logger.info(f"[OSS] Upload success: {oss_video_url}")
-                    self._signal(text=f"[OK] OSS: {oss_video_url}", type='logs')
-                else:
-                    config.logger.error(f"[OSS] Upload failed: {result.get('error', 'Unknown error')}")
-                    self._signal(text=f"[X] OSS upload failed: {result.get('error', 'Unknown error')}", type='logs')
-
-            except Exception as e:
-                config.logger.error(f"[OSS] Upload error: {e}")
-                import traceback
-                config.logger.error(traceback.format_exc())
-
-        # Start OSS upload in background thread
-        import threading as _th
-        upload_thread = _th.Thread(target=_upload_to_oss, daemon=True)
-        upload_thread.start()
-
-        # Wait for upload to complete (with timeout)
-        upload_thread.join(timeout=oss_upload_timeout)
-
         self._signal(text=f"{self.cfg['name']}", type='succeed')
         tools.send_notification(config.transobj['Succeed'], f"{self.cfg['basename']}")
-        # HearSight integration: summarize subtitles and store (optional, non-blocking)
-        def _hearsight_post():
-            try:
-                from videotrans.configure import config as _cfg
-                hs_url = (_cfg.params.get('hearsight_url') or '').strip()
-                hs_path = (_cfg.params.get('hearsight_summarize_path') or '/api/summarize').strip()
-                if not hs_url:
-                    return
-                import requests, json
-                from videotrans.util import help_srt as _hsrt
-                # choose subtitle: prefer target, fallback to source
-                sub_file = None
-                try:
-                    if self.cfg.get('target_sub') and Path(self.cfg['target_sub']).exists():
-                        sub_file = self.cfg['target_sub']
-                    elif self.cfg.get('source_sub') and Path(self.cfg['source_sub']).exists():
-                        sub_file = self.cfg['source_sub']
-                except Exception:
-                    sub_file = None
-                if not sub_file:
-                    return
-                subs = _hsrt.get_subtitle_from_srt(sub_file)
-                segments = []
-                for it in subs:
-                    try:
-                        st = float(it.get('start_time', 0)) / 1000.0
-                        et = float(it.get('end_time', 0)) / 1000.0
-                        if et <= st:
-                            continue
-                        segments.append({
-                            'index': int(it.get('line', len(segments) + 1)),
-                            'sentence': str(it.get('text', '')).strip(),
-                            'start_time': st,
-                            'end_time': et,
-                        })
-                    except Exception:
-                        continue
-                if not segments:
-                    return
-                # Use OSS URL if available, otherwise use local path
-                media_path = oss_video_url if oss_video_url else (self.cfg.get('targetdir_mp4') or self.cfg.get('name'))
-                payload = {
-                    'segments': segments,
-                    'media_path': media_path,
-                    'title': self.cfg.get('basename'),
-                    'is_oss': bool(oss_video_url),  # 标记是否使用 OSS URL
-                }
-                url = hs_url.rstrip('/') + (hs_path if hs_path.startswith('/') else '/' + hs_path)
-                resp = requests.post(url, json=payload, timeout=60)
-                _cfg.logger.info(f"HearSight summarize status={resp.status_code} body={resp.text[:500]}")
-            except Exception as e:
-                try:
-                    _cfg.logger.warning(f"HearSight summarize error: {e}")
-                except Exception:
-                    pass
-        import threading as _th
-        _th.Thread(target=_hearsight_post, daemon=True).start()
 
-        # Qdrant export integration (non-blocking) - replaces old HearSight local flow
-        def _export_to_qdrant():
-            """Export translated SRT to Qdrant (non-blocking, non-fatal)"""
+        # 上传 OSS、HearSight 摘要、Qdrant 导出交由后处理队列执行，不阻塞合成线程
+        from videotrans.task import _postprocess
+        video_file = self.cfg.get('targetdir_mp4')
+        # 仅保存视频时先将视频移到上一级目录，后处理作业需使用移动后已存在的路径
+        moved = False
+        if video_file and self.cfg['only_video']:
             try:
-                from videotrans.qdrant_export import export_to_qdrant, ExportConfig, validate_export_config
-                import logging
-
-                logger = logging.getLogger(__name__)
-
-                # Check if enable_hearsight (Qdrant export) is enabled
-                if not config.params.get('enable_hearsight', False):
-                    logger.info("[Qdrant] Export disabled (enable_hearsight unchecked), skipping")
-                    return
-
-                # Check if qdrant_enabled is also set (legacy compatibility)
-                if not config.params.get('qdrant_enabled', True):
-                    logger.info("[Qdrant] Export disabled (qdrant_enabled=False), skipping")
-                    return
-
-                # Get selected folder_id from UI (if available)
-                folder_id = config.params.get('hearsight_folder_id', None)
-                logger.info(f"[Qdrant] Exporting to folder: {folder_id or 'uncategorized'}")
-
-                # Build export config from global config
-                export_config = ExportConfig(
-                    qdrant_url=config.params.get('qdrant_url', 'http://localhost:6333'),
-                    qdrant_api_key=config.params.get('qdrant_api_key', None) or None,
-                    enable_summaries=config.params.get('qdrant_export_summaries', True),
-                    llm_api_url=config.params.get('qdrant_llm_api_url', ''),
-                    llm_api_key=config.params.get('qdrant_llm_api_key', ''),
-                    llm_model=config.params.get('qdrant_llm_model', 'deepseek-ai/DeepSeek-V3'),
-                    embedding_api_url=config.params.get('qdrant_embedding_api_url', ''),
-                    embedding_api_key=config.params.get('qdrant_embedding_api_key', ''),
-                    embedding_model=config.params.get('qdrant_embedding_model', 'BAAI/bge-large-zh-v1.5'),
-                    folder_id=folder_id  # 添加folder_id参数
-                )
-
-                # Validate config
-                is_valid, error_msg = validate_export_config(export_config)
-                if not is_valid:
-                    logger.warning(f"Qdrant export skipped: {error_msg}")
-                    return
-
-                # Find SRT file (prefer target, fallback to source)
-                srt_file = None
-                if self.cfg.get('target_sub') and Path(self.cfg['target_sub']).exists():
-                    srt_file = self.cfg['target_sub']
-                    target_language = self.cfg.get('target_language_code', 'zh-cn')
-                elif self.cfg.get('source_sub') and Path(self.cfg['source_sub']).exists():
-                    srt_file = self.cfg['source_sub']
-                    target_language = self.cfg.get('source_language_code', 'zh-cn')
-
-                if not srt_file:
-                    logger.warning("Qdrant export skipped: No SRT file found")
-                    return
-
-                # Get video information
-                video_path = oss_video_url if oss_video_url else self.cfg.get('targetdir_mp4', self.cfg.get('name', ''))
-                video_title = self.cfg.get('basename', '')
-
-                logger.info(f"Starting Qdrant export for: {video_title}")
-
-                # Export (this may take time, but we don't block the UI)
-                result = export_to_qdrant(
-                    srt_path=srt_file,
-                    video_path=video_path,
-                    video_title=video_title,
-                    language=target_language,
-                    config=export_config
-                )
-
-                if result.success:
-                    logger.info(f"✓ Qdrant export succeeded: video_id={result.video_id}, chunks={result.chunks_count}")
-                    tools.send_notification(
-                        "已导出到 Qdrant 向量库" if config.defaulelang == 'zh' else "Exported to Qdrant",
-                        f"{video_title} ({result.chunks_count} chunks)"
-                    )
-                else:
-                    logger.error(f"✗ Qdrant export failed: {result.error_message}")
-
+                mp4_path = Path(video_file)
+                video_file = mp4_path.rename(mp4_path.parent.parent / mp4_path.name).as_posix()
+                moved = True
             except Exception as e:
-                # Log error but don't fail the translation task
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Qdrant export error (non-fatal): {e}", exc_info=True)
-
-        # Start Qdrant export in background thread
-        _th.Thread(target=_export_to_qdrant, daemon=True).start()
+                config.logger.exception(e, exc_info=True)
+        try:
+            # 字幕在清理任务目录前复制
+            post_job = _postprocess.build_job(self.cfg, uuid=self.uuid, video_file=video_file)
+        except Exception as e:
+            post_job = None
+            config.logger.exception(e, exc_info=True)
 
         try:
-            if self.cfg['only_video']:
-                mp4_path = Path(self.cfg['targetdir_mp4'])
-                mp4_path.rename(mp4_path.parent.parent / mp4_path.name)
+            if moved:
                 shutil.rmtree(self.cfg['target_dir'], ignore_errors=True)
             if 'shound_del_name' in self.cfg:
                 Path(self.cfg['shound_del_name']).unlink(missing_ok=True)
@@ -889,6 +771,11 @@ class TransCreate(BaseTask):
         except Exception as e:
             config.logger.exception(e, exc_info=True)
 
+        try:
+            _postprocess.submit(post_job)
+        except Exception as e:
+            config.logger.exception(e, exc_info=True)
+
     # 视频预处理：裁剪头尾
     def _preprocess_trim_video(self, trim_start, trim_end):
         try:
@@ -907,16 +794,8 @@ class TransCreate(BaseTask):
 
             if trim_end > 0:
                 # 需要先获取视频总时长
-                import subprocess
-                probe_cmd = [
-                    config.FFPROBE_BIN, "-v", "error",
-                    "-show_entries", "format=duration",
-                    "-of", "default=noprint_wrappers=1:nokey=1",
-                    self.cfg['name']
-                ]
-                result = subprocess.run(probe_cmd, capture_output=True, text=True)
                 try:
-                    total_duration = float(result.stdout.strip())
+                    total_duration = tools.get_audio_time(self.cfg['name'])
                     target_duration = total_duration - trim_start - trim_end
                     if target_duration > 0:
                         cmd.extend(["-t", str(target_duration)])
@@ -949,18 +828,18 @@ class TransCreate(BaseTask):
 
     # 从原始视频分离出 无声视频
     def _split_novoice_byraw(self):
-        cmd = [
-            "-y",
-            "-i",
-            self.cfg['name'],
-            "-an",
-            "-c:v",
-            "copy" if self.is_copy_video else f"libx{self.video_codec_num}"
-        ]
-        if not self.is_copy_video:
-            cmd += ["-crf", f'{config.settings["crf"]}']
+        cmd = ["-y", "-i", self.cfg['name'], "-an"]
+        if self.is_copy_video:
+            cmd += ["-c:v", "copy"]
+        elif config.settings.get('video_lossless_intermediate', False):
+            # 无损转码，最终合成时只做一次有损编码
+            cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", "-pix_fmt", "yuv420p"]
+            self.novoice_lossless = True
+        else:
+            cmd += ["-c:v", f"libx{self.video_codec_num}", "-crf", f'{config.settings["crf"]}']
         cmd += [self.cfg['novoice_mp4']]
-        return tools.runffmpeg(cmd, noextname=self.cfg['noextname'])
+        # 在单独线程中执行，显式指定所属任务；无损编码不能使用硬件编码器
+        return tools.runffmpeg(cmd, noextname=self.cfg['noextname'], uuid=self.uuid, force_cpu=self.novoice_lossless)
 
     # 从原始视频中分离出音频
     def _split_audio_byraw(self, is_separate=False):
@@ -1012,12 +891,46 @@ class TransCreate(BaseTask):
             "pcm_s16le",
             tmpfile
         ])
+        self._separate_vocal(tmpfile)
+
+    # 分离人声和背景音，raw_wav 为 44.1k 双声道音频
+    def _separate_vocal(self, raw_wav):
         from videotrans.separate import st
         vocal_file = self.cfg['cache_folder'] + '/vocal.wav'
         if not tools.vail_file(vocal_file):
             self._signal(
                 text=config.transobj['Separating vocals and background music, which may take a longer time'])
-            st.start(audio=tmpfile, path=self.cfg['cache_folder'], uuid=self.uuid)
+            st.start(audio=raw_wav, path=self.cfg['cache_folder'], uuid=self.uuid)
+
+    # 一次读取源文件，同时输出原始音频，以及按需输出的识别用 16k 音频、人声分离用 44.1k 音频、无声视频
+    # 各输出不指定 -map，与分别执行时的默认流选择一致
+    def _demux_once(self, *, novoice=False, separate_raw=None, to_16k=False):
+        cmd = ["-y", "-i", self.cfg['name']]
+        cmd += ["-vn", "-ac", "2", "-c:a", "pcm_s16le", self.cfg['source_wav']]
+        if to_16k and not tools.vail_file(self.cfg['shibie_audio']):
+            cmd += ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", self.cfg['shibie_audio']]
+        if separate_raw:
+            cmd += ["-vn", "-ac", "2", "-ar", "44100", "-c:a", "pcm_s16le", separate_raw]
+        if novoice:
+            # 视频输出放在最后，runffmpeg 按最后一个输出判断是否为视频
+            cmd += ["-an", "-c:v", "copy", self.cfg['novoice_mp4']]
+        return tools.runffmpeg(cmd, noextname=self.cfg['noextname'] if novoice else None)
+
+    def _tts_rate(self):
+        try:
+            rate = int(str(self.cfg['voice_rate']).replace('%', ''))
+        except:
+            rate = 0
+        if rate >= 0:
+            return f"+{rate}%"
+        return f"{rate}%"
+
+    # 判断是否存在单独设置的行角色，如果不存在则使用全局
+    def _tts_role(self, line):
+        line_roles = config.line_roles
+        if line_roles and f'{line}' in line_roles:
+            return line_roles[f'{line}']
+        return self.cfg['voice_role']
 
     # 配音预处理，去掉无效字符，整理开始时间
     def _tts(self) -> None:
@@ -1026,24 +939,12 @@ class TransCreate(BaseTask):
         source_subs = tools.get_subtitle_from_srt(self.cfg['source_sub'])
         if len(subs) < 1:
             raise RuntimeError(f"SRT file error:{self.cfg['target_sub']}")
-        try:
-            rate = int(str(self.cfg['voice_rate']).replace('%', ''))
-        except:
-            rate = 0
-        if rate >= 0:
-            rate = f"+{rate}%"
-        else:
-            rate = f"{rate}%"
-        # 取出设置的每行角色
-        line_roles = config.line_roles
+        rate = self._tts_rate()
         # 取出每一条字幕，行号\n开始时间 --> 结束时间\n内容
         for i, it in enumerate(subs):
             if it['end_time'] <= it['start_time']:
                 continue
-            # 判断是否存在单独设置的行角色，如果不存在则使用全局
-            voice_role = self.cfg['voice_role']
-            if line_roles and f'{it["line"]}' in line_roles:
-                voice_role = line_roles[f'{it["line"]}']
+            voice_role = self._tts_role(it['line'])
             filename_md5 = tools.get_md5(
                 f"{self.cfg['tts_type']}-{it['start_time']}-{it['end_time']}-{voice_role}-{rate}-{self.cfg['volume']}-{self.cfg['pitch']}-{len(it['text'])}-{i}")
             tmp_dict = {
@@ -1089,13 +990,21 @@ class TransCreate(BaseTask):
         Path(config.TEMP_DIR + "/dubbing_cache").mkdir(parents=True, exist_ok=True)
         if not self.queue_tts or len(self.queue_tts) < 1:
             raise RuntimeError(f'Queue tts length is 0')
+        # 等待边翻译边配音的行合成完毕，其结果已存入缓存
+        if self._dub_prefetch is not None:
+            self._dub_prefetch.join()
+            self._dub_prefetch = None
+        # 命中跨任务配音缓存的条目直接使用，仅合成未命中的
+        queue_miss, queue_dup = fetch_cache(self.queue_tts, language=self.cfg['target_language_code'])
         # 具体配音操作
-        run_tts(
-            queue_tts=copy.deepcopy(self.queue_tts),
-            language=self.cfg['target_language_code'],
-            uuid=self.uuid,
-            inst=self
-        )
+        if queue_miss:
+            run_tts(
+                queue_tts=copy.deepcopy(queue_miss),
+                language=self.cfg['target_language_code'],
+                uuid=self.uuid,
+                inst=self
+            )
+            store_cache(queue_miss, language=self.cfg['target_language_code'], duplicates=queue_dup)
         if config.settings.get('save_segment_audio', False):
             outname = self.cfg['target_dir'] + f'/segment_audio_{self.cfg["noextname"]}'
             Path(outname).mkdir(parents=True, exist_ok=True)
@@ -1271,6 +1180,24 @@ class TransCreate(BaseTask):
         return basename, subtitle_langcode
 
     # 最终合成视频
+    def _video_args(self, subtitles_file=None) -> list:
+        """
+        最终合成时的视频编码参数，硬字幕、末尾定格在同一次编码中完成
+        无需任何滤镜且 novoice_mp4 不是无损中间文件时直接复制视频流
+        """
+        filters = []
+        if self.video_pad_ms > 0:
+            filters.append(f'tpad=stop_mode=clone:stop_duration={self.video_pad_ms / 1000:.3f}')
+        if subtitles_file:
+            filters.append(f'subtitles={subtitles_file}')
+        if not filters and not self.novoice_lossless:
+            return ["-c:v", "copy"]
+        args = ["-c:v", f"libx{self.video_codec_num}", '-crf', f'{config.settings["crf"]}', '-preset',
+                config.settings['preset']]
+        if filters:
+            args += ["-vf", ",".join(filters)]
+        return args
+
     def _join_video_audio_srt(self) -> None:
         if self._exit():
             return
@@ -1319,20 +1246,13 @@ class TransCreate(BaseTask):
                         self.cfg['novoice_mp4'],
                         "-i",
                         Path(self.cfg['target_wav']).as_posix(),
-                        "-c:v",
-                        f"libx{self.video_codec_num}",
+                        *self._video_args(subtitles_file),
                         "-c:a",
                         "aac",
                         "-b:a",
                         "128k",
-                        "-vf",
-                        f"subtitles={subtitles_file}",
                         "-movflags",
                         "+faststart",
-                        '-crf',
-                        f'{config.settings["crf"]}',
-                        '-preset',
-                        config.settings['preset'],
                         "-shortest",
                         Path(self.cfg['targetdir_mp4']).as_posix()
                     ]
@@ -1349,8 +1269,7 @@ class TransCreate(BaseTask):
                         Path(self.cfg['target_wav']).as_posix(),
                         "-i",
                         subtitles_file,
-                        "-c:v",
-                        "copy",
+                        *self._video_args(),
                         "-c:a",
                         "aac",
                         "-c:s",
@@ -1375,8 +1294,7 @@ class TransCreate(BaseTask):
                     self.cfg['novoice_mp4'],
                     "-i",
                     Path(self.cfg['target_wav']).as_posix(),
-                    "-c:v",
-                    "copy",
+                    *self._video_args(),
                     "-c:a",
                     "aac",
                     "-b:a",
@@ -1400,22 +1318,15 @@ class TransCreate(BaseTask):
                     cmd.append('-i')
                     cmd.append(Path(self.cfg['source_wav']).as_posix())
 
-                cmd.append('-c:v')
-                cmd.append(f'libx{self.video_codec_num}')
+                cmd += self._video_args(subtitles_file)
                 if tools.vail_file(self.cfg['source_wav']):
                     cmd.append('-c:a')
                     cmd.append('aac')
                 cmd += [
                     "-b:a",
                     "128k",
-                    "-vf",
-                    f"subtitles={subtitles_file}",
                     "-movflags",
                     "+faststart",
-                    '-crf',
-                    f'{config.settings["crf"]}',
-                    '-preset',
-                    config.settings['preset'],
                     "-shortest",
                     Path(self.cfg['targetdir_mp4']).as_posix(),
                 ]
@@ -1439,8 +1350,7 @@ class TransCreate(BaseTask):
                 cmd += [
                     "-i",
                     subtitles_file,
-                    "-c:v",
-                    "copy"
+                    *self._video_args()
                 ]
                 if tools.vail_file(self.cfg['source_wav']):
                     cmd.append('-c:a')
@@ -1452,10 +1362,6 @@ class TransCreate(BaseTask):
                     f"language={subtitle_langcode}",
                     "-movflags",
                     "+faststart",
-                    '-crf',
-                    f'{config.settings["crf"]}',
-                    '-preset',
-                    config.settings['preset'],
                     "-shortest",
                 ]
                 cmd.append(Path(self.cfg['targetdir_mp4']).as_posix())
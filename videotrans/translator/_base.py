@@ -1,5 +1,6 @@
-import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union
@@ -7,9 +8,52 @@ from typing import List, Dict, Any, Optional, Union
 from videotrans.configure import config
 from videotrans.configure._base import BaseCon
 from videotrans.configure._except import TranslateSrtError
+from videotrans.translator import _memory
 from videotrans.util import tools
 
 
+class TokenBucket:
+    """
+    令牌桶限速，rate 为每秒请求数，capacity 为允许的突发数
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, exit_fn=None) -> bool:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if exit_fn and exit_fn():
+                return False
+            time.sleep(min(wait, 0.5))
+
+
+# 同一翻译渠道在所有任务间共享的 并发数限制 和 令牌桶
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(name: str, max_inflight: int, wait_sec: float):
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if not limiter or limiter[0] != (max_inflight, wait_sec):
+            bucket = TokenBucket(1 / wait_sec) if wait_sec > 0 else None
+            limiter = ((max_inflight, wait_sec), threading.BoundedSemaphore(max_inflight), bucket)
+            _limiters[name] = limiter
+        return limiter[1], limiter[2]
+
+
 @dataclass
 class BaseTrans(BaseCon):
     text_list: Union[List, str] = ""
@@ -35,6 +79,11 @@ class BaseTrans(BaseCon):
     wait_sec: float = field(init=False)
     is_srt: bool = field(init=False)
     aisendsrt: bool = field(init=False)
+    # 同时进行中的批次请求数，子类可设置 max_inflight_limit 限制该渠道的上限，0为不限制
+    max_inflight: int = field(init=False)
+    max_inflight_limit: int = field(default=0, init=False)
+    # 翻译记忆键的公共部分
+    memory_ns: str = field(default='', init=False)
 
     def __post_init__(self):
         super().__init__()
@@ -45,6 +94,7 @@ class BaseTrans(BaseCon):
         self.aisendsrt = config.settings.get('aisendsrt', False)
 
         self.is_srt = not isinstance(self.text_list, str)
+        self.max_inflight = max(1, int(float(config.settings.get('trans_max_inflight', 3))))
 
     # 发出请求获取内容 data=[text1,text2,text] | text
     def _item_task(self, data: Union[List[str], str]) -> str:
@@ -75,132 +125,230 @@ class BaseTrans(BaseCon):
         from tenacity import RetryError
         try:
             if self.is_srt and self.aisendsrt:
-                return self._run_srt()
-            return self._run_text()
+                result = self._run_srt()
+            else:
+                result = self._run_text()
+            if not self.is_test:
+                _memory.evict()
+            return result
         except RetryError as e:
             raise e.last_attempt.exception()
         except Exception as e:
             raise
 
+    def _map_batches(self, batches, task):
+        """
+        并发执行各批次的 task(batch)，按原顺序逐个产出结果
+        并发数受 max_inflight 限制，请求间隔由按 translation_wait 换算的令牌桶控制，取代每批次后的固定等待
+        """
+        max_inflight = self.max_inflight
+        if self.max_inflight_limit > 0:
+            max_inflight = min(max_inflight, self.max_inflight_limit)
+        semaphore, bucket = _get_limiter(self.__class__.__name__, max_inflight, self.wait_sec)
+        max_inflight = min(max_inflight, len(batches)) if batches else 1
+
+        def _call(batch):
+            with semaphore:
+                if self._exit():
+                    return None
+                if bucket and not bucket.acquire(self._exit):
+                    return None
+                return task(batch)
+
+        if max_inflight <= 1:
+            for batch in batches:
+                if self._exit():
+                    return
+                yield _call(batch)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=max_inflight)
+        try:
+            futures = [pool.submit(_call, batch) for batch in batches]
+            for fu in futures:
+                if self._exit():
+                    return
+                yield fu.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _translate_text_batch(self, it):
+        return tools.cleartext(self._item_task(it))
+
     def _run_text(self):
-        # 翻译字幕并且以完整srt格式发送
-        for i, it in enumerate(self.split_source_text):
-            """ it=['你好啊我的朋友','第二行'] 
-                此时 _item_task 接收的是 list[str]
-            """
-            config.logger.info(f'##### [以文字行形式翻译]')
+        """ it=['你好啊我的朋友','第二行']
+            此时 _item_task 接收的是 list[str]
+        """
+        config.logger.info(f'##### [以文字行形式翻译]')
+        # 非srt只翻译第一组
+        lines = [line for it in (self.split_source_text if self.is_srt else self.split_source_text[:1]) for line in it]
+        # 先从翻译记忆中逐行取出译文，仅将未命中的行重新分组请求
+        keys = [self._get_key(line) for line in lines]
+        hits = self._get_memory(keys)
+        translated = [hits.get(k) for k in keys]
+        miss = [i for i, t in enumerate(translated) if t is None]
+        miss_batches = [miss[i:i + self.trans_thread] for i in range(0, len(miss), self.trans_thread)]
+        config.logger.info(f'翻译记忆命中 {len(lines) - len(miss)} 行，需翻译 {len(miss)} 行')
+
+        raw_result = None
+        emitted = self._emit_text_lines(translated, 0)
+        self._publish([(i, t) for i, t in enumerate(translated) if t is not None])
+        batches = [[lines[i] for i in idx_batch] for idx_batch in miss_batches]
+        for n, result in enumerate(self._map_batches(batches, self._translate_text_batch)):
             if self._exit():
                 return
-
-            result = self._get_cache(it)
-            if not result:
-                result = tools.cleartext(self._item_task(it))
-                self._set_cache(it, result)
-            if self.inst and self.inst.precent < 75:
-                self.inst.precent += 0.01
-            # 非srt直接break
-            if not self.is_srt:
-                self.target_list.append(result)
-                break
+            idx_batch = miss_batches[n]
             sep_res = result.split("\n")
-
-            for x, result_item in enumerate(sep_res):
-                if x < len(it):
-                    self.target_list.append(result_item.strip())
-                    self._signal(
-                        text=result_item + "\n",
-                        type='subtitle')
-                    self._signal(
-                        text=config.transobj['starttrans'] + f' {i * self.trans_thread + x + 1} ')
+            # 行数一致时才能逐行对应，存入翻译记忆
+            if len(sep_res) == len(idx_batch):
+                self._set_memory([(keys[i], sep_res[x].strip()) for x, i in enumerate(idx_batch)])
+            elif not self.is_srt:
+                raw_result = result
             # 行数不匹配填充空行
-            if len(sep_res) < len(it):
-                tmp = ["" for x in range(len(it) - len(sep_res))]
-                self.target_list += tmp
+            for x, i in enumerate(idx_batch):
+                translated[i] = sep_res[x].strip() if x < len(sep_res) else ""
+            if len(sep_res) == len(idx_batch):
+                self._publish([(i, translated[i]) for i in idx_batch])
+            if self.inst and self.inst.precent < 75:
+                self.inst.precent += 0.01
+            emitted = self._emit_text_lines(translated, emitted)
 
             if self.inst and self.inst.status_text:
                 self.inst.status_text = '字幕翻译中' if config.defaulelang == 'zh' else 'Translation of subtitles'
-            time.sleep(self.wait_sec)
+        if self._exit():
+            return
 
         # 恢复原代理设置
         if self.shound_del:
             self._set_proxy(type='del')
         # text_list是字符串
         if not self.is_srt:
-            return "\n".join(self.target_list)
-
-        max_i = len(self.target_list)
+            return raw_result if raw_result is not None else "\n".join(translated)
 
         for i, it in enumerate(self.text_list):
-            if i < max_i:
-                self.text_list[i]['text'] = self.target_list[i]
-            else:
-                self.text_list[i]['text'] = ""
+            self.text_list[i]['text'] = translated[i] if i < len(translated) and translated[i] is not None else ""
         return self.text_list
 
+    # 按顺序发送已得到译文的连续行，返回下一个待发送的位置
+    def _emit_text_lines(self, translated, start):
+        if not self.is_srt:
+            return start
+        while start < len(translated) and translated[start] is not None:
+            self._signal(
+                text=translated[start] + "\n",
+                type='subtitle')
+            self._signal(
+                text=config.transobj['starttrans'] + f' {start + 1} ')
+            start += 1
+        return start
+
+    def _translate_srt_batch(self, srt_str):
+        result = self._item_task(srt_str)
+        if not result.strip():
+            raise TranslateSrtError('无返回翻译结果' if config.defaulelang == 'zh' else 'Translate result is empty')
+        return result
+
     # 发送完整字幕格式内容进行翻译
     # 此时 _item_task 接收的是 srt格式的字符串
     def _run_srt(self):
-        result_srt_str_list = []
-        for i, it in enumerate(self.split_source_text):
-            config.logger.info(f'#### [以完整SRT格式发送翻译]，it应是dict列表')
+        config.logger.info(f'#### [以完整SRT格式发送翻译]，it应是dict列表')
+        entries = [srt for it in self.split_source_text for srt in it]
+        for srt in entries:
+            srt['text'] = srt['text'].strip().replace("\n", " ")
+        # 每个位置的结果：dict 为单条字幕；list 为返回条数不匹配时该组的全部字幕，放在该组首位，其余位置为 []
+        results = [None] * len(entries)
+        # 每个位置需发送到界面的内容
+        signals = [None] * len(entries)
+        keys = [self._get_key(srt['text']) for srt in entries]
+        hits = self._get_memory(keys)
+        for i, k in enumerate(keys):
+            if k in hits:
+                results[i] = dict(entries[i], text=hits[k])
+                signals[i] = f"{entries[i]['line']}\n{entries[i]['time']}\n{hits[k]}\n\n"
+        miss = [i for i, r in enumerate(results) if r is None]
+        miss_batches = [miss[i:i + self.trans_thread] for i in range(0, len(miss), self.trans_thread)]
+        config.logger.info(f'翻译记忆命中 {len(entries) - len(miss)} 条，需翻译 {len(miss)} 条')
+        srt_str_list = ["\n\n".join(
+            [f"{entries[i]['line']}\n{entries[i]['time']}\n{entries[i]['text']}" for i in idx_batch]) for
+            idx_batch in miss_batches]
+
+        emitted = self._emit_srt_blocks(signals, 0)
+        self._publish([(i, r['text']) for i, r in enumerate(results) if r is not None])
+        for n, result in enumerate(self._map_batches(srt_str_list, self._translate_srt_batch)):
             if self._exit():
                 return
-            for j, srt in enumerate(it):
-                srt['text'] = srt['text'].strip().replace("\n", " ")
-                it[j] = srt
-            srt_str = "\n\n".join(
-                [f"{srtinfo['line']}\n{srtinfo['time']}\n{srtinfo['text'].strip()}" for srtinfo in it])
-            result = self._get_cache(srt_str)
-            if not result:
-                result = self._item_task(srt_str)
-                if not result.strip():
-                    raise TranslateSrtError('无返回翻译结果' if config.defaulelang == 'zh' else 'Translate result is empty')
-                self._set_cache(it, result)
+            idx_batch = miss_batches[n]
+            raws = tools.get_subtitle_from_srt(result, is_file=False)
+            # 双语翻译结果，只取最后一行
+            for it in raws:
+                it['text'] = it['text'].strip().split("\n")
+                it['text'] = it['text'][-1] if it['text'] else ''
+            if len(raws) == len(idx_batch):
+                for x, i in enumerate(idx_batch):
+                    results[i] = raws[x]
+                self._set_memory([(keys[i], raws[x]['text']) for x, i in enumerate(idx_batch)])
+                self._publish([(i, raws[x]['text']) for x, i in enumerate(idx_batch)])
+            else:
+                results[idx_batch[0]] = raws
+                for i in idx_batch[1:]:
+                    results[i] = []
+            for i in idx_batch:
+                signals[i] = ''
+            signals[idx_batch[0]] = result
 
             if self.inst and self.inst.precent < 75:
                 self.inst.precent += 0.1
-
-            self._signal(text=result, type='subtitle')
-            result_srt_str_list.append(result)
+            emitted = self._emit_srt_blocks(signals, emitted)
 
             if self.inst and self.inst.status_text:
                 self.inst.status_text = '字幕翻译中' if config.defaulelang == 'zh' else 'Translation of subtitles'
-            time.sleep(self.wait_sec)
+        if self._exit():
+            return
 
         # 恢复原代理设置
         if self.shound_del:
             self._set_proxy(type='del')
-        raws_list = tools.get_subtitle_from_srt("\n\n".join(result_srt_str_list), is_file=False)
-
-        # 双语翻译结果，只取最后一行
-        config.logger.info(f'{raws_list=}\n{result_srt_str_list=}\n')
-        for i, it in enumerate(raws_list):
-            it['text'] = it['text'].strip().split("\n")
-            if it['text']:
-                it['text'] = it['text'][-1]
-            raws_list[i] = it
+        raws_list = []
+        for it in results:
+            if isinstance(it, list):
+                raws_list.extend(it)
+            elif it:
+                raws_list.append(it)
+        config.logger.info(f'{raws_list=}\n')
         return raws_list
 
-    def _set_cache(self, it, res_str):
-        if not res_str.strip():
+    # 将已确定对应关系的译文 [(原字幕序号, 译文)] 交给任务，用于边翻译边配音
+    def _publish(self, pairs):
+        if not self.is_srt or not pairs or self.inst is None:
             return
-        key_cache = self._get_key(it)
+        on_translated = getattr(self.inst, 'on_translated', None)
+        if on_translated is None:
+            return
+        try:
+            on_translated(pairs)
+        except Exception as e:
+            config.logger.warning(f'on_translated error:{e}')
+
+    def _emit_srt_blocks(self, signals, start):
+        while start < len(signals) and signals[start] is not None:
+            if signals[start]:
+                self._signal(text=signals[start], type='subtitle')
+            start += 1
+        return start
 
-        file_cache = config.TEMP_DIR + f'/translate_cache/{key_cache}.txt'
-        if not Path(config.TEMP_DIR + f'/translate_cache').is_dir():
-            Path(config.TEMP_DIR + f'/translate_cache').mkdir(parents=True, exist_ok=True)
-        Path(file_cache).write_text(res_str, encoding='utf-8')
+    def _get_memory(self, keys):
+        if self.is_test:
+            return {}
+        return _memory.get_many(keys)
 
-    def _get_cache(self, it):
+    def _set_memory(self, pairs):
         if self.is_test:
-            return None
-        key_cache = self._get_key(it)
-        file_cache = config.TEMP_DIR + f'/translate_cache/{key_cache}.txt'
-        if Path(file_cache).exists():
-            return Path(file_cache).read_text(encoding='utf-8')
-        return None
-
-    def _get_key(self, it):
-        Path(config.TEMP_DIR + '/translate_cache').mkdir(parents=True, exist_ok=True)
-        return tools.get_md5(
-            f'{self.__class__.__name__}-{self.api_url}-{self.trans_thread}-{self.retry}-{self.wait_sec}-{self.iter_num}-{self.is_srt}-{self.aisendsrt}-{self.proxies}-{self.model_name}-{self.source_code}-{self.target_code}-{it if isinstance(it, str) else json.dumps(it)}')
+            return
+        _memory.put_many(pairs)
+
+    # 逐行的翻译记忆键，仅与 渠道、接口地址、模型、语言、提示词、原文 有关
+    def _get_key(self, text):
+        if not self.memory_ns:
+            prompt_hash = tools.get_md5(getattr(self, 'prompt', '') or '')
+            self.memory_ns = f'{self.__class__.__name__}-{self.api_url or ""}-{self.model_name}-{self.source_code}-{self.target_code}-{self.is_srt and self.aisendsrt}-{prompt_hash}'
+        return tools.get_md5(f'{self.memory_ns}-{text.strip()}')
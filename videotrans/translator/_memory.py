@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from videotrans.configure import config
+
+"""
+句子级翻译记忆，以 SQLite(WAL) 存储在 ROOT_DIR/translate_cache/memory.db，所有任务共享
+键为 翻译渠道、模型、源语言、目标语言、提示词、原文 的 md5，由 BaseTrans 生成，与 trans_thread、重试次数、等待时间等设置无关
+超过 trans_memory_size_mb 时按最近使用时间淘汰，0 为禁用
+"""
+
+_local = threading.local()
+_evict_lock = threading.Lock()
+# SQLite 单条语句的参数数量有上限，分批查询
+_CHUNK = 500
+
+
+def _limit_bytes():
+    try:
+        return int(float(config.settings.get('trans_memory_size_mb', 200)) * 1024 * 1024)
+    except (TypeError, ValueError):
+        return 0
+
+
+def enabled():
+    return _limit_bytes() > 0
+
+
+def _conn():
+    # 每个线程使用各自的连接，WAL 模式下读写互不阻塞
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        Path(f'{config.ROOT_DIR}/translate_cache').mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(f'{config.ROOT_DIR}/translate_cache/memory.db', timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS memory (key TEXT PRIMARY KEY, target TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_memory_last_used ON memory(last_used)')
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def get_many(keys):
+    """
+    返回 {key: 译文}，仅包含命中的键，并更新其最近使用时间
+    """
+    if not keys or not enabled():
+        return {}
+    result = {}
+    try:
+        conn = _conn()
+        uniq = list(set(keys))
+        for i in range(0, len(uniq), _CHUNK):
+            chunk = uniq[i:i + _CHUNK]
+            rows = conn.execute(f'SELECT key, target FROM memory WHERE key IN ({",".join("?" * len(chunk))})',
+                                chunk).fetchall()
+            result.update(rows)
+        if result:
+            now = time.time()
+            conn.executemany('UPDATE memory SET last_used=? WHERE key=?', [(now, k) for k in result])
+            conn.commit()
+    except sqlite3.Error as e:
+        config.logger.warning(f'读取翻译记忆失败:{e}')
+    return result
+
+
+def put_many(pairs):
+    """
+    pairs: [(key, 译文)]
+    """
+    if not pairs or not enabled():
+        return
+    now = time.time()
+    try:
+        conn = _conn()
+        conn.executemany('INSERT OR REPLACE INTO memory (key, target, size, last_used) VALUES (?,?,?,?)',
+                         [(k, v, len(k) + len(v.encode('utf-8')), now) for k, v in pairs if v.strip()])
+        conn.commit()
+    except sqlite3.Error as e:
+        config.logger.warning(f'写入翻译记忆失败:{e}')
+
+
+def evict():
+    """
+    超出容量时删除最久未使用的记录，直到容量的 90%
+    """
+    limit = _limit_bytes()
+    if limit <= 0:
+        return
+    with _evict_lock:
+        try:
+            conn = _conn()
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM memory').fetchone()[0]
+            if total <= limit:
+                return
+            need = total - int(limit * 0.9)
+            rows = conn.execute('SELECT key, size FROM memory ORDER BY last_used').fetchall()
+            remove = []
+            for key, size in rows:
+                if need <= 0:
+                    break
+                remove.append((key,))
+                need -= size
+            conn.executemany('DELETE FROM memory WHERE key=?', remove)
+            conn.commit()
+            config.logger.info(f'翻译记忆超出容量，已淘汰 {len(remove)} 条')
+        except sqlite3.Error as e:
+            config.logger.warning(f'淘汰翻译记忆失败:{e}')
@@ -21,6 +21,8 @@ class MyMemory(BaseTrans):
     def __post_init__(self):
         super().__post_init__()
         self.aisendsrt = False
+        # 免费接口限频严格，不并发请求
+        self.max_inflight_limit = 1
         pro = self._set_proxy(type='set')
         if pro:
             self.proxies = {"https": pro, "http": pro}
@@ -1,13 +1,13 @@
 import json
 import logging
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans import tts
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -25,7 +25,7 @@ class AI302(BaseTTS):
 
     def _item_task(self, data_item: dict = None):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if self._exit() or tools.vail_file(data_item['filename']):
@@ -76,7 +76,7 @@ class AI302(BaseTTS):
         else:
             payload['provider'] = 'azure'
         # print(f'{payload=}')
-        response = requests.post('https://api.302.ai/302/v2/audio/tts', headers={
+        response = self._post('https://api.302.ai/302/v2/audio/tts', headers={
             'Authorization': f'Bearer {config.params["ai302_key"]}',
             'Content-Type': 'application/json'
         }, data=json.dumps(payload), verify=False, proxies=None)
@@ -85,7 +85,7 @@ class AI302(BaseTTS):
         audio_url = res.get("audio_url")
         if not audio_url:
             raise RuntimeError(res.get('error', {}).get("message"))
-        req_audio = requests.get(audio_url)
+        req_audio = self._get(audio_url)
         req_audio.raise_for_status()
         with open(data['filename'] + ".mp3", 'wb') as f:
             f.write(req_audio.content)
@@ -0,0 +1,135 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from videotrans.configure import config
+
+"""
+配音并发数的 AIMD 控制
+每条字幕成功且耗时未明显变长时，并发数缓慢增加(每轮约 +1)；收到 429/5xx 或超时时降为 0.7 倍
+重试等待使用 wait_retry_after，服务端返回 Retry-After 时按其等待，否则使用各渠道原有的固定间隔
+同一渠道的所有任务共享一个控制器，学到的并发数在任务之间保留
+初始并发数为 dubbing_thread，上限为 tts_max_concurrency，0 为 dubbing_thread 的 4 倍且不超过 32
+"""
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+# 耗时超过基准的该倍数时视为服务端已饱和，不再增加并发
+_LATENCY_TOLERANCE = 1.5
+# 过载时并发数乘以该值
+_DECREASE = 0.7
+
+
+def parse_retry_after(value):
+    """
+    Retry-After 可以是秒数或 HTTP 日期，返回需等待的秒数
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AIMDLimiter:
+
+    def __init__(self, initial, maximum):
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.inflight = 0
+        # 延迟基准，缓慢跟随耗时的变化；recent 为近期耗时
+        self.baseline = None
+        self.recent = None
+        self.last_cut = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self):
+        with self._cond:
+            if self.inflight < int(self.limit):
+                self.inflight += 1
+                return True
+            return False
+
+    def acquire(self, exit_fn=None):
+        """
+        阻塞直到取得并发名额，exit_fn 返回 True 时放弃并返回 False
+        """
+        with self._cond:
+            while True:
+                if exit_fn and exit_fn():
+                    return False
+                if self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return True
+                self._cond.wait(0.5)
+
+    def release(self, ok, latency=None):
+        with self._cond:
+            self.inflight -= 1
+            if ok and latency is not None:
+                if self.baseline is None:
+                    self.baseline = self.recent = latency
+                self.recent += 0.2 * (latency - self.recent)
+                # 近期耗时未明显高于基准时才更新基准，避免基准随排队时间一起升高
+                if self.recent <= self.baseline * _LATENCY_TOLERANCE:
+                    self.baseline = min(latency, self.baseline + 0.002 * (latency - self.baseline))
+                    if self.inflight + 1 >= int(self.limit):
+                        # 仅在名额已用满时增加，空闲时增加没有意义
+                        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def overloaded(self):
+        """
+        收到 429/5xx 或超时，并发数降为 0.7 倍；同一批并发请求的多次失败只减一次
+        """
+        now = time.time()
+        with self._cond:
+            if now - self.last_cut > max(self.baseline or 0, 0.2):
+                self.limit = max(1.0, self.limit * _DECREASE)
+                self.last_cut = now
+                config.logger.info(f'配音并发数降为 {int(self.limit)}')
+
+
+def retry_after_of(exc):
+    """
+    从 requests/httpx/openai 等异常附带的响应中读取 Retry-After
+    """
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or getattr(exc, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return parse_retry_after(headers.get('Retry-After'))
+    except Exception:
+        return None
+
+
+def wait_retry_after(default):
+    """
+    tenacity 的 wait 参数，有 Retry-After 时按其等待，否则等待 default 秒
+    """
+
+    def _wait(retry_state):
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        retry_after = retry_after_of(exc) if exc else None
+        return default if retry_after is None else min(retry_after, 300)
+
+    return _wait
+
+
+def get_limiter(name):
+    initial = max(1, int(float(config.settings.get('dubbing_thread', 1))))
+    maximum = int(float(config.settings.get('tts_max_concurrency', 0)))
+    if maximum <= 0:
+        maximum = min(32, initial * 4)
+    maximum = max(initial, maximum)
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None or limiter.maximum != maximum:
+            limiter = AIMDLimiter(initial, maximum)
+            _limiters[name] = limiter
+        return limiter
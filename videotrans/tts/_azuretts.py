@@ -3,11 +3,12 @@ import time
 from dataclasses import dataclass, field
 
 import azure.cognitiveservices.speech as speechsdk
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -25,7 +26,7 @@ class AzureTTS(BaseTTS):
 
     def _item_task_pl(self, items: list = None):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if self._exit():
@@ -122,7 +123,7 @@ class AzureTTS(BaseTTS):
 
     def _item_task(self, data_item):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if self._exit() or tools.vail_file(data_item['filename']):
@@ -14,6 +14,7 @@ from tenacity import RetryError
 
 from videotrans.configure import config
 from videotrans.configure._base import BaseCon
+from videotrans.tts import _aimd
 
 
 from videotrans.util import tools
@@ -24,6 +25,14 @@ from videotrans.util import tools
 
 """
 
+# 各渠道共享的 requests.Session，键为 (渠道类名, 连接池大小)
+_sessions = {}
+_sessions_lock = threading.Lock()
+# 建立连接的超时秒数，读取超时沿用各渠道原有设置
+_CONNECT_TIMEOUT = 10
+# 未指定超时时的读取超时秒数
+_READ_TIMEOUT = 600
+
 
 @dataclass
 class BaseTTS(BaseCon):
@@ -101,6 +110,54 @@ class BaseTTS(BaseCon):
             self.pitch = '+0Hz'
         self.pitch = self.pitch.replace('%', '')
 
+    # 同一渠道的请求共用一个 Session，保持长连接，避免每行字幕重新建立 TCP/TLS 连接
+    # 连接池大小与并发上限一致，并发请求不会因池满而新建连接
+    def _session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        size = self._limiter().maximum
+        key = (self.__class__.__name__, size)
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[key] = session
+        return session
+
+    # 同一渠道共享的并发控制器
+    def _limiter(self):
+        return _aimd.get_limiter(self.__class__.__name__)
+
+    @staticmethod
+    def _timeout(kwargs):
+        timeout = kwargs.get('timeout')
+        if timeout is None:
+            kwargs['timeout'] = (_CONNECT_TIMEOUT, _READ_TIMEOUT)
+        elif isinstance(timeout, (int, float)):
+            kwargs['timeout'] = (min(_CONNECT_TIMEOUT, timeout), timeout)
+        return kwargs
+
+    def _post(self, url, data=None, **kwargs):
+        return self._request('post', url, data=data, **kwargs)
+
+    def _get(self, url, **kwargs):
+        return self._request('get', url, **kwargs)
+
+    # 429/5xx 和超时通知并发控制器降低并发
+    def _request(self, method, url, **kwargs):
+        import requests
+        try:
+            res = getattr(self._session(), method)(url, **self._timeout(kwargs))
+        except requests.Timeout:
+            self._limiter().overloaded()
+            raise
+        if res.status_code == 429 or res.status_code >= 500:
+            self._limiter().overloaded()
+        return res
+
     # 入口 调用子类 _exec() 然后创建线程池调用 _item_task 或直接在 _exec 中实现逻辑
     # 若捕获到异常，则直接抛出  出错时发送停止信号
     # run->exec->_local_mul_thread->item_task
@@ -157,8 +214,11 @@ class BaseTTS(BaseCon):
             text=f"配音成功{succeed_nums}个，失败 {len(self.queue_tts) - succeed_nums}个" if config.defaulelang == 'zh' else f"Dubbing succeeded {succeed_nums}，failed {len(self.queue_tts) - succeed_nums}")
         # 去除末尾静音
         if config.settings['remove_silence']:
+            from videotrans.tts._cache import unshare
             for it in self.queue_tts:
                 if tools.vail_file(it['filename']):
+                    # 上次运行留下的文件可能是缓存的硬链接，原地修改前先断开
+                    unshare(it['filename'])
                     tools.remove_silence_from_end(it['filename'])
 
     # 用于除  edge-tts 之外的渠道，在此进行单或多线程气动。调用 _item_task
@@ -182,12 +242,28 @@ class BaseTTS(BaseCon):
                     self.error = e
             return
 
+        # 线程数取并发上限，实际同时执行的数量由并发控制器调整
         all_task = []
-        with ThreadPoolExecutor(max_workers=self.dub_nums) as pool:
+        with ThreadPoolExecutor(max_workers=min(self._limiter().maximum, len(self.queue_tts))) as pool:
             for k, item in enumerate(self.queue_tts):
-                all_task.append(pool.submit(self._item_task, item))
+                all_task.append(pool.submit(self._limited_item_task, item))
             _ = [i.result() for i in all_task]
 
+    def _limited_item_task(self, item) -> None:
+        # 已存在的配音不会发送请求，不计入并发和耗时
+        if tools.vail_file(item['filename']):
+            return self._item_task(item)
+        limiter = self._limiter()
+        if not limiter.acquire(self._exit):
+            return
+        start = time.time()
+        ok = False
+        try:
+            self._item_task(item)
+            ok = tools.vail_file(item['filename'])
+        finally:
+            limiter.release(ok, time.time() - start)
+
     # 实际业务逻辑 子类实现 在此创建线程池，或单线程时直接创建逻辑
     def _exec(self) -> None:
         pass
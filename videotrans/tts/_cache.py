@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+from videotrans.configure import config
+from videotrans.util import tools
+
+"""
+跨任务的配音缓存
+以 渠道、角色、语速、音调、音量、语言、是否去除末尾静音、规范化后的文本、参考音频内容 为键，与字幕时间和行号无关，
+重复运行或仅修改了字幕时间时，相同的句子不再重复合成。
+缓存文件以硬链接(失败时复制)放置到每个任务自己的 filename，后续阶段均以 先写临时文件再 move 的方式替换 filename，
+需要原地修改 filename 时(如去除末尾静音)先调用 unshare() 断开硬链接，不会改动缓存内容。
+缓存目录超过 tts_cache_size_mb 时，按最近使用时间淘汰，0 为禁用缓存
+"""
+
+_lock = threading.Lock()
+
+
+def _cache_dir():
+    cache_dir = Path(f'{config.ROOT_DIR}/tts_cache')
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir.as_posix()
+
+
+def _limit_bytes():
+    try:
+        return int(float(config.settings.get('tts_cache_size_mb', 2048)) * 1024 * 1024)
+    except (TypeError, ValueError):
+        return 0
+
+
+def enabled():
+    return _limit_bytes() > 0
+
+
+def _file_md5(file):
+    md5 = hashlib.md5()
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _link_or_copy(src, dst):
+    tmp = f'{dst}.{threading.get_ident()}.tmp'
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def unshare(file):
+    """
+    file 与缓存文件共用同一 inode 时复制为独立文件，之后可原地修改
+    """
+    try:
+        if os.stat(file).st_nlink < 2:
+            return
+        tmp = f'{file}.{threading.get_ident()}.tmp'
+        shutil.copy2(file, tmp)
+        os.replace(tmp, file)
+    except OSError as e:
+        config.logger.warning(f'断开配音缓存硬链接失败 {file}: {e}')
+
+
+def get_key(it, language=None):
+    text = re.sub(r'\[?spk\-?\d{1,}\]', '', it.get('text', ''), flags=re.I)
+    text = re.sub(r'\s+', ' ', text).strip()
+    ref_hash = _file_md5(it['ref_wav']) if it.get('ref_wav') and tools.vail_file(it['ref_wav']) else ''
+    return tools.get_md5(
+        f"{it.get('tts_type')}-{it.get('role')}-{it.get('rate')}-{it.get('pitch')}-{it.get('volume')}-{language}-{bool(config.settings.get('remove_silence'))}-{ref_hash}-{text}")
+
+
+def fetch_cache(queue_tts, language=None):
+    """
+    命中缓存的条目直接放置到其 filename
+    返回 (需合成的条目, 与需合成条目内容相同的重复条目)，重复条目在 store_cache 时复用合成结果
+    """
+    if _limit_bytes() <= 0:
+        return queue_tts, []
+    cache_dir = _cache_dir()
+    miss = []
+    duplicates = []
+    pending = set()
+    hits = 0
+    for it in queue_tts:
+        if not it.get('text', '').strip() or tools.vail_file(it['filename']):
+            miss.append(it)
+            continue
+        try:
+            key = get_key(it, language)
+            cache_file = f"{cache_dir}/{key}.wav"
+            if key in pending:
+                duplicates.append(it)
+                continue
+            if not tools.vail_file(cache_file):
+                pending.add(key)
+                miss.append(it)
+                continue
+            _link_or_copy(cache_file, it['filename'])
+            # 更新修改时间，用于按最近使用淘汰
+            os.utime(cache_file)
+            hits += 1
+        except Exception as e:
+            config.logger.warning(f'读取配音缓存失败 {it["filename"]}: {e}')
+            miss.append(it)
+    if hits or duplicates:
+        config.logger.info(f'配音缓存命中 {hits} 条，重复 {len(duplicates)} 条，需合成 {len(miss)} 条')
+    return miss, duplicates
+
+
+def store_cache(queue_tts, language=None, duplicates=None):
+    """
+    将新合成的配音存入缓存并放置到重复条目，在超出容量时淘汰最久未使用的文件
+    """
+    limit = _limit_bytes()
+    if limit <= 0:
+        return
+    cache_dir = _cache_dir()
+    for it in queue_tts:
+        if not it.get('text', '').strip() or not tools.vail_file(it['filename']):
+            continue
+        try:
+            cache_file = f"{cache_dir}/{get_key(it, language)}.wav"
+            if not Path(cache_file).exists():
+                _link_or_copy(it['filename'], cache_file)
+        except Exception as e:
+            config.logger.warning(f'写入配音缓存失败 {it["filename"]}: {e}')
+    for it in duplicates or []:
+        try:
+            cache_file = f"{cache_dir}/{get_key(it, language)}.wav"
+            if tools.vail_file(cache_file):
+                _link_or_copy(cache_file, it['filename'])
+        except Exception as e:
+            config.logger.warning(f'读取配音缓存失败 {it["filename"]}: {e}')
+    _evict(cache_dir, limit)
+
+
+def _evict(cache_dir, limit):
+    with _lock:
+        files = []
+        total = 0
+        for entry in os.scandir(cache_dir):
+            if not entry.is_file() or not entry.name.endswith('.wav'):
+                continue
+            st = entry.stat()
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+        if total <= limit:
+            return
+        # 淘汰到容量的 90%，避免每次都触发
+        files.sort()
+        for _, size, file in files:
+            if total <= limit * 0.9:
+                break
+            try:
+                os.remove(file)
+                total -= size
+            except OSError:
+                pass
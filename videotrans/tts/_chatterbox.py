@@ -8,13 +8,13 @@ from pathlib import Path
 from typing import List, Dict, Union
 
 import httpx
-import requests
 from openai import OpenAI
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -35,7 +35,7 @@ class ChatterBoxTTS(BaseTTS):
 
     def _item_task(self, data_item: Union[Dict, List, None]):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             role = data_item['role']
@@ -101,7 +101,7 @@ class ChatterBoxTTS(BaseTTS):
                 'language': self.language
             }
             # 发送POST请求，设置合理的超时时间
-            response = requests.post(
+            response = self._post(
                 self.api_url + '/v2/audio/speech_with_prompt',
                 data=form_data,
                 files=files_payload,
@@ -5,12 +5,12 @@ import time
 from dataclasses import dataclass
 from pathlib import Path
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -38,13 +38,13 @@ class ChatTTS(BaseTTS):
     def _item_task(self, data_item: dict = None):
         #
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT),stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if self._exit() or tools.vail_file(data_item['filename']):
                 return
             data = {"text": data_item['text'], "voice": data_item['role'], 'prompt': '', 'is_split': 1}
-            res = requests.post(f"{self.api_url}/tts", data=data, proxies=self.proxies, timeout=3600)
+            res = self._post(f"{self.api_url}/tts", data=data, proxies=self.proxies, timeout=3600)
             res.raise_for_status()
             config.logger.info(f'chatTTS:{data=}')
             res = res.json()
@@ -66,7 +66,7 @@ class ChatTTS(BaseTTS):
                 self._signal(text=f'{config.transobj["kaishipeiyin"]} {self.has_done}/{self.len}')
                 return
 
-            resb = requests.get(res['url'])
+            resb = self._get(res['url'])
             resb.raise_for_status()
 
             config.logger.info(f'ChatTTS:resb={resb.status_code=}')
@@ -6,12 +6,12 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Set
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -40,7 +40,7 @@ class CloneVoice(BaseTTS):
 
     def _item_task(self, data_item: dict = None):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if data_item['text'][-1] not in self.splits:
@@ -61,7 +61,7 @@ class CloneVoice(BaseTTS):
                 with open(data_item['ref_wav'], 'rb') as f:
                     chunk = f.read()
                 files = {"audio": chunk}
-            res = requests.post(f"{self.api_url}/apitts", data=data, files=files, proxies=self.proxies,
+            res = self._post(f"{self.api_url}/apitts", data=data, files=files, proxies=self.proxies,
                                 timeout=3600)
             res.raise_for_status()
             config.logger.info(f'clone-voice:{data=},{res.text=}')
@@ -80,7 +80,7 @@ class CloneVoice(BaseTTS):
                 self._signal(text=f'{config.transobj["kaishipeiyin"]} {self.has_done}/{self.len}')
                 return
 
-            resb = requests.get(res['url'], proxies=self.proxies)
+            resb = self._get(res['url'], proxies=self.proxies)
             resb.raise_for_status()
             with open(data_item['filename'] + ".wav", 'wb') as f:
                 f.write(resb.content)
@@ -4,12 +4,12 @@ import time
 from dataclasses import dataclass
 from pathlib import Path
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT, StopRetry
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -31,7 +31,7 @@ class CosyVoice(BaseTTS):
 
     def _item_task(self, data_item: dict = None):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if self._exit() or tools.vail_file(data_item['filename']):
@@ -90,7 +90,7 @@ class CosyVoice(BaseTTS):
                 data['role'] = '中文女'
             config.logger.info(f'请求数据：{api_url=},{data=}')
             # 克隆声音
-            response = requests.post(f"{api_url}", data=data, proxies={"http": "", "https": ""}, timeout=3600)
+            response = self._post(f"{api_url}", data=data, proxies={"http": "", "https": ""}, timeout=3600)
             response.raise_for_status()
 
             # 如果是WAV音频流，获取原始音频数据
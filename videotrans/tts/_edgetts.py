@@ -1,4 +1,5 @@
 import asyncio
+import time
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -7,11 +8,11 @@ from edge_tts import Communicate
 from edge_tts.exceptions import NoAudioReceived
 
 from videotrans.configure import config
+from videotrans.tts import _aimd
 from videotrans.tts._base import BaseTTS
 
 # --- 常量定义 ---
-# 最大并发数，可以根据需要调整，或者放入配置文件
-MAX_CONCURRENT_TASKS = int(float(config.settings.get('dubbing_thread', 5)))
+# 同时执行的任务数由 _aimd 并发控制器按成功率和耗时调整，初始值为 dubbing_thread
 # 单个任务的最大重试次数
 RETRY_NUMS = 3
 # 重试前的等待时间（秒）
@@ -42,61 +43,76 @@ class EdgeTTS(BaseTTS):
         if found_proxy:
             self.proxies = found_proxy
 
-    async def _create_audio_with_retry(self, item, index, total_tasks, semaphore):
+    async def _create_audio_with_retry(self, item, index, total_tasks, limiter):
         """
         为一个字幕条目创建音频，包含并发控制、延时和重试逻辑。
+        每次尝试单独取得并发名额，重试等待期间不占用名额
         """
-        # 使用 aenter/aexit 语法来优雅地处理信号量
-        async with semaphore:
-            # 增加请求前的延时，防止请求过于频繁
-            # 使用 await asyncio.sleep() 避免阻塞事件循环
-            if self.wait_sec > 0:
-                await asyncio.sleep(self.wait_sec)
-
-            # 移除可能存在的说话人标签
-            config.logger.info(
-                f"[Edge-TTS]配音 [{index + 1}/{total_tasks}]: {self.rate=},{self.volume=},{self.pitch=}, {item['text']}")
-
-            for attempt in range(RETRY_NUMS):
-                try:
-                    communicate = Communicate(
-                        item['text'],
-                        voice=item['role'],
-                        rate=self.rate,
-                        volume=self.volume,
-                        proxy=self.proxies,
-                        pitch=self.pitch
-                    )
-                    await communicate.save(item['filename'] + ".mp3")
-                    self.convert_to_wav(item['filename'] + ".mp3", item['filename'])
-
-                    # 成功后，更新进度并立即返回
-                    if self.inst:
-                        # 基于完成比例的精确进度更新
-                        # (index + 1) 表示当前是第几个任务
-                        progress = ((index + 1) / total_tasks) * 80
-                        if progress > self.inst.precent:
-                            self.inst.precent = progress
-
-                    self._signal(text=f'{config.transobj["kaishipeiyin"]} [{index + 1}/{total_tasks}]')
-                    config.logger.info(f"[Edge-TTS]配音 [{index + 1}/{total_tasks}] 成功.")
-                    return  # 成功，退出函数
-
-                except (NoAudioReceived, aiohttp.ClientError) as e:
-                    config.logger.warning(
-                        f"[Edge-TTS]配音 [{index + 1}/{total_tasks}] 第 {attempt + 1}/{RETRY_NUMS} 次尝试失败: {e}. "
-                        f"{RETRY_DELAY} 秒后重试..."
-                    )
-                    config.logger.error(f"[Edge-TTS]配音 [{index + 1}/{total_tasks}] 在 {RETRY_NUMS} 次尝试后最终失败。")
-                    self.error = e
-                    self._signal(text=f"{item.get('line', '')} retry {attempt} ")
-                    await asyncio.sleep(RETRY_DELAY)
-                except Exception as e:
-                    # 捕获其他未知异常
-                    config.logger.exception(e, exc_info=True)
-                    self.error = e
-                    self._signal(text=f"{item.get('line', '')} retry {attempt}")
-                    await asyncio.sleep(RETRY_DELAY)
+        # 增加请求前的延时，防止请求过于频繁
+        # 使用 await asyncio.sleep() 避免阻塞事件循环
+        if self.wait_sec > 0:
+            await asyncio.sleep(self.wait_sec)
+
+        # 移除可能存在的说话人标签
+        config.logger.info(
+            f"[Edge-TTS]配音 [{index + 1}/{total_tasks}]: {self.rate=},{self.volume=},{self.pitch=}, {item['text']}")
+
+        for attempt in range(RETRY_NUMS):
+            delay = RETRY_DELAY
+            while not limiter.try_acquire():
+                if self._exit():
+                    return
+                await asyncio.sleep(0.05)
+            start = time.time()
+            ok = False
+            try:
+                communicate = Communicate(
+                    item['text'],
+                    voice=item['role'],
+                    rate=self.rate,
+                    volume=self.volume,
+                    proxy=self.proxies,
+                    pitch=self.pitch
+                )
+                await communicate.save(item['filename'] + ".mp3")
+                ok = True
+            except (NoAudioReceived, aiohttp.ClientError) as e:
+                # 服务端限流时通常表现为无音频或连接被拒，降低并发
+                limiter.overloaded()
+                retry_after = _aimd.retry_after_of(e)
+                if retry_after is not None:
+                    delay = min(retry_after, 300)
+                config.logger.warning(
+                    f"[Edge-TTS]配音 [{index + 1}/{total_tasks}] 第 {attempt + 1}/{RETRY_NUMS} 次尝试失败: {e}. "
+                    f"{delay} 秒后重试..."
+                )
+                self.error = e
+                self._signal(text=f"{item.get('line', '')} retry {attempt} ")
+            except Exception as e:
+                # 捕获其他未知异常
+                config.logger.exception(e, exc_info=True)
+                self.error = e
+                self._signal(text=f"{item.get('line', '')} retry {attempt}")
+            finally:
+                limiter.release(ok, time.time() - start)
+
+            if not ok:
+                await asyncio.sleep(delay)
+                continue
+            self.convert_to_wav(item['filename'] + ".mp3", item['filename'])
+
+            # 成功后，更新进度并立即返回
+            if self.inst:
+                # 基于完成比例的精确进度更新
+                # (index + 1) 表示当前是第几个任务
+                progress = ((index + 1) / total_tasks) * 80
+                if progress > self.inst.precent:
+                    self.inst.precent = progress
+
+            self._signal(text=f'{config.transobj["kaishipeiyin"]} [{index + 1}/{total_tasks}]')
+            config.logger.info(f"[Edge-TTS]配音 [{index + 1}/{total_tasks}] 成功.")
+            return  # 成功，退出函数
+        config.logger.error(f"[Edge-TTS]配音 [{index + 1}/{total_tasks}] 在 {RETRY_NUMS} 次尝试后最终失败。")
 
     async def _task_queue(self):
         """
@@ -106,13 +122,13 @@ class EdgeTTS(BaseTTS):
             return
 
         total_tasks = len(self.queue_tts)
-        # 创建一个信号量，限制同时运行的任务不超过 MAX_CONCURRENT_TASKS 个
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+        # 同一渠道共享的并发控制器，代替固定大小的信号量
+        limiter = self._limiter()
 
         # 为队列中的每个项目创建一个异步任务
         tasks = [
             asyncio.create_task(
-                self._create_audio_with_retry(item, i, total_tasks, semaphore)
+                self._create_audio_with_retry(item, i, total_tasks, limiter)
             )
             for i, item in enumerate(self.queue_tts)
         ]
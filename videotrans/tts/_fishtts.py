@@ -5,12 +5,12 @@ import time
 from dataclasses import dataclass
 from typing import List, Dict, Union
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT, StopRetry
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -31,7 +31,7 @@ class FishTTS(BaseTTS):
 
     def _item_task(self, data_item: Union[Dict, List, None]):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             role = data_item['role']
@@ -53,7 +53,7 @@ class FishTTS(BaseTTS):
                 raise StopRetry(f'参考音频不存在:{audio_path}\n请确保该音频存在')
 
             config.logger.info(f'fishTTS-post:{data=},{self.proxies=}')
-            response = requests.post(f"{self.api_url}", json=data, proxies=self.proxies, timeout=3600)
+            response = self._post(f"{self.api_url}", json=data, proxies=self.proxies, timeout=3600)
 
             response.raise_for_status()
 
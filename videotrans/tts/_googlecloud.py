@@ -4,11 +4,12 @@ from dataclasses import dataclass
 from typing import Optional
 
 from google.cloud import texttospeech
-from tenacity import retry, stop_after_attempt, wait_fixed, before_log, after_log, retry_if_not_exception_type, \
+from tenacity import retry, stop_after_attempt, before_log, after_log, retry_if_not_exception_type, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -81,7 +82,7 @@ class GoogleCloudTTS(BaseTTS):
         """
 
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if not data_item or tools.vail_file(data_item["filename"]):
@@ -7,12 +7,12 @@ from dataclasses import dataclass, field
 from typing import List, Dict
 from typing import Union, Set
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT, StopRetry
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -41,7 +41,7 @@ class GPTSoVITS(BaseTTS):
 
     def _item_task(self, data_item: Union[Dict, List, None]):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             role = data_item['role']
@@ -87,7 +87,7 @@ class GPTSoVITS(BaseTTS):
 
             config.logger.info(f'GPT-SoVITS get:{data=}\n{self.api_url=}')
             # 克隆声音
-            response = requests.get(f"{self.api_url}", params=data, proxies={"http": "", "https": ""}, timeout=3600)
+            response = self._get(f"{self.api_url}", params=data, proxies={"http": "", "https": ""}, timeout=3600)
 
             content_type = response.headers.get('Content-Type')
             if 'application/json' in content_type:
@@ -1,12 +1,12 @@
 import logging
 from dataclasses import dataclass
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -32,7 +32,7 @@ class KokoroTTS(BaseTTS):
 
     def _item_task(self, data_item: dict = None):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             speed = 1.0
@@ -43,7 +43,7 @@ class KokoroTTS(BaseTTS):
                 return
 
             data = {"input": data_item['text'], "voice": data_item['role'], "speed": speed}
-            res = requests.post(self.api_url, json=data, proxies=self.proxies, timeout=3600)
+            res = self._post(self.api_url, json=data, proxies=self.proxies, timeout=3600)
             res.raise_for_status()
             with open(data_item['filename'] + ".mp3", 'wb') as f:
                 f.write(res.content)
@@ -0,0 +1,67 @@
+import copy
+import queue
+import threading
+from pathlib import Path
+
+from videotrans.configure import config
+from videotrans.tts._cache import store_cache
+
+"""
+边翻译边配音
+翻译阶段每得到一批译文即放入本队列，后台线程立即合成，结果存入跨任务配音缓存
+配音阶段仍按完整的目标字幕生成配音队列，已预先合成的行命中缓存，不再重复合成
+缓存以文本等内容为键，即使最终字幕与预先合成时不同，也只会未命中，不影响结果
+"""
+
+
+class DubPrefetch:
+
+    def __init__(self, *, language=None, uuid=None):
+        self.language = language
+        self.uuid = uuid
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, items):
+        if items:
+            self._queue.put(items)
+
+    # 不再有新的译文
+    def close(self):
+        self._queue.put(None)
+
+    # 等待已提交的行合成完毕
+    def join(self):
+        self.close()
+        self._thread.join()
+
+    def _run(self):
+        from videotrans.tts import run as run_tts
+        closed = False
+        while not closed:
+            items = self._queue.get()
+            if items is None:
+                break
+            # 合成期间到达的译文合并为一次请求，充分利用配音并发数
+            while True:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    closed = True
+                    break
+                items += more
+            if config.exit_soft or self.uuid in config.stoped_uuid_set:
+                continue
+            try:
+                Path(items[0]['filename']).parent.mkdir(parents=True, exist_ok=True)
+                run_tts(queue_tts=copy.deepcopy(items), language=self.language, uuid=self.uuid)
+                store_cache(items, language=self.language)
+            except Exception as e:
+                # 失败的行在配音阶段重新合成
+                config.logger.warning(f'边翻译边配音失败 {len(items)} 行: {e}')
+            finally:
+                for it in items:
+                    Path(it['filename']).unlink(missing_ok=True)
@@ -6,12 +6,12 @@ from dataclasses import dataclass
 from typing import List, Dict
 from typing import Union
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -35,7 +35,7 @@ class TTSAPI(BaseTTS):
 
     def _item_task(self, data_item: Union[Dict, List, None]):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             role = data_item['role'].strip()
@@ -73,7 +73,7 @@ class TTSAPI(BaseTTS):
             tmp_filename = data_item['filename'] + ".mp3"
             if isinstance(res['data'], str) and res['data'].startswith('http'):
                 url = res['data']
-                res = requests.get(url)
+                res = self._get(url)
                 res.raise_for_status()
                 with open(tmp_filename, 'wb') as f:
                     f.write(res.content)
@@ -112,7 +112,7 @@ class TTSAPI(BaseTTS):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
         }
         config.logger.info(f'发送数据 {data=}')
-        resraw = requests.post(f"{self.api_url}", data=data, verify=False, headers=headers, proxies=None)
+        resraw = self._post(f"{self.api_url}", data=data, verify=False, headers=headers, proxies=None)
         resraw.raise_for_status()
         return resraw.json()
 
@@ -192,6 +192,6 @@ Serene Woman:Serene_Woman
             'Content-Type': 'application/json'
         }
 
-        response = requests.request("POST", self.api_url, headers=headers, data=payload)
+        response = self._post(self.api_url, headers=headers, data=payload)
         response.raise_for_status()
         return response.json()
@@ -6,12 +6,12 @@ import time
 from dataclasses import dataclass, field
 from typing import Dict, Optional, ClassVar
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type, before_log, after_log, \
+from tenacity import retry, stop_after_attempt, retry_if_not_exception_type, before_log, after_log, \
     RetryError
 
 from videotrans.configure import config
 from videotrans.configure._except import NO_RETRY_EXCEPT
+from videotrans.tts._aimd import wait_retry_after
 from videotrans.tts._base import BaseTTS
 from videotrans.util import tools
 
@@ -56,7 +56,7 @@ class VolcEngineTTS(BaseTTS):
 
     def _item_task(self, data_item: dict = None):
         @retry(retry=retry_if_not_exception_type(NO_RETRY_EXCEPT), stop=(stop_after_attempt(RETRY_NUMS)),
-               wait=wait_fixed(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
+               wait=wait_retry_after(RETRY_DELAY), before=before_log(config.logger, logging.INFO),
                after=after_log(config.logger, logging.INFO))
         def _run():
             if self._exit() or tools.vail_file(data_item['filename']):
@@ -121,7 +121,7 @@ class VolcEngineTTS(BaseTTS):
 
                 }
             }
-            resp = requests.post(api_url, json.dumps(request_json), headers=header,
+            resp = self._post(api_url, json.dumps(request_json), headers=header,
                                  proxies={"http": "", "https": ""}, verify=True)
             resp.raise_for_status()
             resp_json = resp.json()
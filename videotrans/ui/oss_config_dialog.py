@@ -339,7 +339,9 @@ class OSSConfigDialog(QDialog):
             "upload_on_complete": self.auto_upload_checkbox.isChecked(),
             "upload_timeout": self.timeout_spin.value(),
             "retry_count": self.retry_spin.value(),
-            "multipart_threshold": 104857600  # 100MB
+            "multipart_threshold": 104857600,  # 100MB
+            "multipart_part_size": 10485760,  # 10MB
+            "multipart_workers": 4
         }
 
     def _test_connection(self):
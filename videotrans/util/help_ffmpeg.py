@@ -7,9 +7,13 @@ import re
 import shutil
 import subprocess
 import sys
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 
+from videotrans.configure import _procs
+
 
 def extract_concise_error(stderr_text: str, max_lines=3, max_length=250) -> str:
     """
@@ -188,8 +192,8 @@ def _build_hw_command(args: list, hw_codec: str):
         ('.mp4', '.mkv', '.mov', '.ts', '.txt'))
 
     # 无字幕嵌入时可尝试硬件解码
-    # 有字幕或 -vf 滤镜时不使用，容易出错且需要上传下载数据
-    if "-c:s" not in new_args and "-vf" not in new_args and is_input_media and is_output_mp4 and config.settings.get(
+    # 有字幕或 -vf/-filter_complex 滤镜时不使用，容易出错且需要上传下载数据
+    if "-c:s" not in new_args and "-vf" not in new_args and "-filter_complex" not in new_args and is_input_media and is_output_mp4 and config.settings.get(
             'cuda_decode', False):
         if encoder_family == 'nvenc':
             hw_decode_opts = ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda']
@@ -268,24 +272,23 @@ def runffmpeg(arg, *, noextname=None, uuid=None, force_cpu=False):
     try:
         # config.logger.info(f"执行 FFmpeg 命令 (force_cpu={force_cpu}): {' '.join(cmd)}")
 
-        creationflags = 0
-        if sys.platform == 'win32':
-            creationflags = subprocess.CREATE_NO_WINDOW
-
-        subprocess.run(
+        # 登记到所属任务，任务停止时立即结束
+        _procs.run(
             cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            uuid=uuid,
             encoding="utf-8",
             errors='replace',
             check=True,
-            text=True,
-            creationflags=creationflags
+            text=True
         )
         if noextname:
             config.queue_novice[noextname] = "end"
         return True
 
+    except _procs.TaskCancelled:
+        if noextname: config.queue_novice[noextname] = "error"
+        raise
+
     except FileNotFoundError:
         config.logger.error(f"命令未找到: {cmd[0]}。请确保 ffmpeg 已安装并在系统 PATH 中。")
         if noextname: config.queue_novice[noextname] = "error"
@@ -466,17 +469,12 @@ def _run_ffprobe_internal(cmd: list[str]) -> str:
         cmd[-1] = Path(cmd[-1]).as_posix()
 
     command = [config.FFPROBE_BIN] + [str(arg) for arg in cmd]
-    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-
     try:
-        p = subprocess.run(
+        p = _procs.run(
             command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
             encoding="utf-8",
             errors='replace',
-            check=True,
-            creationflags=creationflags
+            check=True
         )
         return p.stdout.strip()
     except FileNotFoundError as e:
@@ -493,13 +491,97 @@ def _run_ffprobe_internal(cmd: list[str]) -> str:
         raise _FFprobeInternalError(msg) from e
 
 
+# ffprobe 结果缓存，键为 (绝对路径, 参数)，值为 (文件大小, mtime_ns, 输出)
+# 文件大小或修改时间变化即视为失效；内存中按最近使用保留 _PROBE_CACHE_MAX 条，可选持久化到 SQLite
+_PROBE_CACHE_MAX = 2048
+_probe_cache = OrderedDict()
+_probe_lock = threading.Lock()
+_probe_local = threading.local()
+
+
+def _probe_db():
+    from videotrans.configure import config
+    if not config.settings.get('ffprobe_cache_sqlite', False):
+        return None
+    conn = getattr(_probe_local, 'conn', None)
+    if conn is None:
+        import sqlite3
+        Path(f'{config.ROOT_DIR}/probe_cache').mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(f'{config.ROOT_DIR}/probe_cache/ffprobe.db', timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS probe (path TEXT, args TEXT, size INTEGER, mtime_ns INTEGER, out TEXT, PRIMARY KEY (path, args))')
+        conn.commit()
+        _probe_local.conn = conn
+    return conn
+
+
+def _probe_cache_key(cmd):
+    # 仅缓存最后一个参数是已存在文件的命令
+    try:
+        st = os.stat(cmd[-1])
+    except (OSError, ValueError, TypeError):
+        return None, None
+    if not Path(cmd[-1]).is_file():
+        return None, None
+    return (Path(cmd[-1]).resolve().as_posix(), json.dumps([str(arg) for arg in cmd[:-1]])), (st.st_size,
+                                                                                               st.st_mtime_ns)
+
+
+def _probe_cache_get(key, stat):
+    with _probe_lock:
+        item = _probe_cache.get(key)
+        if item:
+            if item[:2] == stat:
+                _probe_cache.move_to_end(key)
+                return item[2]
+            del _probe_cache[key]
+    try:
+        conn = _probe_db()
+        if conn:
+            row = conn.execute('SELECT size, mtime_ns, out FROM probe WHERE path=? AND args=?', key).fetchone()
+            if row and tuple(row[:2]) == stat:
+                _probe_cache_set(key, stat, row[2], persist=False)
+                return row[2]
+    except Exception:
+        pass
+    return None
+
+
+def _probe_cache_set(key, stat, out, persist=True):
+    with _probe_lock:
+        _probe_cache[key] = (stat[0], stat[1], out)
+        _probe_cache.move_to_end(key)
+        while len(_probe_cache) > _PROBE_CACHE_MAX:
+            _probe_cache.popitem(last=False)
+    if not persist:
+        return
+    try:
+        conn = _probe_db()
+        if conn:
+            conn.execute('INSERT OR REPLACE INTO probe (path, args, size, mtime_ns, out) VALUES (?,?,?,?,?)',
+                         (key[0], key[1], stat[0], stat[1], out))
+            conn.commit()
+    except Exception:
+        pass
+
+
 def runffprobe(cmd):
     from videotrans.configure import config
     """
     (兼容性接口) 运行 ffprobe。
+    针对同一文件的相同命令，文件未变化时直接返回缓存结果
     """
+    key, stat = _probe_cache_key(cmd)
+    if key:
+        cached = _probe_cache_get(key, stat)
+        if cached:
+            return cached
     try:
         stdout_result = _run_ffprobe_internal(cmd)
+        if stdout_result and key:
+            # 以执行前的文件状态为准，若执行期间文件发生变化，下次会重新获取
+            _probe_cache_set(key, stat, stdout_result)
         if stdout_result:
             return stdout_result
 
@@ -612,6 +694,25 @@ def get_video_duration(file_path):
     return get_video_info(file_path, video_time=True)
 
 
+# 获取视频关键帧的时间点 ms，相对于首帧，升序
+# 保留到微秒，按该时间 -ss 复制码流时才能准确落在关键帧上
+# 只解码关键帧；结果随 ffprobe 缓存，同一文件只探测一次
+def get_keyframes(file_path):
+    out = runffprobe(
+        ['-v', 'error', '-select_streams', 'v:0', '-skip_frame', 'nokey', '-show_entries', 'frame=pts_time', '-of',
+         'csv=p=0', file_path])
+    times = []
+    for line in out.splitlines():
+        try:
+            times.append(float(line.strip().strip(',')))
+        except ValueError:
+            continue
+    if not times:
+        return []
+    first = min(times)
+    return sorted({round((t - first) * 1000, 3) for t in times})
+
+
 def conver_to_16k(audio, target_audio):
     return runffmpeg([
         "-y",
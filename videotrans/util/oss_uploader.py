@@ -3,9 +3,13 @@
 OSS 上传器
 负责将文件上传到阿里云 OSS
 """
+import hashlib
+import json
 import os
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Callable, Optional, Dict
@@ -166,9 +170,9 @@ class OSSUploader:
             file_size = os.path.getsize(local_path)
             result["size"] = file_size
 
-            # 生成 OSS 对象键
+            # 生成 OSS 对象键，存在未完成的分块上传时沿用其对象键以便续传
             if not remote_key:
-                remote_key = self._generate_object_key(local_path)
+                remote_key = self._checkpoint_key(local_path) or self._generate_object_key(local_path)
 
             result["oss_key"] = remote_key
 
@@ -262,7 +266,7 @@ class OSSUploader:
         callback: Optional[Callable] = None
     ) -> bool:
         """
-        阿里云分块上传（适用于大文件）
+        阿里云分块上传（适用于大文件），分块并行上传并支持断点续传
 
         Args:
             local_path: 本地文件路径
@@ -273,56 +277,9 @@ class OSSUploader:
             是否成功
         """
         try:
-            import oss2
-            from oss2.models import PartInfo
-
-            # 初始化分块上传
-            upload_id = self.bucket.init_multipart_upload(remote_key).upload_id
-
-            # 分块大小 (10MB)
-            part_size = 10 * 1024 * 1024
-            file_size = os.path.getsize(local_path)
-
-            parts = []
-            uploaded_size = 0
-
-            with open(local_path, 'rb') as f:
-                part_number = 1
-
-                while True:
-                    data = f.read(part_size)
-                    if not data:
-                        break
-
-                    # 上传分块
-                    result = self.bucket.upload_part(
-                        remote_key,
-                        upload_id,
-                        part_number,
-                        data
-                    )
-
-                    parts.append(PartInfo(part_number, result.etag))
-                    uploaded_size += len(data)
-
-                    # 调用进度回调
-                    if callback:
-                        callback(uploaded_size, file_size)
-
-                    part_number += 1
-
-            # 完成分块上传
-            self.bucket.complete_multipart_upload(remote_key, upload_id, parts)
-            return True
-
+            return self._parallel_multipart_upload(local_path, remote_key, callback)
         except Exception as e:
             config.logger.error(f"Aliyun multipart upload failed: {e}")
-            # 尝试取消分块上传
-            try:
-                if upload_id:
-                    self.bucket.abort_multipart_upload(remote_key, upload_id)
-            except:
-                pass
             return False
 
     def _aws_simple_upload(
@@ -381,7 +338,7 @@ class OSSUploader:
         callback: Optional[Callable] = None
     ) -> bool:
         """
-        AWS S3 分块上传（boto3 会自动处理）
+        AWS S3 分块上传，分块并行上传并支持断点续传
 
         Args:
             local_path: 本地文件路径
@@ -392,45 +349,173 @@ class OSSUploader:
             是否成功
         """
         try:
-            import boto3
-            from boto3.s3.transfer import TransferConfig
+            return self._parallel_multipart_upload(local_path, remote_key, callback)
+        except Exception as e:
+            config.logger.error(f"AWS S3 multipart upload failed: {e}")
+            return False
 
-            # 配置分块上传
-            config_transfer = TransferConfig(
-                multipart_threshold=10 * 1024 * 1024,  # 10MB
-                max_concurrency=4,
-                multipart_chunksize=10 * 1024 * 1024
-            )
+    # 分块上传的各步骤，按提供商调用对应的接口
+    def _mp_init(self, remote_key: str) -> str:
+        if self.config['provider'] == 'aliyun':
+            return self.bucket.init_multipart_upload(remote_key).upload_id
+        return self.client.create_multipart_upload(Bucket=self.config['bucket_name'], Key=remote_key)['UploadId']
 
-            # 上传文件（boto3 会自动处理分块）
-            if callback:
-                file_size = os.path.getsize(local_path)
-                uploaded_size = [0]  # Use list to allow modification in nested function
+    def _mp_upload_part(self, remote_key: str, upload_id: str, part_number: int, data) -> str:
+        if self.config['provider'] == 'aliyun':
+            return self.bucket.upload_part(remote_key, upload_id, part_number, data).etag
+        return self.client.upload_part(Bucket=self.config['bucket_name'], Key=remote_key, UploadId=upload_id,
+                                       PartNumber=part_number, Body=data)['ETag']
 
-                def s3_callback(bytes_amount):
-                    uploaded_size[0] += bytes_amount
-                    callback(uploaded_size[0], file_size)
+    def _mp_complete(self, remote_key: str, upload_id: str, parts: list):
+        if self.config['provider'] == 'aliyun':
+            from oss2.models import PartInfo
+            self.bucket.complete_multipart_upload(remote_key, upload_id, [PartInfo(n, etag) for n, etag in parts])
+            return
+        self.client.complete_multipart_upload(
+            Bucket=self.config['bucket_name'], Key=remote_key, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': n, 'ETag': etag} for n, etag in parts]})
 
-                self.client.upload_file(
-                    local_path,
-                    self.config['bucket_name'],
-                    remote_key,
-                    Config=config_transfer,
-                    Callback=s3_callback
-                )
+    def _mp_abort(self, remote_key: str, upload_id: str):
+        try:
+            if self.config['provider'] == 'aliyun':
+                self.bucket.abort_multipart_upload(remote_key, upload_id)
             else:
-                self.client.upload_file(
-                    local_path,
-                    self.config['bucket_name'],
-                    remote_key,
-                    Config=config_transfer
-                )
+                self.client.abort_multipart_upload(Bucket=self.config['bucket_name'], Key=remote_key,
+                                                   UploadId=upload_id)
+        except Exception:
+            pass
 
-            return True
+    @staticmethod
+    def _checkpoint_file(local_path: str) -> str:
+        """
+        断点文件按本地路径的 md5 存放在 ROOT_DIR/postprocess/oss_upload，不写入视频所在的输出目录
+        """
+        name = hashlib.md5(Path(local_path).resolve().as_posix().encode('utf-8')).hexdigest()
+        return f"{config.ROOT_DIR}/postprocess/oss_upload/{name}.json"
+
+    @classmethod
+    def remove_checkpoint(cls, local_path: str):
+        """删除本地文件的上传断点"""
+        Path(cls._checkpoint_file(local_path)).unlink(missing_ok=True)
+
+    def _load_checkpoint(self, local_path: str) -> Optional[Dict]:
+        """
+        读取断点文件，文件已修改或配置不同时视为无效
+        """
+        try:
+            with open(self._checkpoint_file(local_path), 'r', encoding='utf-8') as f:
+                ckpt = json.load(f)
+            st = os.stat(local_path)
+            if (ckpt['size'], ckpt['mtime_ns']) != (st.st_size, st.st_mtime_ns) or \
+                    (ckpt['provider'], ckpt['bucket']) != (self.config['provider'], self.config.get('bucket_name')):
+                return None
+            return ckpt
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_checkpoint(self, local_path: str, ckpt: Dict):
+        file = self._checkpoint_file(local_path)
+        Path(file).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{file}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(ckpt, f)
+        os.replace(tmp, file)
+
+    def _checkpoint_key(self, local_path: str) -> Optional[str]:
+        ckpt = self._load_checkpoint(local_path)
+        return ckpt['key'] if ckpt else None
+
+    def _parallel_multipart_upload(
+        self,
+        local_path: str,
+        remote_key: str,
+        callback: Optional[Callable] = None
+    ) -> bool:
+        """
+        并行分块上传，已完成的分块记录在断点文件中，失败重试时只上传缺少的分块
+        分块在工作线程中按偏移读取，内存占用不超过 并发数 x 分块大小
+
+        Args:
+            local_path: 本地文件路径
+            remote_key: 对象键
+            callback: 进度回调
+
+        Returns:
+            是否成功，失败时抛出异常
+        """
+        part_size = max(5 * 1024 * 1024, int(self.config.get('multipart_part_size', 10 * 1024 * 1024)))
+        workers = max(1, int(self.config.get('multipart_workers', 4)))
+        st = os.stat(local_path)
+        file_size = st.st_size
+
+        ckpt = self._load_checkpoint(local_path)
+        if ckpt and (ckpt['key'] != remote_key or ckpt['part_size'] != part_size):
+            self._mp_abort(ckpt['key'], ckpt['upload_id'])
+            ckpt = None
+        if ckpt:
+            config.logger.info(f"Resuming multipart upload {remote_key}, {len(ckpt['parts'])} parts done")
+        else:
+            ckpt = {
+                'key': remote_key,
+                'upload_id': self._mp_init(remote_key),
+                'size': file_size,
+                'mtime_ns': st.st_mtime_ns,
+                'part_size': part_size,
+                'provider': self.config['provider'],
+                'bucket': self.config.get('bucket_name'),
+                'parts': {},
+            }
+            self._save_checkpoint(local_path, ckpt)
 
+        upload_id = ckpt['upload_id']
+        part_count = max(1, (file_size + part_size - 1) // part_size)
+        todo = [n for n in range(1, part_count + 1) if str(n) not in ckpt['parts']]
+        lock = threading.Lock()
+        uploaded = [sum(min(part_size, file_size - (int(n) - 1) * part_size) for n in ckpt['parts'])]
+
+        fd = os.open(local_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+
+        def _read(offset, size):
+            if hasattr(os, 'pread'):
+                return os.pread(fd, size, offset)
+            # Windows 没有 pread，每次使用独立的文件对象
+            with open(local_path, 'rb') as f:
+                f.seek(offset)
+                return f.read(size)
+
+        def _upload(n):
+            offset = (n - 1) * part_size
+            data = _read(offset, min(part_size, file_size - offset))
+            etag = self._mp_upload_part(remote_key, upload_id, n, data)
+            with lock:
+                ckpt['parts'][str(n)] = etag
+                self._save_checkpoint(local_path, ckpt)
+                uploaded[0] += len(data)
+                if callback:
+                    callback(uploaded[0], file_size)
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(workers, max(1, len(todo)))) as pool:
+                futures = [pool.submit(_upload, n) for n in todo]
+                try:
+                    for fu in as_completed(futures):
+                        fu.result()
+                except Exception:
+                    # 有分块失败时不再开始新的分块，已开始的分块完成后仍记录到断点
+                    for fu in futures:
+                        fu.cancel()
+                    raise
         except Exception as e:
-            config.logger.error(f"AWS S3 multipart upload failed: {e}")
-            return False
+            # 分块上传已在服务端失效时，删除断点，下次重新开始
+            if 'NoSuchUpload' in str(e) or 'NoSuchUpload' in type(e).__name__:
+                self.remove_checkpoint(local_path)
+            raise
+        finally:
+            os.close(fd)
+
+        self._mp_complete(remote_key, upload_id, sorted((int(n), etag) for n, etag in ckpt['parts'].items()))
+        self.remove_checkpoint(local_path)
+        return True
 
     def _minio_upload(
         self,